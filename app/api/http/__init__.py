@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from datetime import UTC, datetime
@@ -11,13 +12,19 @@ from fastapi.responses import JSONResponse
 from starlette import status
 
 from config.logger import init_logger
-from config.settings import APP_NAME, BUILD_VERSION, SHOULD_RESET_DATABASE
-from repository.psql.connection import psql_db
+from config.settings import APP_NAME, BUILD_VERSION, SESSION_REPOSITORY_BACKEND, SHOULD_RESET_DATABASE
+from core.enum.session import SessionRepositoryBackendEnum
+from repository.memory.session import get_memory_session_repository
+from repository.psql.connection import get_all_dbs, psql_db, psql_session_shard_dbs
+from repository.sqlite.connection import sqlite_db
+from worker.session_archival import is_session_archival_enabled, run_session_archival_loop
+from worker.session_retention import is_session_retention_enabled, run_session_retention_loop
 
 from .error_handler import register_exception_handlers
 from .router import (
     agent,
     health,
+    metrics,
     session,
     user,
 )
@@ -35,6 +42,10 @@ openapi_tags: list[dict[str, Any]] = [
         'name': 'Sessions',
         'description': 'Sessions endpoints',
     },
+    {
+        'name': 'Metrics',
+        'description': 'In-process runtime metrics',
+    },
 ]
 
 logger = logging.getLogger(__name__)
@@ -42,15 +53,53 @@ logger = logging.getLogger(__name__)
 init_logger()
 
 
+async def _start_databases() -> None:
+    if SESSION_REPOSITORY_BACKEND == SessionRepositoryBackendEnum.MEMORY:
+        # load the persisted sessions before serving rather than on the first request
+        get_memory_session_repository()
+
+    if sqlite_db is not None:
+        if SHOULD_RESET_DATABASE:
+            await sqlite_db.drop_all_tables()
+        await sqlite_db.run_migrations()
+        return
+
+    # replicas follow the primary, but every session shard is migrated on its own
+    for db in [psql_db, *psql_session_shard_dbs.values()]:
+        if SHOULD_RESET_DATABASE:
+            await db.drop_all_tables()
+        await db.run_migrations()
+    for db in get_all_dbs():
+        await db.start_liveness_check()
+
+
+async def _stop_databases() -> None:
+    for db in get_all_dbs():
+        if db.message_write_buffer is not None:
+            await db.message_write_buffer.flush()
+        await db.stop_liveness_check()
+    if sqlite_db is not None:
+        await sqlite_db.close()
+    if SESSION_REPOSITORY_BACKEND == SessionRepositoryBackendEnum.MEMORY:
+        await get_memory_session_repository().close()
+
+
 @asynccontextmanager
 async def lifespan(_: FastAPI):
+    background_tasks: list[asyncio.Task] = []
     try:
-        if SHOULD_RESET_DATABASE:
-            await psql_db.drop_all_tables()
-        await psql_db.create_all_tables()
+        await _start_databases()
+        if is_session_retention_enabled():
+            background_tasks.append(asyncio.create_task(run_session_retention_loop()))
+        if is_session_archival_enabled():
+            background_tasks.append(asyncio.create_task(run_session_archival_loop()))
         yield
     finally:
         logger.info('Application is shutting down...')
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        await _stop_databases()
 
 
 _fastapi = FastAPI(
@@ -68,11 +117,13 @@ _fastapi.add_middleware(
     allow_credentials=True,
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=['ETag'],
 )
 
 register_exception_handlers(_fastapi)
 
 _fastapi.include_router(health.router)
+_fastapi.include_router(metrics.router)
 _fastapi.include_router(user.router)
 _fastapi.include_router(agent.router)
 _fastapi.include_router(session.router)
@@ -1,22 +1,26 @@
 from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
 from typing import Annotated
 
 from fastapi import Depends
 
-from repository.psql.connection import psql_db
-from repository.psql.dao.session import PsqlSessionRepository
+from repository.sharded.connection import session_repository_scope
 from service.agent import AgentService
 from service.session import SessionService
 
 
+@asynccontextmanager
+async def agent_service_scope() -> AsyncGenerator[AgentService]:
+    """Create an agent service with its own database session, for use outside of request dependencies."""
+    async with session_repository_scope() as session_repo:
+        yield AgentService(
+            session_service=SessionService(session_repo=session_repo),
+        )
+
+
 async def get_agent_service() -> AsyncGenerator[AgentService]:
-    async with psql_db.async_session_maker() as session:
-        try:
-            yield AgentService(
-                session_service=SessionService(session_repo=PsqlSessionRepository(session)),
-            )
-        finally:
-            await session.close()
+    async with agent_service_scope() as agent_service:
+        yield agent_service
 
 
 AgentServiceDependency = Annotated[AgentService, Depends(get_agent_service)]
@@ -3,17 +3,19 @@ from typing import Annotated
 
 from fastapi import Depends
 
-from repository.psql.connection import psql_db
-from repository.psql.dao.session import PsqlSessionRepository
+from repository.sharded.connection import session_repository_scope
 from service.session import SessionService
 
 
 async def get_session_service() -> AsyncGenerator[SessionService]:
-    async with psql_db.async_session_maker() as session:
-        try:
-            yield SessionService(session_repo=PsqlSessionRepository(session))
-        finally:
-            await session.close()
+    async with session_repository_scope() as session_repo:
+        yield SessionService(session_repo=session_repo)
+
+
+async def get_read_session_service() -> AsyncGenerator[SessionService]:
+    async with session_repository_scope(read_only=True) as session_repo:
+        yield SessionService(session_repo=session_repo)
 
 
 SessionServiceDependency = Annotated[SessionService, Depends(get_session_service)]
+ReadSessionServiceDependency = Annotated[SessionService, Depends(get_read_session_service)]
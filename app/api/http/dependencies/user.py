@@ -3,13 +3,22 @@ from typing import Annotated
 
 from fastapi import Depends
 
-from repository.psql.connection import psql_db
+from repository.psql.connection import get_read_db, psql_db
 from repository.psql.dao.role import PsqlRoleRepository
 from repository.psql.dao.user import PsqlUserRepository
+from repository.sqlite.connection import sqlite_db
+from repository.sqlite.role import SqliteRoleRepository
+from repository.sqlite.user import SqliteUserRepository
 from service.user import UserService
 
 
 async def get_user_service() -> AsyncGenerator[UserService]:
+    if sqlite_db is not None:
+        yield UserService(
+            user_repository=SqliteUserRepository(sqlite_db), role_repository=SqliteRoleRepository(sqlite_db)
+        )
+        return
+
     async with psql_db.async_session_maker() as session:
         try:
             yield UserService(
@@ -20,4 +29,22 @@ async def get_user_service() -> AsyncGenerator[UserService]:
             await session.close()
 
 
+async def get_read_user_service() -> AsyncGenerator[UserService]:
+    if sqlite_db is not None:
+        yield UserService(
+            user_repository=SqliteUserRepository(sqlite_db), role_repository=SqliteRoleRepository(sqlite_db)
+        )
+        return
+
+    async with get_read_db().async_session_maker() as session:
+        try:
+            yield UserService(
+                user_repository=PsqlUserRepository(session),
+                role_repository=PsqlRoleRepository(session),
+            )
+        finally:
+            await session.close()
+
+
 UserServiceDependency = Annotated[UserService, Depends(get_user_service)]
+ReadUserServiceDependency = Annotated[UserService, Depends(get_read_user_service)]
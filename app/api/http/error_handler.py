@@ -6,7 +6,7 @@ from starlette import status
 from starlette.exceptions import HTTPException as Starlette_HTTPException
 
 from core.enum.error import ErrorCode
-from core.error import DuplicateError, NotFoundError
+from core.error import DuplicateError, InvalidArgumentError, NotFoundError
 
 
 def register_exception_handlers(app: FastAPI) -> None:
@@ -67,3 +67,13 @@ def register_exception_handlers(app: FastAPI) -> None:
                 'code': ErrorCode.CORE_1003_DUPLICATE_ERROR,
             },
         )
+
+    @app.exception_handler(InvalidArgumentError)
+    async def invalid_argument_error_handler(_: Request, exception: InvalidArgumentError):
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                'message': str(exception),
+                'code': ErrorCode.CORE_1004_INVALID_ARGUMENT,
+            },
+        )
@@ -0,0 +1,16 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class PydanticJSONResponse(JSONResponse):
+    """
+    JSON response rendered by pydantic-core in a single pass.
+
+    Accepts pydantic models (and anything else pydantic-core can serialize) as content, so returning a model skips
+    both the response model validation and the intermediate dict of the default FastAPI response path.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
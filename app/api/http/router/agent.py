@@ -1,37 +1,44 @@
 import asyncio
-import json
 import logging
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from pydantic_core import to_json
 
-from api.http.dependencies.agent import AgentServiceDependency
-from api.http.schema.agent import AskAgentRequest, AskAgentResponseStreamChunkModel
+from api.http.dependencies.agent import AgentServiceDependency, agent_service_scope
+from api.http.schema.agent import AskAgentRequest, AskAgentResponseStreamChunkModel, AskAgentWebSocketRequestFrame
 from core.enum.agent import AgentEventTypeEnum
 from service.agent import AgentService
+from utility.sse import with_heartbeat
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix='', tags=['Agent'])
 
+# maximum number of agent streams a single WebSocket connection may have open at once
+MAX_WEBSOCKET_STREAMS = 16
+
+
+def to_stream_chunk(event_type: AgentEventTypeEnum, data: dict) -> AskAgentResponseStreamChunkModel | None:
+    if event_type == AgentEventTypeEnum.CONTENT:
+        return AskAgentResponseStreamChunkModel(content=data['content'])
+    if event_type == AgentEventTypeEnum.STEP:
+        return AskAgentResponseStreamChunkModel(step_description=data['description'], step_status=data['status'])
+    if event_type == AgentEventTypeEnum.DONE:
+        return AskAgentResponseStreamChunkModel(done=True)
+    if event_type == AgentEventTypeEnum.ERROR:
+        return AskAgentResponseStreamChunkModel(error=data['error'])
+    return None
+
 
 async def agent_response_stream(agent_service: AgentService, query: str, session_id: str):
     try:
         async for event_type, data in agent_service.process_query_stream(query, session_id):
-            chunk = None
-            if event_type == AgentEventTypeEnum.CONTENT:
-                chunk = AskAgentResponseStreamChunkModel(content=data['content'])
-            elif event_type == AgentEventTypeEnum.STEP:
-                chunk = AskAgentResponseStreamChunkModel(
-                    step_description=data['description'], step_status=data['status']
-                )
-            elif event_type == AgentEventTypeEnum.DONE:
-                chunk = AskAgentResponseStreamChunkModel(done=True)
-            elif event_type == AgentEventTypeEnum.ERROR:
-                chunk = AskAgentResponseStreamChunkModel(error=data['error'])
+            chunk = to_stream_chunk(event_type, data)
 
             if chunk is not None:
-                yield f'data: {json.dumps(chunk.model_dump())}\n\n'
+                yield f'data: {chunk.model_dump_json()}\n\n'
                 await asyncio.sleep(0)
     except asyncio.CancelledError:
         logger.info(f'Client disconnected from session {session_id}')
@@ -39,18 +46,132 @@ async def agent_response_stream(agent_service: AgentService, query: str, session
         logger.error(f'Unexpected error in agent response stream: {e}', exc_info=True)
         try:
             error_chunk = AskAgentResponseStreamChunkModel(error='Stream interrupted unexpectedly')
-            yield f'data: {json.dumps(error_chunk.model_dump())}\n\n'
+            yield f'data: {error_chunk.model_dump_json()}\n\n'
         except Exception:
             pass
 
 
 @router.post('/ask-agent', response_model=AskAgentResponseStreamChunkModel)
-async def ask_agent(request: AskAgentRequest, agent_service: AgentServiceDependency):
+async def ask_agent(request: AskAgentRequest, http_request: Request, agent_service: AgentServiceDependency):
     return StreamingResponse(
-        agent_response_stream(agent_service, request.query, request.session_id),
+        with_heartbeat(
+            agent_response_stream(agent_service, request.query, request.session_id), http_request.is_disconnected
+        ),
         media_type='text/event-stream',
         headers={
             'Cache-Control': 'no-cache',
             'Connection': 'keep-alive',
         },
     )
+
+
+class AgentWebSocketStream:
+    """One agent stream multiplexed over a WebSocket, sending only as many frames as the client granted credit for."""
+
+    def __init__(self, stream_id: int, credit: int):
+        self.stream_id = stream_id
+        self.task: asyncio.Task | None = None
+        self._credit = credit
+        self._credit_granted = asyncio.Event()
+
+    def grant(self, credit: int) -> None:
+        self._credit += credit
+        self._credit_granted.set()
+
+    async def acquire(self) -> None:
+        while self._credit <= 0:
+            self._credit_granted.clear()
+            await self._credit_granted.wait()
+        self._credit -= 1
+
+
+class AgentWebSocketConnection:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.streams: dict[int, AgentWebSocketStream] = {}
+        self._send_lock = asyncio.Lock()
+
+    async def send_chunk(self, stream_id: int, chunk: AskAgentResponseStreamChunkModel) -> None:
+        # compact frames: the stream id plus only the chunk fields that are set
+        frame = {'s': stream_id, **chunk.model_dump(exclude_none=True)}
+        async with self._send_lock:
+            await self.websocket.send_text(to_json(frame).decode())
+
+    async def handle_frame(self, frame: AskAgentWebSocketRequestFrame) -> None:
+        stream = self.streams.get(frame.stream)
+
+        if frame.op == 'credit':
+            if stream is not None:
+                stream.grant(frame.credit)
+        elif frame.op == 'cancel':
+            if stream is not None and stream.task is not None:
+                # waits for the stream to stop, so its id and slot are free for the next frame
+                stream.task.cancel()
+                await asyncio.gather(stream.task, return_exceptions=True)
+        elif stream is not None:
+            await self.send_chunk(frame.stream, AskAgentResponseStreamChunkModel(error='Stream id already in use'))
+        elif len(self.streams) >= MAX_WEBSOCKET_STREAMS:
+            await self.send_chunk(frame.stream, AskAgentResponseStreamChunkModel(error='Too many open streams'))
+        elif not frame.session_id or not frame.query:
+            await self.send_chunk(frame.stream, AskAgentResponseStreamChunkModel(error='Missing session_id or query'))
+        else:
+            stream = AgentWebSocketStream(frame.stream, frame.credit)
+            stream.task = asyncio.create_task(self._run_stream(stream, frame.session_id, frame.query))
+            self.streams[frame.stream] = stream
+
+    async def close(self) -> None:
+        tasks = [stream.task for stream in self.streams.values() if stream.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_stream(self, stream: AgentWebSocketStream, session_id: str, query: str) -> None:
+        try:
+            # every stream gets its own database session, since streams of one connection run concurrently
+            async with agent_service_scope() as agent_service:
+                async for event_type, data in agent_service.process_query_stream(query, session_id):
+                    chunk = to_stream_chunk(event_type, data)
+
+                    if chunk is not None:
+                        await stream.acquire()
+                        await self.send_chunk(stream.stream_id, chunk)
+        except asyncio.CancelledError:
+            logger.info(f'Client stopped receiving the agent stream of session {session_id}')
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.error(f'Unexpected error in agent WebSocket stream: {e}', exc_info=True)
+            try:
+                await self.send_chunk(
+                    stream.stream_id, AskAgentResponseStreamChunkModel(error='Stream interrupted unexpectedly')
+                )
+            except Exception:
+                pass
+        finally:
+            self.streams.pop(stream.stream_id, None)
+
+
+@router.websocket('/ask-agent/ws')
+async def ask_agent_websocket(websocket: WebSocket):
+    """
+    Multiplex agent streams of several sessions over one connection.
+
+    Client frames are `AskAgentWebSocketRequestFrame` JSON objects; server frames are the fields of
+    `AskAgentResponseStreamChunkModel` that are set, plus the stream id as `s`.
+    """
+    await websocket.accept()
+    connection = AgentWebSocketConnection(websocket)
+
+    try:
+        while True:
+            try:
+                frame = AskAgentWebSocketRequestFrame.model_validate_json(await websocket.receive_text())
+            except ValidationError:
+                await websocket.send_text(to_json({'error': 'Invalid frame'}).decode())
+                continue
+
+            await connection.handle_frame(frame)
+    except WebSocketDisconnect:
+        logger.info('Client disconnected from the agent WebSocket')
+    finally:
+        await connection.close()
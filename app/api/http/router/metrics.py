@@ -0,0 +1,31 @@
+from dataclasses import asdict
+
+from fastapi import APIRouter
+
+from repository.psql.connection import psql_db, psql_replica_db, psql_session_shard_dbs
+from service.session_cache import get_session_response_cache
+from service.session_event import get_session_event_broker
+
+router = APIRouter(prefix='/metrics', tags=['Metrics'])
+
+
+@router.get('')
+async def get_metrics():
+    event_broker = get_session_event_broker()
+    pool_stats = psql_db.get_pool_stats()
+    replica_pool_stats = psql_replica_db.get_pool_stats() if psql_replica_db else None
+    write_buffer_stats = psql_db.message_write_buffer.get_stats() if psql_db.message_write_buffer else None
+    return {
+        'database_pool': asdict(pool_stats) if pool_stats else None,
+        'database_replica_pool': asdict(replica_pool_stats) if replica_pool_stats else None,
+        'database_session_shard_pools': {
+            name: asdict(stats) if (stats := db.get_pool_stats()) else None
+            for name, db in psql_session_shard_dbs.items()
+        },
+        'message_write_buffer': asdict(write_buffer_stats) if write_buffer_stats else None,
+        'session_cache': asdict(get_session_response_cache().get_stats()),
+        'session_events': {
+            'subscribers': event_broker.subscriber_count,
+            'last_event_id': event_broker.last_event_id,
+        },
+    }
@@ -1,49 +1,208 @@
-from fastapi import APIRouter
+import asyncio
+import logging
+from collections.abc import AsyncGenerator
+from datetime import datetime
+from typing import Annotated
 
-from api.http.dependencies.session import SessionServiceDependency
+from fastapi import APIRouter, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette import status
+
+from api.http.dependencies.session import ReadSessionServiceDependency, SessionServiceDependency
+from api.http.response import PydanticJSONResponse
 from api.http.schema.session import (
     CreateSessionRequestModel,
+    ListSessionsResponseModel,
     RetrieveSessionResponseModel,
+    SearchSessionsResponseModel,
+    SessionSearchResultResponseModel,
+    SessionSummaryResponseModel,
+    SessionTurnDeltaResponseModel,
 )
-from core.error import NotFoundError
+from core.error import InvalidArgumentError, NotFoundError
+from core.model.session import SessionEvent, SessionListCursor, SessionSearchCursor
+from service.session_event import SessionEventBroker, get_session_event_broker
+from utility.cursor import decode_cursor, encode_cursor
+from utility.etag import etag_matches, make_etag
+from utility.search import get_search_terms
+from utility.sse import with_heartbeat
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix='/sessions', tags=['Sessions'])
 
+# clients may keep responses but must revalidate them with the ETag before every use
+_REVALIDATE_HEADERS = {'Cache-Control': 'no-cache'}
+
+
+def _not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag, **_REVALIDATE_HEADERS})
+
+
+def _parse_session_list_cursor(token: str) -> SessionListCursor:
+    try:
+        updated_at, session_id = decode_cursor(token)
+        return SessionListCursor(updated_at=datetime.fromisoformat(updated_at), session_id=session_id)
+    except (TypeError, ValueError) as e:
+        raise InvalidArgumentError('Invalid cursor') from e
+
+
+def _parse_session_search_cursor(token: str) -> SessionSearchCursor:
+    try:
+        rank, message_id, session_id = decode_cursor(token)
+        return SessionSearchCursor(rank=rank, message_id=message_id, session_id=session_id)
+    except (TypeError, ValueError) as e:
+        raise InvalidArgumentError('Invalid cursor') from e
+
 
 @router.post('', response_model=RetrieveSessionResponseModel)
 async def create_session(request: CreateSessionRequestModel, session_service: SessionServiceDependency):
     session = await session_service.create_session(title=request.title)
-    return RetrieveSessionResponseModel(id=session.session_id, title=session.title, turns=[])
+    return PydanticJSONResponse(RetrieveSessionResponseModel(id=session.session_id, title=session.title, turns=[]))
 
 
-@router.get('', response_model=list[RetrieveSessionResponseModel])
-async def get_all_sessions(session_service: SessionServiceDependency):
-    sessions = await session_service.get_all_sessions()
-    return [
-        RetrieveSessionResponseModel(
-            id=session.session_id,
-            title=session.title,
-            turns=session.get_turns(),
-            in_progress_query=session.get_in_progress_query(),
+@router.get('', response_model=ListSessionsResponseModel)
+async def get_all_sessions(
+    session_service: ReadSessionServiceDependency,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    list_version = await session_service.get_session_list_version()
+    etag = make_etag('sessions', list_version.generation, list_version.updated_at, limit, cursor)
+    if etag_matches(if_none_match, etag):
+        return _not_modified_response(etag)
+
+    summaries, next_cursor = await session_service.get_session_summaries(
+        limit=limit, cursor=_parse_session_list_cursor(cursor) if cursor else None
+    )
+    return PydanticJSONResponse(
+        ListSessionsResponseModel(
+            items=[SessionSummaryResponseModel.from_core(summary) for summary in summaries],
+            next_cursor=encode_cursor([next_cursor.updated_at.isoformat(), next_cursor.session_id])
+            if next_cursor
+            else None,
+        ),
+        headers={'ETag': etag, **_REVALIDATE_HEADERS},
+    )
+
+
+@router.get('/search', response_model=SearchSessionsResponseModel)
+async def search_sessions(
+    session_service: ReadSessionServiceDependency,
+    q: Annotated[str, Query(min_length=1, max_length=200, description='Words that matching messages all contain')],
+    limit: Annotated[int, Query(ge=1, le=50)] = 20,
+    cursor: str | None = None,
+):
+    results, next_cursor = await session_service.search_sessions(
+        q, limit=limit, cursor=_parse_session_search_cursor(cursor) if cursor else None
+    )
+    terms = get_search_terms(q)
+    return PydanticJSONResponse(
+        SearchSessionsResponseModel(
+            items=[SessionSearchResultResponseModel.from_core(result, terms) for result in results],
+            next_cursor=encode_cursor([next_cursor.rank, next_cursor.message_id, next_cursor.session_id])
+            if next_cursor
+            else None,
         )
-        for session in sessions
-    ]
+    )
+
+
+async def session_event_stream(
+    event_broker: SessionEventBroker, session_ids: list[str] | None, last_event_id: int | None
+) -> AsyncGenerator[str]:
+    try:
+        async for event in event_broker.subscribe(session_ids, last_event_id=last_event_id):
+            yield f'id: {event.id}\ndata: {event.model_dump_json()}\n\n'
+    except asyncio.CancelledError:
+        logger.info('Client disconnected from session events')
+
+
+@router.get('/events', response_model=SessionEvent)
+async def get_session_events(
+    request: Request,
+    session_id: Annotated[list[str] | None, Query(description='Only stream events of these sessions')] = None,
+    last_event_id: Annotated[int | None, Header()] = None,
+):
+    return StreamingResponse(
+        # served from the in-process broker, so the stream never holds a database session
+        with_heartbeat(
+            session_event_stream(get_session_event_broker(), session_id, last_event_id), request.is_disconnected
+        ),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive',
+        },
+    )
 
 
 @router.get('/{session_id}', response_model=RetrieveSessionResponseModel)
-async def get_session_by_id(session_id: str, session_service: SessionServiceDependency):
-    session = await session_service.get_session(session_id)
+async def get_session_by_id(
+    session_id: str,
+    session_service: ReadSessionServiceDependency,
+    before: Annotated[int | None, Query(description='Only return turns older than this turn id')] = None,
+    after: Annotated[int | None, Query(description='Only return turns newer than this turn id')] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    include_steps: bool = False,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    # read the version before the body, so the body is never older than the ETag it is sent with
+    cache_version = session_service.response_cache.get_version(session_id)
+    session_version = await session_service.get_session_version(session_id)
+
+    if session_version is None:
+        raise NotFoundError('Session not found')
+
+    variant = (session_version, before, after, limit, include_steps)
+    etag = make_etag(session_id, *variant)
+    if etag_matches(if_none_match, etag):
+        return _not_modified_response(etag)
+
+    response_headers = {'ETag': etag, **_REVALIDATE_HEADERS}
+    response_cache = session_service.response_cache
+    cached_body = response_cache.get(session_id, cache_version, variant)
+    if cached_body is not None:
+        return Response(content=cached_body, media_type='application/json', headers=response_headers)
+
+    summary = await session_service.get_session_summary(session_id)
 
-    if not session:
+    if not summary:
         raise NotFoundError('Session not found')
 
-    return RetrieveSessionResponseModel(
-        id=session.session_id,
-        title=session.title,
-        turns=session.get_turns(),
-        in_progress_query=session.get_in_progress_query(),
+    turns, has_more = await session_service.get_session_turns(
+        session_id, limit=limit, before=before, after=after, include_steps=include_steps
     )
 
+    response = PydanticJSONResponse(
+        RetrieveSessionResponseModel(
+            id=summary.session_id,
+            title=summary.title,
+            turns=turns,
+            in_progress_query=summary.in_progress_query,
+            turn_count=summary.turn_count,
+            has_more=has_more,
+        ),
+        headers=response_headers,
+    )
+    response_cache.put(session_id, cache_version, variant, bytes(response.body))
+
+    return response
+
+
+@router.get('/{session_id}/turns', response_model=SessionTurnDeltaResponseModel)
+async def get_session_turns_since(
+    session_id: str,
+    session_service: ReadSessionServiceDependency,
+    since: Annotated[int, Query(ge=0, description='`version` of the latest delta the client already has')] = 0,
+):
+    delta = await session_service.get_session_turns_since(session_id, since)
+
+    if delta is None:
+        raise NotFoundError('Session not found')
+
+    return PydanticJSONResponse(SessionTurnDeltaResponseModel.from_core(session_id, delta))
+
 
 @router.delete('/{session_id}')
 async def delete_session(session_id: str, session_service: SessionServiceDependency):
@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from starlette import status
 
-from api.http.dependencies.user import UserServiceDependency
+from api.http.dependencies.user import ReadUserServiceDependency, UserServiceDependency
 from api.http.schema.user import CreateUserRequestModel, RetrieveUserModel, UpdateUserRequestModel
 from core.error import NotFoundError
 from core.type import IDType
@@ -17,14 +17,14 @@ async def create_user(request: CreateUserRequestModel, user_service: UserService
 
 
 @router.get('', response_model=list[RetrieveUserModel])
-async def get_all_users(user_service: UserServiceDependency):
+async def get_all_users(user_service: ReadUserServiceDependency):
     users = await user_service.get_all_users()
 
     return [RetrieveUserModel.from_core(user) for user in users]
 
 
 @router.get('/{user_id}', response_model=RetrieveUserModel)
-async def get_user(user_id: IDType, user_service: UserServiceDependency):
+async def get_user(user_id: IDType, user_service: ReadUserServiceDependency):
     user = await user_service.get_user_by_id(user_id)
 
     if not user:
@@ -1,6 +1,6 @@
 from typing import Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class AskAgentRequest(BaseModel):
@@ -16,3 +16,18 @@ class AskAgentResponseStreamChunkModel(BaseModel):
     step_status: Literal['in_progress', 'completed'] | None = None
     done: bool | None = None
     error: str | None = None
+
+
+class AskAgentWebSocketRequestFrame(BaseModel):
+    """
+    Client frame of the multiplexed agent WebSocket.
+
+    `ask` opens stream `stream` for a query with an initial credit of frames, `credit` grants a stream more frames
+    and `cancel` stops receiving a stream while the agent keeps processing, like an SSE client disconnecting.
+    """
+
+    op: Literal['ask', 'credit', 'cancel']
+    stream: int
+    session_id: str | None = None
+    query: str | None = None
+    credit: int = Field(default=0, ge=0)
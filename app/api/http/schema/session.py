@@ -1,6 +1,11 @@
+from datetime import datetime
+from typing import Self
+
 from pydantic import BaseModel, Field
 
-from core.model.session import SessionTurn
+from core.enum.session import MessageRole
+from core.model.session import SessionSearchResult, SessionSummary, SessionTurn, SessionTurnDelta
+from utility.search import make_snippet
 
 
 class CreateSessionRequestModel(BaseModel):
@@ -12,3 +17,71 @@ class RetrieveSessionResponseModel(BaseModel):
     title: str
     turns: list[SessionTurn]
     in_progress_query: str | None = None
+    turn_count: int = 0
+    has_more: bool = False
+
+
+class SessionSummaryResponseModel(BaseModel):
+    id: str
+    title: str
+    turn_count: int
+    updated_at: datetime
+    in_progress_query: str | None = None
+
+    @classmethod
+    def from_core(cls, summary: SessionSummary) -> Self:
+        return cls(
+            id=summary.session_id,
+            title=summary.title,
+            turn_count=summary.turn_count,
+            updated_at=summary.updated_at,
+            in_progress_query=summary.in_progress_query,
+        )
+
+
+class ListSessionsResponseModel(BaseModel):
+    items: list[SessionSummaryResponseModel]
+    next_cursor: str | None = None
+
+
+class SessionTurnDeltaResponseModel(BaseModel):
+    id: str
+    turns: list[SessionTurn]
+    in_progress_query: str | None = None
+    version: int
+
+    @classmethod
+    def from_core(cls, session_id: str, delta: SessionTurnDelta) -> Self:
+        return cls(
+            id=session_id,
+            turns=delta.turns,
+            in_progress_query=delta.in_progress_query,
+            version=delta.version,
+        )
+
+
+class SessionSearchResultResponseModel(BaseModel):
+    session_id: str
+    title: str
+    message_id: int
+    turn_id: int | None = None
+    role: MessageRole
+    snippet: str
+    timestamp: datetime
+
+    @classmethod
+    def from_core(cls, result: SessionSearchResult, terms: list[str]) -> Self:
+        return cls(
+            session_id=result.session_id,
+            title=result.title,
+            message_id=result.message_id,
+            turn_id=result.turn_id,
+            role=result.role,
+            snippet=make_snippet(result.content, terms),
+            timestamp=result.timestamp,
+        )
+
+
+class SearchSessionsResponseModel(BaseModel):
+    items: list[SessionSearchResultResponseModel]
+    next_cursor: str | None = None
@@ -3,6 +3,7 @@ import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from core.enum.logging import LogLevel
+from core.enum.session import SessionRepositoryBackendEnum
 from utility.decorator import singleton
 
 
@@ -28,14 +29,76 @@ class Settings(BaseSettings):
     DB_PASSWORD: str = 'postgres'
     SHOULD_RESET_DATABASE: bool = False
 
+    # connection pool, sized per worker process
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # -1 keeps connections forever
+    DB_STATEMENT_CACHE_SIZE: int = 100  # 0 disables prepared statement caching, e.g. behind pgbouncer
+    # ping connections on every checkout, or set an interval to check liveness periodically instead
+    DB_POOL_PRE_PING: bool = True
+    DB_LIVENESS_CHECK_INTERVAL_SECONDS: float | None = None
+
+    # optional read replica with the same credentials and database name, serving read-only routes
+    DB_REPLICA_HOST: str | None = None
+    DB_REPLICA_PORT: int | None = None
+
+    # path of an embedded SQLite database storing sessions and users instead of PostgreSQL, for single-node installs
+    SQLITE_DATABASE_PATH: str | None = None
+
+    # how sessions are read and written: through the ORM, with hand-written SQL on the asyncpg driver, or in memory
+    SESSION_REPOSITORY_BACKEND: SessionRepositoryBackendEnum = SessionRepositoryBackendEnum.ORM
+
+    # directory persisting in-memory sessions as a change log plus a snapshot written after every so many changes;
+    # without it in-memory sessions are lost on restart
+    SESSION_MEMORY_DATA_DIR: str | None = None
+    SESSION_MEMORY_SNAPSHOT_EVERY: int = 10_000
+
+    # optional session shards as a JSON object of shard name to database URL, replacing the main database for sessions;
+    # shard names decide the placement of sessions, so renaming a shard requires a rebalance
+    SESSION_SHARDS: dict[str, str] = {}
+
     @property
     def DATABASE_URL(self) -> str:
         """Construct database URL from individual components."""
         return f'postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}'
 
+    @property
+    def DATABASE_REPLICA_URL(self) -> str | None:
+        """Construct the read replica database URL, if a replica is configured."""
+        if self.DB_REPLICA_HOST is None:
+            return None
+        port = self.DB_REPLICA_PORT or self.DB_PORT
+        return f'postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_REPLICA_HOST}:{port}/{self.DB_NAME}'
+
     MAX_SESSION_CONTEXT_TURNS: int = 5
     SESSION_CLEANUP_HOURS: int = 1
 
+    # retention of old sessions, disabled unless an age or a count limit is set
+    SESSION_RETENTION_DAYS: int | None = None
+    SESSION_RETENTION_MAX_SESSIONS: int | None = None
+    SESSION_RETENTION_BATCH_SIZE: int = 500
+    SESSION_RETENTION_BATCH_PAUSE_SECONDS: float = 1.0
+    SESSION_RETENTION_INTERVAL_SECONDS: int = 3600
+
+    # archival of PostgreSQL sessions not updated for this many days into a compressed, partitioned archive, which
+    # keeps serving them; disabled unless set, and archived sessions are only served while it is set
+    SESSION_ARCHIVE_AFTER_DAYS: int | None = None
+    SESSION_ARCHIVE_BATCH_SIZE: int = 200
+    SESSION_ARCHIVE_BATCH_PAUSE_SECONDS: float = 1.0
+    SESSION_ARCHIVE_INTERVAL_SECONDS: int = 3600
+
+    # idle server-sent event streams send a comment this often, and check for a gone client more often than that
+    SSE_HEARTBEAT_INTERVAL_SECONDS: float = 15.0
+    SSE_DISCONNECT_CHECK_INTERVAL_SECONDS: float = 2.0
+
+    # group commit of message appends: wait up to this long to batch appends into one transaction, unset disables it
+    SESSION_WRITE_BUFFER_MAX_DELAY_SECONDS: float | None = None
+    SESSION_WRITE_BUFFER_MAX_BATCH_SIZE: int = 256
+
+    # total size of the rendered session responses kept in memory, 0 disables the cache
+    SESSION_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+
 
 _settings = Settings()
 
@@ -48,11 +111,38 @@ DB_NAME = _settings.DB_NAME
 DB_USER = _settings.DB_USER
 DB_PASSWORD = _settings.DB_PASSWORD
 DATABASE_URL = _settings.DATABASE_URL
+DATABASE_REPLICA_URL = _settings.DATABASE_REPLICA_URL
 SHOULD_RESET_DATABASE = _settings.SHOULD_RESET_DATABASE
+SQLITE_DATABASE_PATH = _settings.SQLITE_DATABASE_PATH
+SESSION_REPOSITORY_BACKEND = _settings.SESSION_REPOSITORY_BACKEND
+SESSION_MEMORY_DATA_DIR = _settings.SESSION_MEMORY_DATA_DIR
+SESSION_MEMORY_SNAPSHOT_EVERY = _settings.SESSION_MEMORY_SNAPSHOT_EVERY
+SESSION_SHARDS = _settings.SESSION_SHARDS
+DB_POOL_SIZE = _settings.DB_POOL_SIZE
+DB_MAX_OVERFLOW = _settings.DB_MAX_OVERFLOW
+DB_POOL_TIMEOUT_SECONDS = _settings.DB_POOL_TIMEOUT_SECONDS
+DB_POOL_RECYCLE_SECONDS = _settings.DB_POOL_RECYCLE_SECONDS
+DB_STATEMENT_CACHE_SIZE = _settings.DB_STATEMENT_CACHE_SIZE
+DB_POOL_PRE_PING = _settings.DB_POOL_PRE_PING
+DB_LIVENESS_CHECK_INTERVAL_SECONDS = _settings.DB_LIVENESS_CHECK_INTERVAL_SECONDS
 XAI_API_KEY = _settings.XAI_API_KEY
 BRAVE_SEARCH_API_KEY = _settings.BRAVE_SEARCH_API_KEY
 MAX_SESSION_CONTEXT_TURNS = _settings.MAX_SESSION_CONTEXT_TURNS
 SESSION_CLEANUP_HOURS = _settings.SESSION_CLEANUP_HOURS
+SESSION_RETENTION_DAYS = _settings.SESSION_RETENTION_DAYS
+SESSION_RETENTION_MAX_SESSIONS = _settings.SESSION_RETENTION_MAX_SESSIONS
+SESSION_RETENTION_BATCH_SIZE = _settings.SESSION_RETENTION_BATCH_SIZE
+SESSION_RETENTION_BATCH_PAUSE_SECONDS = _settings.SESSION_RETENTION_BATCH_PAUSE_SECONDS
+SESSION_RETENTION_INTERVAL_SECONDS = _settings.SESSION_RETENTION_INTERVAL_SECONDS
+SESSION_ARCHIVE_AFTER_DAYS = _settings.SESSION_ARCHIVE_AFTER_DAYS
+SESSION_ARCHIVE_BATCH_SIZE = _settings.SESSION_ARCHIVE_BATCH_SIZE
+SESSION_ARCHIVE_BATCH_PAUSE_SECONDS = _settings.SESSION_ARCHIVE_BATCH_PAUSE_SECONDS
+SESSION_ARCHIVE_INTERVAL_SECONDS = _settings.SESSION_ARCHIVE_INTERVAL_SECONDS
+SESSION_CACHE_MAX_BYTES = _settings.SESSION_CACHE_MAX_BYTES
+SESSION_WRITE_BUFFER_MAX_DELAY_SECONDS = _settings.SESSION_WRITE_BUFFER_MAX_DELAY_SECONDS
+SESSION_WRITE_BUFFER_MAX_BATCH_SIZE = _settings.SESSION_WRITE_BUFFER_MAX_BATCH_SIZE
+SSE_HEARTBEAT_INTERVAL_SECONDS = _settings.SSE_HEARTBEAT_INTERVAL_SECONDS
+SSE_DISCONNECT_CHECK_INTERVAL_SECONDS = _settings.SSE_DISCONNECT_CHECK_INTERVAL_SECONDS
 
 BUILD_VERSION = (
     _settings.APP_VERSION if _settings.COMMIT_HASH is None else f'{_settings.APP_VERSION}_{_settings.COMMIT_HASH}'
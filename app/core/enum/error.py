@@ -7,6 +7,7 @@ class ErrorCode(IntEnum):
     CORE_1001_NOT_IMPLEMENTED = 1001
     CORE_1002_NOT_FOUND = 1002
     CORE_1003_DUPLICATE_ERROR = 1003
+    CORE_1004_INVALID_ARGUMENT = 1004
 
     # API Error
     API_2000_REQUEST_VALIDATION_FAILED = 2000
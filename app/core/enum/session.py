@@ -1,6 +1,21 @@
-from enum import Enum
+from enum import Enum, StrEnum
 
 
 class MessageRole(str, Enum):
     USER = 'user'
     ASSISTANT = 'assistant'
+
+
+class SessionEventTypeEnum(StrEnum):
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    AGENT_STARTED = 'agent_started'
+    AGENT_FINISHED = 'agent_finished'
+    RESET = 'reset'  # events were missed or sessions were removed in bulk, clients should refetch
+
+
+class SessionRepositoryBackendEnum(StrEnum):
+    ORM = 'orm'  # SQLAlchemy ORM on PostgreSQL
+    ASYNCPG = 'asyncpg'  # hand-written SQL on the asyncpg driver, sharing the connection pool of the ORM
+    MEMORY = 'memory'  # process memory of a single node, optionally persisted to local files
@@ -8,3 +8,9 @@ class DuplicateError(Exception):
     """Exception raised when a resource already exists"""
 
     pass
+
+
+class InvalidArgumentError(Exception):
+    """Exception raised when a request argument is malformed"""
+
+    pass
@@ -6,7 +6,7 @@ from uuid import uuid4
 
 from pydantic import BaseModel, Field
 
-from core.enum.session import MessageRole
+from core.enum.session import MessageRole, SessionEventTypeEnum
 
 
 class ProcessingStep(BaseModel):
@@ -16,6 +16,7 @@ class ProcessingStep(BaseModel):
 
 
 class Message(BaseModel):
+    id: int | None = None  # should be set by the repository
     role: MessageRole
     content: str
     timestamp: datetime = Field(default_factory=lambda: datetime.now(UTC))
@@ -23,6 +24,7 @@ class Message(BaseModel):
 
 
 class SessionTurn(BaseModel):
+    id: int | None = None  # id of the assistant message that completes the turn, used as the turn cursor
     query: str
     response: str
     timestamp: str
@@ -30,6 +32,118 @@ class SessionTurn(BaseModel):
     steps: list[ProcessingStep] = Field(default_factory=list)
 
 
+def build_session_turns(messages: list[Message]) -> list[SessionTurn]:
+    """Pair each assistant message with the user message right before it, in message order."""
+    turns: list[SessionTurn] = []
+    current_query: str | None = None
+    current_timestamp: datetime | None = None
+
+    for message in messages:
+        if message.role == MessageRole.USER:
+            current_query = message.content
+            current_timestamp = message.timestamp
+        elif message.role == MessageRole.ASSISTANT and current_query is not None:
+            turns.append(
+                SessionTurn(
+                    id=message.id,
+                    query=current_query,
+                    response=message.content,
+                    timestamp=(current_timestamp or message.timestamp).isoformat(),
+                    sources=[],
+                    steps=message.steps,
+                )
+            )
+            current_query = None
+            current_timestamp = None
+
+    return turns
+
+
+class SessionTurnDelta(BaseModel):
+    """Turns completed after a session version, with the session version they were read at."""
+
+    turns: list[SessionTurn] = Field(default_factory=list)
+    in_progress_query: str | None = None
+    version: int = 0  # id of the latest message in the session, the `since` of the next delta
+
+    @classmethod
+    def from_messages(cls, messages: list[Message], since: int) -> 'SessionTurnDelta':
+        """
+        Build a delta from the messages newer than the `since` version, in message order.
+
+        The messages should start with the latest message at or before `since`, if there is one: while a query is in
+        progress the version is the id of its user message, and the answer added later is only a turn paired with it.
+        """
+        if not messages:
+            return cls(version=since)
+
+        last_message = messages[-1]
+        return cls(
+            turns=[turn for turn in build_session_turns(messages) if turn.id is not None and turn.id > since],
+            in_progress_query=last_message.content if last_message.role == MessageRole.USER else None,
+            version=max(since, last_message.id or 0),
+        )
+
+
+class SessionSummary(BaseModel):
+    session_id: str
+    title: str
+    turn_count: int
+    updated_at: datetime
+    in_progress_query: str | None = None
+
+
+class SessionListCursor(BaseModel):
+    """Keyset position in the session list, ordered by `updated_at` then `session_id`, both descending."""
+
+    updated_at: datetime
+    session_id: str
+
+
+class SessionSearchResult(BaseModel):
+    """A message matching a search, with the references needed to open it within its session."""
+
+    session_id: str
+    title: str
+    message_id: int
+    turn_id: int | None = None  # turn cursor: the message itself if it answers a query, else the answer to it if any
+    role: MessageRole
+    content: str
+    timestamp: datetime
+    rank: float  # relevance to the query, higher is better; only comparable between results of the same backend
+
+
+class SessionSearchCursor(BaseModel):
+    """
+    Keyset position in search results, ordered by `rank`, then `message_id`, then `session_id`, all descending.
+
+    Message ids alone tell apart the results of a single database, the session id only those of different shards.
+    """
+
+    rank: float
+    message_id: int
+    session_id: str
+
+
+class SessionEvent(BaseModel):
+    """Change to a session, pushed to clients instead of having them poll."""
+
+    id: int = 0  # sequence number assigned by the event broker
+    type: SessionEventTypeEnum
+    session_id: str | None = None  # None for events concerning every session
+    title: str | None = None
+    in_progress_query: str | None = None
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
+class SessionListVersion(BaseModel):
+    """State of the whole session list, changing whenever a session is created, updated, imported or deleted."""
+
+    # counts the changes that leave `updated_at` as it is: deletions, and imports of sessions updated long ago
+    generation: int = 0
+    updated_at: datetime | None = None  # update time of the most recently updated session
+
+
 class Session(BaseModel):
     session_id: str = Field(default_factory=lambda: str(uuid4()))
     title: str
@@ -37,9 +151,15 @@ class Session(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
-    def add_message(self, role: MessageRole, content: str, steps: list[ProcessingStep] | None = None) -> None:
+    def add_message(
+        self,
+        role: MessageRole,
+        content: str,
+        steps: list[ProcessingStep] | None = None,
+        message_id: int | None = None,
+    ) -> None:
         """Add a message to the session."""
-        self.messages.append(Message(role=role, content=content, steps=steps or []))
+        self.messages.append(Message(id=message_id, role=role, content=content, steps=steps or []))
         self.updated_at = datetime.now(UTC)
 
     def get_recent_messages(self, max_turns: int = 5) -> list[Message]:
@@ -62,28 +182,54 @@ class Session(BaseModel):
         Returns:
             List of session turns with query-response pairs
         """
-        turns: list[SessionTurn] = []
-        current_query: str | None = None
-        current_timestamp: datetime | None = None
-
-        for message in self.messages:
-            if message.role == MessageRole.USER:
-                current_query = message.content
-                current_timestamp = message.timestamp
-            elif message.role == MessageRole.ASSISTANT and current_query is not None:
-                turns.append(
-                    SessionTurn(
-                        query=current_query,
-                        response=message.content,
-                        timestamp=(current_timestamp or message.timestamp).isoformat(),
-                        sources=[],
-                        steps=message.steps,
-                    )
-                )
-                current_query = None
-                current_timestamp = None
+        return build_session_turns(self.messages)
+
+    def get_turn_window(
+        self,
+        limit: int,
+        before: int | None = None,
+        after: int | None = None,
+        include_steps: bool = False,
+    ) -> list[SessionTurn]:
+        """
+        Get a window of turns bounded by turn cursors.
 
-        return turns
+        Args:
+            limit: Maximum number of turns to return
+            before: Only include turns with an id lower than this cursor
+            after: Only include turns with an id higher than this cursor
+            include_steps: Whether to keep the processing steps of each turn
+
+        Returns:
+            Turns in chronological order; the newest turns of the window unless only `after` is given,
+            in which case the oldest turns following the cursor are returned
+        """
+        turns = [
+            turn
+            for turn in self.get_turns()
+            if turn.id is not None and (before is None or turn.id < before) and (after is None or turn.id > after)
+        ]
+        if after is not None and before is None:
+            turns = turns[:limit]
+        else:
+            turns = turns[-limit:] if limit > 0 else []
+
+        if include_steps:
+            return turns
+        return [turn.model_copy(update={'steps': []}) for turn in turns]
+
+    def get_turns_since(self, since: int) -> SessionTurnDelta:
+        """Get the turns completed after the `since` version, as returned by an earlier delta."""
+        start = next(
+            (index for index, message in enumerate(self.messages) if message.id is not None and message.id > since),
+            len(self.messages),
+        )
+        # from the last message at or before the version, which may be the query of the first new turn
+        return SessionTurnDelta.from_messages(self.messages[max(0, start - 1) :], since)
+
+    def get_version(self) -> int:
+        """Get the id of the latest message, which changes whenever the session does."""
+        return max((message.id or 0 for message in self.messages), default=0)
 
     def get_in_progress_query(self) -> str | None:
         if not self.messages:
@@ -94,3 +240,12 @@ class Session(BaseModel):
             return last_message.content
 
         return None
+
+    def to_summary(self) -> SessionSummary:
+        return SessionSummary(
+            session_id=self.session_id,
+            title=self.title,
+            turn_count=len(self.get_turns()),
+            updated_at=self.updated_at,
+            in_progress_query=self.get_in_progress_query(),
+        )
@@ -1,20 +1,72 @@
+from collections.abc import AsyncIterator
+from datetime import datetime
 from typing import Protocol
 
 from core.enum.session import MessageRole
-from core.model.session import Message, ProcessingStep, Session
+from core.model.session import (
+    Message,
+    ProcessingStep,
+    Session,
+    SessionListCursor,
+    SessionListVersion,
+    SessionSearchCursor,
+    SessionSearchResult,
+    SessionSummary,
+    SessionTurn,
+    SessionTurnDelta,
+)
 
 
 class SessionRepositoryProtocol(Protocol):
     async def create_session(self, title: str, session_id: str | None = None) -> Session: ...
 
+    async def import_session(self, session: Session) -> bool: ...
+
+    async def import_sessions(self, sessions: list[Session]) -> int: ...
+
     async def get_session(self, session_id: str) -> Session | None: ...
 
+    async def get_session_summary(self, session_id: str) -> SessionSummary | None: ...
+
+    async def get_session_version(self, session_id: str) -> int | None: ...
+
+    async def get_session_list_version(self) -> SessionListVersion: ...
+
+    async def count_sessions(self) -> int: ...
+
+    async def get_session_turns(
+        self,
+        session_id: str,
+        limit: int,
+        before: int | None = None,
+        after: int | None = None,
+        include_steps: bool = False,
+    ) -> list[SessionTurn]: ...
+
+    async def get_session_turns_since(self, session_id: str, since: int) -> SessionTurnDelta | None: ...
+
     async def add_message(
         self, session_id: str, role: MessageRole, content: str, steps: list[ProcessingStep] | None = None
     ) -> None: ...
 
     async def get_recent_messages(self, session_id: str, max_turns: int = 5) -> list[Message]: ...
 
-    async def get_all_sessions(self) -> list[Session]: ...
+    async def add_user_message_and_get_recent_messages(
+        self, session_id: str, content: str, max_turns: int = 5
+    ) -> list[Message]: ...
+
+    async def get_session_summaries(
+        self, limit: int, cursor: SessionListCursor | None = None
+    ) -> list[SessionSummary]: ...
+
+    def iter_sessions(self, batch_size: int = 100) -> AsyncIterator[Session]: ...
+
+    async def search_messages(
+        self, query: str, limit: int, cursor: SessionSearchCursor | None = None
+    ) -> list[SessionSearchResult]: ...
 
     async def delete_session(self, session_id: str) -> bool: ...
+
+    async def delete_expired_sessions(
+        self, updated_before: datetime | None = None, keep_latest: int | None = None, limit: int = 500
+    ) -> int: ...
@@ -0,0 +1,167 @@
+import logging
+import mmap
+import os
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from pydantic_core import from_json, to_json
+
+from core.model.session import Message, Session
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE_NAME = 'sessions.snapshot'
+LOG_FILE_NAME = 'sessions.log'
+
+
+def _read_lines(path: Path) -> Iterator[tuple[int, bytes]]:
+    """Yield the end offset and content of every line of a file, read through a memory map."""
+    if not path.exists() or path.stat().st_size == 0:
+        return
+
+    with path.open('rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        for line in iter(mapped_file.readline, b''):
+            yield mapped_file.tell(), line
+
+
+class SessionJournal:
+    """
+    Durable storage of the in-memory session repository: a snapshot of every session plus a log of the changes
+    made since, both newline-delimited JSON files in `data_dir`.
+
+    Appends only queue a record in memory; `write_records` and `write_snapshot` do the file work and are meant to
+    run in a thread, off the event loop. Records are flushed to the operating system but not synced, so a crash loses
+    at most the records that were still queued; snapshots are synced before they replace the previous one.
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path = self.data_dir / SNAPSHOT_FILE_NAME
+        self.log_path = self.data_dir / LOG_FILE_NAME
+        self.log_record_count = 0  # written and queued records since the last snapshot
+        self._pending_records: list[bytes] = []
+        self._log_file = None
+
+    def load(self) -> tuple[dict[str, Session], int]:
+        """
+        Load the latest snapshot and replay the log on top of it.
+
+        Returns:
+            The sessions by session id, and the next message id to assign
+        """
+        sessions: dict[str, Session] = {}
+        next_message_id = 1
+        for index, (_, line) in enumerate(_read_lines(self.snapshot_path)):
+            if index == 0:
+                next_message_id = from_json(line)['next_message_id']
+                continue
+            session = Session.model_validate_json(line)
+            sessions[session.session_id] = session
+
+        valid_log_size = 0
+        for offset, line in _read_lines(self.log_path):
+            try:
+                record = from_json(line)
+            except ValueError:
+                # only the last line can be torn, by a crash in the middle of an append
+                logger.warning(f'Dropping an incomplete record at the end of {self.log_path}')
+                break
+            next_message_id = max(next_message_id, self._replay(sessions, record))
+            valid_log_size = offset
+            self.log_record_count += 1
+
+        if self.log_path.exists() and self.log_path.stat().st_size > valid_log_size:
+            os.truncate(self.log_path, valid_log_size)
+        self._log_file = self.log_path.open('ab')
+        return sessions, next_message_id
+
+    @staticmethod
+    def _replay(sessions: dict[str, Session], record: dict[str, Any]) -> int:
+        """Apply a log record, returning the next message id it implies."""
+        # records may already be part of the snapshot if the process stopped between writing it and clearing the
+        # log, so replaying has to be idempotent
+        match record['op']:
+            case 'put':
+                session = Session.model_validate(record['session'])
+                sessions[session.session_id] = session
+                return max((message.id or 0 for message in session.messages), default=0) + 1
+            case 'message':
+                message = Message.model_validate(record['message'])
+                session = sessions.get(record['session_id'])
+                if session is not None and message.id > session.get_version():
+                    session.messages.append(message)
+                    session.updated_at = datetime.fromisoformat(record['updated_at'])
+                return message.id + 1
+            case 'delete':
+                for session_id in record['session_ids']:
+                    sessions.pop(session_id, None)
+        return 1
+
+    def append_put(self, session: Session) -> None:
+        self._append({'op': 'put', 'session': session.model_dump(mode='json')})
+
+    def append_message(self, session: Session, message: Message) -> None:
+        self._append(
+            {
+                'op': 'message',
+                'session_id': session.session_id,
+                'message': message.model_dump(mode='json'),
+                'updated_at': session.updated_at.isoformat(),
+            }
+        )
+
+    def append_delete(self, session_ids: list[str]) -> None:
+        self._append({'op': 'delete', 'session_ids': session_ids})
+
+    def _append(self, record: dict[str, Any]) -> None:
+        if self._log_file is None:
+            raise RuntimeError('The session journal has to be loaded before it is written to')
+        self._pending_records.append(to_json(record) + b'\n')
+        self.log_record_count += 1
+
+    @property
+    def has_pending_records(self) -> bool:
+        return bool(self._pending_records)
+
+    def take_pending_records(self) -> list[bytes]:
+        """Take the queued records, to write them to the log or to drop them because a snapshot includes them."""
+        records, self._pending_records = self._pending_records, []
+        return records
+
+    def start_snapshot(self) -> list[bytes]:
+        """Take the queued records for a snapshot that already includes them, and count the log from zero again."""
+        self.log_record_count = 0
+        return self.take_pending_records()
+
+    def requeue_records(self, records: list[bytes]) -> None:
+        """Queue records again, ahead of the ones appended since, after they could not be written."""
+        self._pending_records[:0] = records
+
+    def write_records(self, records: list[bytes]) -> None:
+        """Append taken records to the log."""
+        self._log_file.write(b''.join(records))
+        self._log_file.flush()
+
+    def write_snapshot(self, sessions: Iterable[Session], next_message_id: int) -> None:
+        """Replace the snapshot with the given sessions and clear the log they include."""
+        temporary_path = self.snapshot_path.with_suffix('.tmp')
+        with temporary_path.open('wb') as file:
+            # the first line is a header, every other line a session
+            file.write(to_json({'next_message_id': next_message_id}) + b'\n')
+            for session in sessions:
+                file.write(session.model_dump_json().encode() + b'\n')
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.snapshot_path)
+
+        if self._log_file is not None:
+            self._log_file.close()
+        self._log_file = self.log_path.open('wb')
+
+    def close(self) -> None:
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
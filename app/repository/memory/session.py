@@ -1,27 +1,202 @@
+import asyncio
+import heapq
+import logging
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+from config.settings import SESSION_MEMORY_DATA_DIR, SESSION_MEMORY_SNAPSHOT_EVERY
 from core.enum.session import MessageRole
-from core.model.session import Message, ProcessingStep, Session
+from core.model.session import (
+    Message,
+    ProcessingStep,
+    Session,
+    SessionListCursor,
+    SessionListVersion,
+    SessionSearchCursor,
+    SessionSearchResult,
+    SessionSummary,
+    SessionTurn,
+    SessionTurnDelta,
+)
 from core.protocol.repository.session import SessionRepositoryProtocol
+from utility.search import get_search_terms, get_words
+
+from .journal import SessionJournal
+
+logger = logging.getLogger(__name__)
+
+_IndexKey = tuple[datetime, str]
 
 
 class InMemorySessionRepository(SessionRepositoryProtocol):
-    def __init__(self):
+    """
+    Sessions kept in process memory, listed through an index kept sorted by `updated_at` then `session_id`, so a
+    page of the session list costs a binary search plus the page itself instead of sorting every session.
+
+    With a `data_dir`, every change is also appended to a log there and all sessions are written to a snapshot after
+    every `snapshot_every` changes, so the sessions survive restarts. Both are written by a background task in a
+    thread, never by the request making the change.
+    """
+
+    def __init__(self, data_dir: str | None = None, snapshot_every: int = 10_000):
         self._sessions: dict[str, Session] = {}
+        self._next_message_id = 1
+        self._index: list[_IndexKey] = []  # ascending
+        # counts deletions and imports; starts from the clock so a restart never serves an earlier list version again
+        self._list_generation = time.time_ns()
+        self._snapshot_every = snapshot_every
+        self._journal = SessionJournal(data_dir) if data_dir else None
+        self._journal_writer: asyncio.Task | None = None
+
+        if self._journal is not None:
+            self._sessions, self._next_message_id = self._journal.load()
+            self._index = sorted((s.updated_at, s.session_id) for s in self._sessions.values())
+
+    def _put(self, session: Session) -> None:
+        replaced_session = self._sessions.get(session.session_id)
+        if replaced_session is not None:
+            del self._index[bisect_left(self._index, (replaced_session.updated_at, replaced_session.session_id))]
+        insort(self._index, (session.updated_at, session.session_id))
+        self._sessions[session.session_id] = session
+        if self._journal is not None:
+            self._journal.append_put(session)
+            self._schedule_journal_write()
+
+    def _remove(self, session_ids: list[str]) -> None:
+        for session_id in session_ids:
+            session = self._sessions.pop(session_id)
+            del self._index[bisect_left(self._index, (session.updated_at, session.session_id))]
+        if session_ids:
+            self._list_generation += 1
+        if self._journal is not None and session_ids:
+            self._journal.append_delete(session_ids)
+            self._schedule_journal_write()
+
+    def _schedule_journal_write(self) -> None:
+        # a single writer, so records reach the log in order and never interleave with a snapshot
+        if self._journal_writer is None or self._journal_writer.done():
+            self._journal_writer = asyncio.create_task(self._write_journal())
+
+    async def _write_journal(self) -> None:
+        try:
+            while self._journal.has_pending_records:
+                if self._journal.log_record_count >= self._snapshot_every:
+                    await self._write_snapshot()
+                    continue
+
+                records = self._journal.take_pending_records()
+                try:
+                    await asyncio.to_thread(self._journal.write_records, records)
+                except Exception:
+                    self._journal.requeue_records(records)
+                    raise
+        except Exception as e:
+            # the records stay queued, and the next change tries again
+            logger.error(f'Failed to write the session journal: {e}', exc_info=True)
+
+    async def _write_snapshot(self) -> None:
+        # sessions only ever get messages appended, so copying them down to their message lists gives the thread a
+        # consistent view while requests keep changing the sessions
+        sessions = [s.model_copy(update={'messages': list(s.messages)}) for s in self._sessions.values()]
+        # records queued from here on are not in the view; they stay queued until the new snapshot is in place
+        records = self._journal.start_snapshot()
+        try:
+            await asyncio.to_thread(self._journal.write_snapshot, sessions, self._next_message_id)
+        except Exception:
+            # the previous snapshot and its log are still in place, so the records have to go to that log
+            self._journal.requeue_records(records)
+            raise
+
+    async def flush(self) -> None:
+        """Wait until every change made so far is written to the log or a snapshot."""
+        if self._journal_writer is not None:
+            await asyncio.shield(self._journal_writer)
+
+    async def close(self) -> None:
+        """Write a final snapshot so the next start has no log to replay."""
+        if self._journal is not None:
+            await self.flush()
+            await self._write_snapshot()
+            self._journal.close()
 
     async def create_session(self, title: str, session_id: str | None = None) -> Session:
         session = Session(session_id=session_id, title=title) if session_id else Session(title=title)
-        self._sessions[session.session_id] = session
+        self._put(session)
         return session
 
+    async def import_session(self, session: Session) -> bool:
+        return await self.import_sessions([session]) == 1
+
+    async def import_sessions(self, sessions: list[Session]) -> int:
+        imported_count = 0
+        for session in sessions:
+            if session.session_id in self._sessions:
+                continue
+
+            messages = []
+            for message in session.messages:
+                messages.append(message.model_copy(update={'id': self._next_message_id}))
+                self._next_message_id += 1
+            self._put(session.model_copy(update={'messages': messages}))
+            imported_count += 1
+        if imported_count:
+            self._list_generation += 1
+        return imported_count
+
     async def get_session(self, session_id: str) -> Session | None:
         return self._sessions.get(session_id)
 
+    async def get_session_summary(self, session_id: str) -> SessionSummary | None:
+        session = self._sessions.get(session_id)
+        return session.to_summary() if session else None
+
+    async def get_session_version(self, session_id: str) -> int | None:
+        session = self._sessions.get(session_id)
+        return session.get_version() if session else None
+
+    async def get_session_list_version(self) -> SessionListVersion:
+        return SessionListVersion(
+            generation=self._list_generation,
+            updated_at=self._index[-1][0] if self._index else None,
+        )
+
+    async def count_sessions(self) -> int:
+        return len(self._sessions)
+
+    async def get_session_turns(
+        self,
+        session_id: str,
+        limit: int,
+        before: int | None = None,
+        after: int | None = None,
+        include_steps: bool = False,
+    ) -> list[SessionTurn]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return []
+        return session.get_turn_window(limit, before=before, after=after, include_steps=include_steps)
+
+    async def get_session_turns_since(self, session_id: str, since: int) -> SessionTurnDelta | None:
+        session = self._sessions.get(session_id)
+        return session.get_turns_since(since) if session else None
+
     async def add_message(
         self, session_id: str, role: MessageRole, content: str, steps: list[ProcessingStep] | None = None
     ) -> None:
         session = self._sessions.get(session_id)
         if session is None:
             raise KeyError(f'Session {session_id} not found')
-        session.add_message(role=role, content=content, steps=steps)
+
+        del self._index[bisect_left(self._index, (session.updated_at, session.session_id))]
+        session.add_message(role=role, content=content, steps=steps, message_id=self._next_message_id)
+        insort(self._index, (session.updated_at, session.session_id))
+        self._next_message_id += 1
+        if self._journal is not None:
+            self._journal.append_message(session, session.messages[-1])
+            self._schedule_journal_write()
 
     async def get_recent_messages(self, session_id: str, max_turns: int = 5) -> list[Message]:
         session = self._sessions.get(session_id)
@@ -29,11 +204,96 @@ class InMemorySessionRepository(SessionRepositoryProtocol):
             return []
         return session.get_recent_messages(max_turns=max_turns)
 
-    async def get_all_sessions(self) -> list[Session]:
-        return sorted(self._sessions.values(), key=lambda s: s.updated_at, reverse=True)
+    async def add_user_message_and_get_recent_messages(
+        self, session_id: str, content: str, max_turns: int = 5
+    ) -> list[Message]:
+        await self.add_message(session_id, MessageRole.USER, content)
+        return await self.get_recent_messages(session_id, max_turns=max_turns)
+
+    async def get_session_summaries(self, limit: int, cursor: SessionListCursor | None = None) -> list[SessionSummary]:
+        end = len(self._index) if cursor is None else bisect_left(self._index, (cursor.updated_at, cursor.session_id))
+        page = self._index[max(0, end - limit) : end] if limit > 0 else []
+        return [self._sessions[session_id].to_summary() for _, session_id in reversed(page)]
+
+    async def iter_sessions(self, batch_size: int = 100) -> AsyncIterator[Session]:
+        # the sessions are already in memory, so there is nothing to batch; the list only protects the iteration from
+        # sessions added or removed meanwhile
+        for session in list(self._sessions.values()):
+            yield session
+
+    async def search_messages(
+        self, query: str, limit: int, cursor: SessionSearchCursor | None = None
+    ) -> list[SessionSearchResult]:
+        terms = get_search_terms(query)
+        if not terms:
+            return []
+
+        # a scan of every message, ranked by how often the terms occur; there is no stemming
+        results = []
+        for session in self._sessions.values():
+            for index, message in enumerate(session.messages):
+                word_counts = Counter(get_words(message.content))
+                if not all(term in word_counts for term in terms):
+                    continue
+
+                rank = float(sum(word_counts[term] for term in terms))
+                if cursor is not None and (rank, message.id) >= (cursor.rank, cursor.message_id):
+                    continue
+
+                next_message = session.messages[index + 1] if index + 1 < len(session.messages) else None
+                if message.role == MessageRole.ASSISTANT:
+                    turn_id = message.id
+                elif next_message is not None and next_message.role == MessageRole.ASSISTANT:
+                    turn_id = next_message.id
+                else:
+                    turn_id = None
+
+                results.append(
+                    SessionSearchResult(
+                        session_id=session.session_id,
+                        title=session.title,
+                        message_id=message.id,
+                        turn_id=turn_id,
+                        role=message.role,
+                        content=message.content,
+                        timestamp=message.timestamp,
+                        rank=rank,
+                    )
+                )
+
+        return heapq.nlargest(limit, results, key=lambda result: (result.rank, result.message_id))
 
     async def delete_session(self, session_id: str) -> bool:
         if session_id in self._sessions:
-            del self._sessions[session_id]
+            self._remove([session_id])
             return True
         return False
+
+    async def delete_expired_sessions(
+        self, updated_before: datetime | None = None, keep_latest: int | None = None, limit: int = 500
+    ) -> int:
+        over_count = max(0, len(self._index) - keep_latest) if keep_latest is not None else 0
+
+        # the index is oldest first, so the expired sessions are a prefix of it
+        expired_ids = []
+        for index, (updated_at, session_id) in enumerate(self._index):
+            if len(expired_ids) >= limit:
+                break
+            if index >= over_count and (updated_before is None or updated_at >= updated_before):
+                break
+            expired_ids.append(session_id)
+        self._remove(expired_ids)
+        return len(expired_ids)
+
+
+_memory_session_repository: InMemorySessionRepository | None = None
+
+
+def get_memory_session_repository() -> InMemorySessionRepository:
+    """Get or create the global in-memory session repository, loading the persisted sessions on creation."""
+    global _memory_session_repository
+    if _memory_session_repository is None:
+        _memory_session_repository = InMemorySessionRepository(
+            data_dir=SESSION_MEMORY_DATA_DIR, snapshot_every=SESSION_MEMORY_SNAPSHOT_EVERY
+        )
+    return _memory_session_repository
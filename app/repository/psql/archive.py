@@ -0,0 +1,507 @@
+import heapq
+import zlib
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+from typing import Any
+
+from pydantic_core import from_json, to_json
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    bindparam,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.enum.session import MessageRole
+from core.model.session import (
+    Message,
+    Session,
+    SessionListCursor,
+    SessionListVersion,
+    SessionSearchCursor,
+    SessionSearchResult,
+    SessionSummary,
+)
+
+from .model import (
+    MESSAGE_SEARCH_VECTOR,
+    SEARCH_TEXT_CONFIG,
+    DbMessage,
+    DbSession,
+    DbSessionArchive,
+    DbSessionListState,
+    steps_to_json,
+)
+
+# arbitrary key for the advisory lock that keeps concurrent archival jobs from creating the same partition
+_PARTITION_LOCK_KEY = 70860032
+
+
+def _compress_messages(messages: list[Message]) -> bytes:
+    return zlib.compress(to_json(messages))
+
+
+def _decompress_messages(data: bytes) -> list[dict[str, Any]]:
+    return from_json(zlib.decompress(data))
+
+
+def _get_search_text(messages: list[Message]) -> str:
+    return '\n'.join(message.content for message in messages)
+
+
+def _to_search_vector(search_text: ColumnElement[str]) -> ColumnElement[str]:
+    # the same configuration as the message content index, so archived and live messages match the same queries
+    return func.to_tsvector(literal_column(f"'{SEARCH_TEXT_CONFIG}'::regconfig"), search_text)
+
+
+# ranks the messages of archived sessions like live ones, with the contents as an array parameter
+_RANK_MESSAGES = f"""
+SELECT position, ts_rank_cd({MESSAGE_SEARCH_VECTOR}, query) AS rank
+FROM unnest(CAST(:contents AS TEXT[])) WITH ORDINALITY AS messages(content, position),
+    plainto_tsquery('{SEARCH_TEXT_CONFIG}', :query) query
+WHERE {MESSAGE_SEARCH_VECTOR} @@ query
+"""
+
+
+def _get_month_start(value: datetime) -> datetime:
+    return value.astimezone(UTC).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _get_next_month_start(month_start: datetime) -> datetime:
+    if month_start.month == 12:
+        return month_start.replace(year=month_start.year + 1, month=1)
+    return month_start.replace(month=month_start.month + 1)
+
+
+def _row_to_summary(row: Row) -> SessionSummary:
+    return SessionSummary(
+        session_id=row.session_id,
+        title=row.title,
+        turn_count=row.turn_count,
+        updated_at=row.update_time,
+        in_progress_query=row.in_progress_query,
+    )
+
+
+def _row_to_session(row: Row) -> Session:
+    return Session.model_validate(
+        {
+            'session_id': row.session_id,
+            'title': row.title,
+            'messages': _decompress_messages(row.messages),
+            'created_at': row.create_time,
+            'updated_at': row.update_time,
+        }
+    )
+
+
+class SessionArchive:
+    """
+    Cold sessions of a PostgreSQL database, moved out of the session and message tables into `session_archive`.
+
+    Every archived session is a single row holding its summary and its compressed messages, in monthly partitions by
+    update time. The hot tables, their indexes and their vacuuming therefore only cover active sessions, and whole
+    months of the archive can be detached or dropped at once.
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    async def archive_sessions(self, updated_before: datetime, limit: int = 200) -> int:
+        """
+        Move up to `limit` sessions not updated since `updated_before` into the archive, oldest first.
+
+        Returns:
+            Number of archived sessions
+        """
+        async with self.engine.connect() as connection:
+            oldest_update_time = await connection.scalar(select(func.min(DbSession.update_time)))
+        if oldest_update_time is None or oldest_update_time >= updated_before:
+            return 0
+        await self._create_partitions(oldest_update_time, updated_before)
+
+        async with self.engine.begin() as connection:
+            # sessions being written to are skipped, and archived by a later run
+            session_rows = (
+                await connection.execute(
+                    select(DbSession.session_id, DbSession.title, DbSession.create_time, DbSession.update_time)
+                    .where(DbSession.update_time < updated_before)
+                    .order_by(DbSession.update_time, DbSession.session_id)
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            if not session_rows:
+                return 0
+
+            session_ids = [row.session_id for row in session_rows]
+            message_rows = await connection.execute(
+                select(
+                    DbMessage.session_id,
+                    DbMessage.id,
+                    DbMessage.role,
+                    DbMessage.content,
+                    DbMessage.timestamp,
+                    DbMessage.steps,
+                )
+                .where(DbMessage.session_id.in_(session_ids))
+                .order_by(DbMessage.timestamp, DbMessage.id)
+            )
+            messages_by_session_id: dict[str, list[dict[str, Any]]] = defaultdict(list)
+            for row in message_rows:
+                messages_by_session_id[row.session_id].append(
+                    {
+                        'id': row.id,
+                        'role': row.role,
+                        'content': row.content,
+                        'timestamp': row.timestamp,
+                        'steps': row.steps,
+                    }
+                )
+
+            archive_time = datetime.now(UTC)
+            archive_rows = []
+            for row in session_rows:
+                session = Session.model_validate(
+                    {
+                        'session_id': row.session_id,
+                        'title': row.title,
+                        'messages': messages_by_session_id[row.session_id],
+                        'created_at': row.create_time,
+                        'updated_at': row.update_time,
+                    }
+                )
+                summary = session.to_summary()
+                archive_rows.append(
+                    {
+                        'session_id': session.session_id,
+                        'update_time': session.updated_at,
+                        'title': session.title,
+                        'create_time': session.created_at,
+                        'archive_time': archive_time,
+                        'turn_count': summary.turn_count,
+                        'in_progress_query': summary.in_progress_query,
+                        'version': session.get_version(),
+                        'messages': _compress_messages(session.messages),
+                        'search_text': _get_search_text(session.messages),
+                    }
+                )
+
+            await connection.execute(
+                insert(DbSessionArchive).values(search_vector=_to_search_vector(bindparam('search_text'))),
+                archive_rows,
+            )
+            # messages are removed by the ON DELETE CASCADE foreign key
+            await connection.execute(delete(DbSession).where(DbSession.session_id.in_(session_ids)))
+            return len(archive_rows)
+
+    async def index_unsearchable_sessions(self, limit: int = 200) -> int:
+        """
+        Fill in the search vector of up to `limit` sessions archived before archived sessions were searchable.
+
+        Returns:
+            Number of sessions made searchable
+        """
+        async with self.engine.begin() as connection:
+            rows = (
+                await connection.execute(
+                    select(DbSessionArchive.session_id, DbSessionArchive.update_time, DbSessionArchive.messages)
+                    .where(DbSessionArchive.search_vector.is_(None))
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            if not rows:
+                return 0
+
+            await connection.execute(
+                update(DbSessionArchive)
+                .where(
+                    DbSessionArchive.session_id == bindparam('archived_session_id'),
+                    DbSessionArchive.update_time == bindparam('archived_update_time'),
+                )
+                .values(search_vector=_to_search_vector(bindparam('search_text'))),
+                [
+                    {
+                        'archived_session_id': row.session_id,
+                        'archived_update_time': row.update_time,
+                        'search_text': _get_search_text(
+                            [Message.model_validate(data) for data in _decompress_messages(row.messages)]
+                        ),
+                    }
+                    for row in rows
+                ],
+            )
+            return len(rows)
+
+    async def _create_partitions(self, start: datetime, end: datetime) -> None:
+        """Create the monthly partitions covering update times from `start` up to `end`."""
+        async with self.engine.begin() as connection:
+            await connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': _PARTITION_LOCK_KEY})
+
+            month_start = _get_month_start(start)
+            while month_start < end:
+                next_month_start = _get_next_month_start(month_start)
+                await connection.exec_driver_sql(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS session_archive_y{month_start.year}m{month_start.month:02}
+                    PARTITION OF session_archive
+                    FOR VALUES FROM ('{month_start.isoformat()}') TO ('{next_month_start.isoformat()}')
+                    """
+                )
+                month_start = next_month_start
+
+    async def restore_session(self, session_id: str) -> bool:
+        """Move an archived session back into the session and message tables, keeping its message ids."""
+        async with self.engine.begin() as connection:
+            row = (
+                await connection.execute(
+                    delete(DbSessionArchive)
+                    .where(DbSessionArchive.session_id == session_id)
+                    .returning(
+                        DbSessionArchive.title,
+                        DbSessionArchive.create_time,
+                        DbSessionArchive.update_time,
+                        DbSessionArchive.messages,
+                    )
+                )
+            ).one_or_none()
+            if row is None:
+                return False
+
+            await connection.execute(
+                insert(DbSession).values(
+                    session_id=session_id, title=row.title, create_time=row.create_time, update_time=row.update_time
+                )
+            )
+            messages = [Message.model_validate(data) for data in _decompress_messages(row.messages)]
+            if messages:
+                # the ids were drawn from the message id sequence before, so they cannot collide
+                await connection.execute(
+                    insert(DbMessage),
+                    [
+                        {
+                            'id': message.id,
+                            'session_id': session_id,
+                            'role': message.role.value,
+                            'content': message.content,
+                            'timestamp': message.timestamp,
+                            'steps': steps_to_json(message.steps),
+                        }
+                        for message in messages
+                    ],
+                )
+            return True
+
+    async def get_session(self, session_id: str) -> Session | None:
+        async with self.engine.connect() as connection:
+            row = (
+                await connection.execute(
+                    select(
+                        DbSessionArchive.session_id,
+                        DbSessionArchive.title,
+                        DbSessionArchive.create_time,
+                        DbSessionArchive.update_time,
+                        DbSessionArchive.messages,
+                    ).where(DbSessionArchive.session_id == session_id)
+                )
+            ).one_or_none()
+        return _row_to_session(row) if row else None
+
+    async def get_archived_session_ids(self, session_ids: list[str]) -> set[str]:
+        """Get which of the given sessions are archived."""
+        if not session_ids:
+            return set()
+
+        async with self.engine.connect() as connection:
+            return set(
+                await connection.scalars(
+                    select(DbSessionArchive.session_id).where(DbSessionArchive.session_id.in_(session_ids))
+                )
+            )
+
+    async def iter_sessions(self, batch_size: int = 100) -> AsyncIterator[Session]:
+        """Iterate over every archived session, fetching `batch_size` of them at a time from a server-side cursor."""
+        async with self.engine.connect() as connection:
+            result = await connection.stream(
+                select(
+                    DbSessionArchive.session_id,
+                    DbSessionArchive.title,
+                    DbSessionArchive.create_time,
+                    DbSessionArchive.update_time,
+                    DbSessionArchive.messages,
+                ).execution_options(yield_per=batch_size)
+            )
+            async for row in result:
+                yield _row_to_session(row)
+
+    async def get_session_summary(self, session_id: str) -> SessionSummary | None:
+        async with self.engine.connect() as connection:
+            row = (
+                await connection.execute(
+                    self._build_summary_statement().where(DbSessionArchive.session_id == session_id)
+                )
+            ).one_or_none()
+        return _row_to_summary(row) if row else None
+
+    async def get_session_version(self, session_id: str) -> int | None:
+        async with self.engine.connect() as connection:
+            return await connection.scalar(
+                select(DbSessionArchive.version).where(DbSessionArchive.session_id == session_id)
+            )
+
+    async def get_session_summaries(self, limit: int, cursor: SessionListCursor | None = None) -> list[SessionSummary]:
+        statement = (
+            self._build_summary_statement()
+            .order_by(DbSessionArchive.update_time.desc(), DbSessionArchive.session_id.desc())
+            .limit(limit)
+        )
+        if cursor is not None:
+            statement = statement.where(
+                tuple_(DbSessionArchive.update_time, DbSessionArchive.session_id)
+                < tuple_(literal(cursor.updated_at), literal(cursor.session_id))
+            )
+
+        async with self.engine.connect() as connection:
+            return [_row_to_summary(row) for row in await connection.execute(statement)]
+
+    async def get_session_list_version(self) -> SessionListVersion:
+        # deletions from the archive bump the same state row as those of live sessions
+        async with self.engine.connect() as connection:
+            generation, updated_at = (
+                await connection.execute(
+                    select(
+                        select(DbSessionListState.generation).where(DbSessionListState.id == 1).scalar_subquery(),
+                        select(func.max(DbSessionArchive.update_time)).scalar_subquery(),
+                    )
+                )
+            ).one()
+        return SessionListVersion(generation=generation, updated_at=updated_at)
+
+    async def count_sessions(self) -> int:
+        async with self.engine.connect() as connection:
+            return (await connection.execute(select(func.count()).select_from(DbSessionArchive))).scalar_one()
+
+    @staticmethod
+    def _build_summary_statement():
+        return select(
+            DbSessionArchive.session_id,
+            DbSessionArchive.title,
+            DbSessionArchive.update_time,
+            DbSessionArchive.turn_count,
+            DbSessionArchive.in_progress_query,
+        )
+
+    async def search_messages(
+        self, query: str, limit: int, cursor: SessionSearchCursor | None = None
+    ) -> list[SessionSearchResult]:
+        """
+        Search the messages of archived sessions, ranked like live messages so that both can be merged.
+
+        The search vector of every archived session finds the sessions containing all words of the query, then the
+        messages of those sessions are decompressed and matched and ranked one by one by the database.
+        """
+        async with self.engine.connect() as connection:
+            rows = await connection.execute(
+                select(
+                    DbSessionArchive.session_id,
+                    DbSessionArchive.title,
+                    DbSessionArchive.create_time,
+                    DbSessionArchive.update_time,
+                    DbSessionArchive.messages,
+                ).where(
+                    DbSessionArchive.search_vector.bool_op('@@')(
+                        func.plainto_tsquery(literal_column(f"'{SEARCH_TEXT_CONFIG}'::regconfig"), query)
+                    )
+                )
+            )
+            sessions = [_row_to_session(row) for row in rows]
+            # the position of every message in the contents parameter, which counts from 1
+            positions = [(session, index) for session in sessions for index in range(len(session.messages))]
+            if not positions:
+                return []
+
+            rank_rows = await connection.execute(
+                text(_RANK_MESSAGES),
+                {'contents': [session.messages[index].content for session, index in positions], 'query': query},
+            )
+
+            results = []
+            for position, rank in rank_rows:
+                session, index = positions[position - 1]
+                message = session.messages[index]
+                if cursor is not None and (rank, message.id) >= (cursor.rank, cursor.message_id):
+                    continue
+
+                next_message = session.messages[index + 1] if index + 1 < len(session.messages) else None
+                if message.role == MessageRole.ASSISTANT:
+                    turn_id = message.id
+                elif next_message is not None and next_message.role == MessageRole.ASSISTANT:
+                    turn_id = next_message.id
+                else:
+                    turn_id = None
+
+                results.append(
+                    SessionSearchResult(
+                        session_id=session.session_id,
+                        title=session.title,
+                        message_id=message.id,
+                        turn_id=turn_id,
+                        role=message.role,
+                        content=message.content,
+                        timestamp=message.timestamp,
+                        rank=rank,
+                    )
+                )
+
+        return heapq.nlargest(limit, results, key=lambda result: (result.rank, result.message_id))
+
+    async def delete_session(self, session_id: str) -> bool:
+        async with self.engine.begin() as connection:
+            result = await connection.execute(
+                delete(DbSessionArchive)
+                .where(DbSessionArchive.session_id == session_id)
+                .returning(DbSessionArchive.session_id)
+            )
+            return result.scalar_one_or_none() is not None
+
+    async def delete_expired_sessions(
+        self, updated_before: datetime | None = None, keep_latest: int | None = None, limit: int = 500
+    ) -> int:
+        conditions = []
+        if updated_before is not None:
+            conditions.append(DbSessionArchive.update_time < updated_before)
+        if keep_latest is not None:
+            latest_sessions = (
+                select(DbSessionArchive.session_id)
+                .order_by(DbSessionArchive.update_time.desc(), DbSessionArchive.session_id.desc())
+                .limit(keep_latest)
+            )
+            conditions.append(DbSessionArchive.session_id.not_in(latest_sessions))
+        if not conditions:
+            return 0
+
+        expired_sessions = (
+            select(DbSessionArchive.session_id)
+            .where(or_(*conditions))
+            .order_by(DbSessionArchive.update_time, DbSessionArchive.session_id)
+            .limit(limit)
+        )
+        async with self.engine.begin() as connection:
+            result = await connection.execute(
+                delete(DbSessionArchive)
+                .where(DbSessionArchive.session_id.in_(expired_sessions))
+                .returning(DbSessionArchive.session_id)
+            )
+            return len(result.all())
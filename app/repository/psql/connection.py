@@ -1,36 +1,130 @@
+import asyncio
+import logging
+
+from sqlalchemy import make_url, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.future import select
 
-from config.settings import APP_NAME, DATABASE_URL
+from config.settings import (
+    APP_NAME,
+    DATABASE_REPLICA_URL,
+    DATABASE_URL,
+    DB_LIVENESS_CHECK_INTERVAL_SECONDS,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_STATEMENT_CACHE_SIZE,
+    SESSION_SHARDS,
+    SESSION_WRITE_BUFFER_MAX_BATCH_SIZE,
+    SESSION_WRITE_BUFFER_MAX_DELAY_SECONDS,
+)
 from core.constant.user import DEFAULT_ROLE_DESCRIPTION, DEFAULT_ROLE_KEY, DEFAULT_ROLE_NAME
 
+from .migration import MIGRATION_TABLE_NAME, MigrationRunner
 from .model.base import Base
 from .model.user import DbRole
+from .pool import InstrumentedAsyncAdaptedQueuePool, PoolStats
+from .write_buffer import MessageWriteBuffer
+
+logger = logging.getLogger(__name__)
 
 
 class Database:
-    def __init__(self):
+    def __init__(
+        self, url: str = DATABASE_URL, liveness_check_interval: float | None = DB_LIVENESS_CHECK_INTERVAL_SECONDS
+    ):
+        # SQLAlchemy's own prepared statement cache is set on the URL, asyncpg's on the connection
+        engine_url = make_url(url).update_query_dict({'prepared_statement_cache_size': str(DB_STATEMENT_CACHE_SIZE)})
         self.engine: AsyncEngine = create_async_engine(
-            DATABASE_URL,
+            engine_url,
             echo=False,  # Set to True for SQL query logging
-            pool_pre_ping=True,
-            connect_args={'server_settings': {'application_name': APP_NAME}},
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=DB_POOL_RECYCLE_SECONDS,
+            # a periodic liveness check replaces the round trip of pinging on every checkout
+            pool_pre_ping=DB_POOL_PRE_PING and liveness_check_interval is None,
+            connect_args={
+                'server_settings': {'application_name': APP_NAME},
+                'statement_cache_size': DB_STATEMENT_CACHE_SIZE,
+            },
         )
         self.async_session_maker = async_sessionmaker(
             self.engine,
             expire_on_commit=False,
             autoflush=False,
         )
+        self.liveness_check_interval = liveness_check_interval
+        self._liveness_check_task: asyncio.Task | None = None
+        self.message_write_buffer = (
+            MessageWriteBuffer(
+                self.async_session_maker,
+                max_delay_seconds=SESSION_WRITE_BUFFER_MAX_DELAY_SECONDS,
+                max_batch_size=SESSION_WRITE_BUFFER_MAX_BATCH_SIZE,
+            )
+            if SESSION_WRITE_BUFFER_MAX_DELAY_SECONDS is not None
+            else None
+        )
 
-    async def create_all_tables(self):
-        async with self.engine.begin() as conn:
-            await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn))
+    def get_pool_stats(self) -> PoolStats | None:
+        pool = self.engine.pool
+        return pool.get_stats() if isinstance(pool, InstrumentedAsyncAdaptedQueuePool) else None
+
+    async def check_liveness(self) -> bool:
+        """
+        Check that the database answers, discarding all pooled connections if it does not.
+
+        Returns:
+            Whether the database is reachable
+        """
+        try:
+            async with self.engine.connect() as conn:
+                await conn.execute(text('SELECT 1'))
+            return True
+        except (SQLAlchemyError, OSError) as e:
+            logger.warning(f'Database liveness check failed, discarding pooled connections: {e}')
+            await self.engine.dispose()
+            return False
+
+    async def start_liveness_check(self) -> None:
+        """Start checking the database periodically, if a liveness check interval is configured."""
+        if self.liveness_check_interval is not None and self._liveness_check_task is None:
+            self._liveness_check_task = asyncio.create_task(self._liveness_check_loop(self.liveness_check_interval))
+
+    async def stop_liveness_check(self) -> None:
+        if self._liveness_check_task:
+            self._liveness_check_task.cancel()
+            try:
+                await self._liveness_check_task
+            except asyncio.CancelledError:
+                pass
+            self._liveness_check_task = None
+
+    async def _liveness_check_loop(self, interval: float) -> None:
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                await self.check_liveness()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f'Error in database liveness check loop: {e}', exc_info=True)
+
+    async def run_migrations(self):
+        applied_versions = await MigrationRunner(self.engine).upgrade()
+        if applied_versions:
+            logger.info(f'Applied database migrations: {applied_versions}')
 
         await self._create_default_roles()
 
     async def drop_all_tables(self):
         async with self.engine.begin() as conn:
             await conn.run_sync(lambda sync_conn: Base.metadata.drop_all(sync_conn))
+            await conn.exec_driver_sql(f'DROP TABLE IF EXISTS {MIGRATION_TABLE_NAME}')
 
     async def _create_default_roles(self):
         async with self.async_session_maker() as session:
@@ -46,3 +140,20 @@ class Database:
 
 
 psql_db = Database()
+# read-only routes may lag slightly behind the primary; flows that read their own writes must use `psql_db`
+psql_replica_db = Database(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+
+
+def get_read_db() -> Database:
+    """Get the database to serve read-only requests from, the replica if one is configured."""
+    return psql_replica_db or psql_db
+
+
+# sessions live on these databases instead of `psql_db` when shards are configured, each shard with its own pool
+psql_session_shard_dbs = {name: Database(url) for name, url in SESSION_SHARDS.items()}
+
+
+def get_all_dbs() -> list[Database]:
+    """Get every configured database, e.g. to run migrations or liveness checks on all of them."""
+    replica_dbs = [psql_replica_db] if psql_replica_db else []
+    return [psql_db, *replica_dbs, *psql_session_shard_dbs.values()]
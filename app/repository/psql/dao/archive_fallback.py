@@ -0,0 +1,174 @@
+import heapq
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import datetime
+from typing import TypeVar
+
+from core.enum.session import MessageRole
+from core.model.session import (
+    Message,
+    ProcessingStep,
+    Session,
+    SessionListCursor,
+    SessionListVersion,
+    SessionSearchCursor,
+    SessionSearchResult,
+    SessionSummary,
+    SessionTurn,
+    SessionTurnDelta,
+)
+from core.protocol.repository.session import SessionRepositoryProtocol
+
+from ..archive import SessionArchive
+
+T = TypeVar('T')
+
+
+class ArchiveFallbackSessionRepository(SessionRepositoryProtocol):
+    """
+    Session repository of a database with a session archive, serving archived sessions as if they were never moved.
+
+    Reads fall back to the archive when the live tables have no such session, and writes to an archived session first
+    restore it, with its original message ids, so cursors and versions held by clients stay valid.
+    """
+
+    def __init__(self, repository: SessionRepositoryProtocol, archive: SessionArchive):
+        self.repository = repository
+        self.archive = archive
+
+    async def _write(self, session_id: str, write: Callable[[], Awaitable[T]]) -> T:
+        try:
+            return await write()
+        except KeyError:
+            # retried even if another writer restored the session first, and raises again if it does not exist
+            await self.archive.restore_session(session_id)
+            return await write()
+
+    async def create_session(self, title: str, session_id: str | None = None) -> Session:
+        return await self.repository.create_session(title, session_id=session_id)
+
+    async def import_session(self, session: Session) -> bool:
+        return await self.import_sessions([session]) == 1
+
+    async def import_sessions(self, sessions: list[Session]) -> int:
+        archived_session_ids = await self.archive.get_archived_session_ids([s.session_id for s in sessions])
+        return await self.repository.import_sessions([s for s in sessions if s.session_id not in archived_session_ids])
+
+    async def get_session(self, session_id: str) -> Session | None:
+        return await self.repository.get_session(session_id) or await self.archive.get_session(session_id)
+
+    async def get_session_summary(self, session_id: str) -> SessionSummary | None:
+        return await self.repository.get_session_summary(session_id) or await self.archive.get_session_summary(
+            session_id
+        )
+
+    async def get_session_version(self, session_id: str) -> int | None:
+        version = await self.repository.get_session_version(session_id)
+        return version if version is not None else await self.archive.get_session_version(session_id)
+
+    async def get_session_list_version(self) -> SessionListVersion:
+        live_version = await self.repository.get_session_list_version()
+        archive_version = await self.archive.get_session_list_version()
+        return SessionListVersion(
+            generation=max(live_version.generation, archive_version.generation),
+            updated_at=max(
+                (v.updated_at for v in (live_version, archive_version) if v.updated_at is not None), default=None
+            ),
+        )
+
+    async def count_sessions(self) -> int:
+        return await self.repository.count_sessions() + await self.archive.count_sessions()
+
+    async def get_session_turns(
+        self,
+        session_id: str,
+        limit: int,
+        before: int | None = None,
+        after: int | None = None,
+        include_steps: bool = False,
+    ) -> list[SessionTurn]:
+        turns = await self.repository.get_session_turns(
+            session_id, limit, before=before, after=after, include_steps=include_steps
+        )
+        if turns:
+            return turns
+
+        archived_session = await self.archive.get_session(session_id)
+        if archived_session is None:
+            return []
+        return archived_session.get_turn_window(limit, before=before, after=after, include_steps=include_steps)
+
+    async def get_session_turns_since(self, session_id: str, since: int) -> SessionTurnDelta | None:
+        delta = await self.repository.get_session_turns_since(session_id, since)
+        if delta is not None:
+            return delta
+
+        archived_session = await self.archive.get_session(session_id)
+        return archived_session.get_turns_since(since) if archived_session else None
+
+    async def add_message(
+        self, session_id: str, role: MessageRole, content: str, steps: list[ProcessingStep] | None = None
+    ) -> None:
+        await self._write(session_id, lambda: self.repository.add_message(session_id, role, content, steps=steps))
+
+    async def get_recent_messages(self, session_id: str, max_turns: int = 5) -> list[Message]:
+        messages = await self.repository.get_recent_messages(session_id, max_turns=max_turns)
+        if messages:
+            return messages
+
+        archived_session = await self.archive.get_session(session_id)
+        return archived_session.get_recent_messages(max_turns=max_turns) if archived_session else []
+
+    async def add_user_message_and_get_recent_messages(
+        self, session_id: str, content: str, max_turns: int = 5
+    ) -> list[Message]:
+        return await self._write(
+            session_id,
+            lambda: self.repository.add_user_message_and_get_recent_messages(session_id, content, max_turns=max_turns),
+        )
+
+    async def get_session_summaries(self, limit: int, cursor: SessionListCursor | None = None) -> list[SessionSummary]:
+        live_page = await self.repository.get_session_summaries(limit, cursor)
+        archive_page = await self.archive.get_session_summaries(limit, cursor)
+        merged = heapq.merge(
+            live_page, archive_page, key=lambda summary: (summary.updated_at, summary.session_id), reverse=True
+        )
+        return list(merged)[:limit]
+
+    async def iter_sessions(self, batch_size: int = 100) -> AsyncIterator[Session]:
+        async for session in self.repository.iter_sessions(batch_size):
+            yield session
+        async for session in self.archive.iter_sessions(batch_size):
+            yield session
+
+    async def search_messages(
+        self, query: str, limit: int, cursor: SessionSearchCursor | None = None
+    ) -> list[SessionSearchResult]:
+        # archived messages keep their ids, which are unique across both, and are ranked like live ones
+        live_results = await self.repository.search_messages(query, limit, cursor)
+        archived_results = await self.archive.search_messages(query, limit, cursor)
+        merged = heapq.merge(
+            live_results, archived_results, key=lambda result: (result.rank, result.message_id), reverse=True
+        )
+        return list(merged)[:limit]
+
+    async def delete_session(self, session_id: str) -> bool:
+        return await self.repository.delete_session(session_id) or await self.archive.delete_session(session_id)
+
+    async def delete_expired_sessions(
+        self, updated_before: datetime | None = None, keep_latest: int | None = None, limit: int = 500
+    ) -> int:
+        # archived sessions are older than live ones, except for those not archived yet, so the archive keeps only
+        # what the live sessions leave of `keep_latest` and is purged first
+        archive_keep_latest = None
+        if keep_latest is not None:
+            live_count = await self.repository.count_sessions()
+            archive_keep_latest = max(0, keep_latest - live_count)
+
+        deleted_count = await self.archive.delete_expired_sessions(
+            updated_before=updated_before, keep_latest=archive_keep_latest, limit=limit
+        )
+        if deleted_count < limit:
+            deleted_count += await self.repository.delete_expired_sessions(
+                updated_before=updated_before, keep_latest=keep_latest, limit=limit - deleted_count
+            )
+        return deleted_count
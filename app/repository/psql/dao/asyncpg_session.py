@@ -0,0 +1,510 @@
+from collections import defaultdict
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any
+
+import asyncpg
+from pydantic_core import from_json, to_json
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.enum.session import MessageRole
+from core.model.session import (
+    Message,
+    ProcessingStep,
+    Session,
+    SessionListCursor,
+    SessionListVersion,
+    SessionSearchCursor,
+    SessionSearchResult,
+    SessionSummary,
+    SessionTurn,
+    SessionTurnDelta,
+)
+from core.protocol.repository.session import SessionRepositoryProtocol
+
+from ..model import MESSAGE_SEARCH_VECTOR, SEARCH_TEXT_CONFIG
+from ..write_buffer import MessageWriteBuffer
+
+# steps are selected as text, since the JSON codecs of a connection depend on who configured it
+_MESSAGE_COLUMNS = 'id, role, content, timestamp, steps::text AS steps'
+
+# a turn is an assistant message directly following a user message, as in `build_session_turns`
+_SUMMARY_SELECT = f"""
+SELECT s.session_id, s.title, s.update_time,
+    (
+        SELECT count(*) FROM (
+            SELECT m.role, lag(m.role) OVER (ORDER BY m.id) AS query_role FROM message m
+            WHERE m.session_id = s.session_id
+        ) paired_messages
+        WHERE paired_messages.role = '{MessageRole.ASSISTANT.value}'
+            AND paired_messages.query_role = '{MessageRole.USER.value}'
+    ) AS turn_count,
+    CASE WHEN last_message.role = '{MessageRole.USER.value}' THEN last_message.content END AS in_progress_query
+FROM session s
+LEFT JOIN LATERAL (
+    SELECT m.role, m.content FROM message m
+    WHERE m.session_id = s.session_id
+    ORDER BY m.timestamp DESC, m.id DESC
+    LIMIT 1
+) last_message ON true
+"""
+
+_APPEND_MESSAGE = """
+WITH touched_session AS (
+    UPDATE session SET update_time = $4 WHERE session_id = $1 RETURNING session_id
+)
+INSERT INTO message (session_id, role, content, timestamp, steps)
+SELECT session_id, $2, $3, $4, $5::text::jsonb FROM touched_session
+RETURNING id
+"""
+
+_RECENT_MESSAGES = f"""
+SELECT {_MESSAGE_COLUMNS} FROM message
+WHERE session_id = $1
+ORDER BY timestamp DESC, id DESC
+LIMIT $2
+"""
+
+# every word of the query has to match, stemmed by the same configuration as the search vector
+_SEARCH_MESSAGES = f"""
+SELECT matches.*, s.title,
+    CASE WHEN matches.role = '{MessageRole.ASSISTANT.value}' THEN matches.id ELSE (
+        SELECT CASE WHEN n.role = '{MessageRole.ASSISTANT.value}' THEN n.id END FROM message n
+        WHERE n.session_id = matches.session_id AND n.id > matches.id
+        ORDER BY n.id
+        LIMIT 1
+    ) END AS turn_id
+FROM (
+    SELECT id, session_id, role, content, timestamp, ts_rank_cd({MESSAGE_SEARCH_VECTOR}, query) AS rank
+    FROM message, plainto_tsquery('{SEARCH_TEXT_CONFIG}', $1) query
+    WHERE {MESSAGE_SEARCH_VECTOR} @@ query
+) matches
+JOIN session s ON s.session_id = matches.session_id
+{{cursor_condition}}
+ORDER BY matches.rank DESC, matches.id DESC
+LIMIT $2
+"""
+
+
+def _record_to_message_data(record: asyncpg.Record) -> dict[str, Any]:
+    return {
+        'id': record['id'],
+        'role': record['role'],
+        'content': record['content'],
+        'timestamp': record['timestamp'],
+        'steps': from_json(record['steps']),
+    }
+
+
+def _record_to_message(record: asyncpg.Record) -> Message:
+    return Message.model_validate(_record_to_message_data(record))
+
+
+def _record_to_summary(record: asyncpg.Record) -> SessionSummary:
+    return SessionSummary(
+        session_id=record['session_id'],
+        title=record['title'],
+        turn_count=record['turn_count'],
+        updated_at=record['update_time'],
+        in_progress_query=record['in_progress_query'],
+    )
+
+
+# id of the latest message of session `$1` at or before a cursor parameter, or 0; a single index lookup
+_MESSAGE_AT_OR_BEFORE = '(SELECT coalesce(max(id), 0) FROM message WHERE session_id = $1 AND id <= {cursor})'
+
+
+def _build_turns_statement(before: int | None, after: int | None, include_steps: bool) -> tuple[str, bool]:
+    """
+    Build the statement selecting a window of turns, with the cursors as parameters `$3` and `$4` when given.
+
+    Returns:
+        The statement and whether it selects forward from `after`, in which case rows come oldest first
+    """
+    conditions = ['session_id = $1']
+    turn_conditions = [f"role = '{MessageRole.ASSISTANT.value}'", f"query_role = '{MessageRole.USER.value}'"]
+    if before is not None:
+        conditions.append('id < $3')
+    if after is not None:
+        after_parameter = f'${4 if before is not None else 3}'
+        # pairing starts at the message at or before the cursor, which may be the query of the first turn after it
+        conditions.append(f'id >= {_MESSAGE_AT_OR_BEFORE.format(cursor=after_parameter)}')
+        turn_conditions.append(f'id > {after_parameter}')
+    is_forward = after is not None and before is None
+
+    statement = f"""
+SELECT id, content, query, query_timestamp, steps FROM (
+    SELECT id, role, content,
+        lag(role) OVER (ORDER BY id) AS query_role,
+        lag(content) OVER (ORDER BY id) AS query,
+        lag(timestamp) OVER (ORDER BY id) AS query_timestamp,
+        {'steps::text' if include_steps else 'NULL::text'} AS steps
+    FROM message
+    WHERE {' AND '.join(conditions)}
+) paired_messages
+WHERE {' AND '.join(turn_conditions)}
+ORDER BY id {'ASC' if is_forward else 'DESC'}
+LIMIT $2
+"""
+    return statement, is_forward
+
+
+class AsyncpgSessionRepository(SessionRepositoryProtocol):
+    """
+    Session repository running hand-written SQL directly on asyncpg and building core models from the records.
+
+    Connections come from the pool of the given SQLAlchemy engine, so pool sizing, metrics and liveness checks are
+    shared with the ORM repository, and asyncpg's per-connection prepared statement cache applies to every statement.
+    A connection is only held for the duration of a single call.
+    """
+
+    def __init__(self, engine: AsyncEngine, write_buffer: MessageWriteBuffer | None = None):
+        self.engine = engine
+        # appends go through the shared group commit buffer when given, instead of a transaction of their own
+        self.write_buffer = write_buffer
+
+    @asynccontextmanager
+    async def _connect(self) -> AsyncGenerator[asyncpg.Connection]:
+        async with self.engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            yield raw_connection.driver_connection
+
+    async def create_session(self, title: str, session_id: str | None = None) -> Session:
+        session = Session(session_id=session_id, title=title) if session_id else Session(title=title)
+        async with self._connect() as connection:
+            await connection.execute(
+                'INSERT INTO session (session_id, title, create_time, update_time) VALUES ($1, $2, $3, $4)',
+                session.session_id,
+                session.title,
+                session.created_at,
+                session.updated_at,
+            )
+        return session
+
+    async def import_session(self, session: Session) -> bool:
+        return await self.import_sessions([session]) == 1
+
+    async def import_sessions(self, sessions: list[Session]) -> int:
+        # keeps the sessions' own timestamps; message ids are assigned by this database
+        sessions_by_id: dict[str, Session] = {}
+        for session in sessions:
+            sessions_by_id.setdefault(session.session_id, session)
+        if not sessions_by_id:
+            return 0
+
+        async with self._connect() as connection, connection.transaction():
+            # one statement for the whole batch of sessions and one for all of their messages
+            imported_session_ids = {
+                record['session_id']
+                for record in await connection.fetch(
+                    """
+                    INSERT INTO session (session_id, title, create_time, update_time)
+                    SELECT * FROM unnest($1::text[], $2::text[], $3::timestamptz[], $4::timestamptz[])
+                    ON CONFLICT (session_id) DO NOTHING
+                    RETURNING session_id
+                    """,
+                    list(sessions_by_id),
+                    [session.title for session in sessions_by_id.values()],
+                    [session.created_at for session in sessions_by_id.values()],
+                    [session.updated_at for session in sessions_by_id.values()],
+                )
+            }
+
+            messages = [
+                (session.session_id, message)
+                for session in sessions_by_id.values()
+                if session.session_id in imported_session_ids
+                for message in session.messages
+            ]
+            if messages:
+                await connection.execute(
+                    """
+                    INSERT INTO message (session_id, role, content, timestamp, steps)
+                    SELECT session_id, role, content, timestamp, steps::jsonb
+                    FROM unnest($1::text[], $2::text[], $3::text[], $4::timestamptz[], $5::text[])
+                        WITH ORDINALITY AS m(session_id, role, content, timestamp, steps, position)
+                    ORDER BY position
+                    """,
+                    [session_id for session_id, _ in messages],
+                    [message.role.value for _, message in messages],
+                    [message.content for _, message in messages],
+                    [message.timestamp for _, message in messages],
+                    [to_json(message.steps).decode() for _, message in messages],
+                )
+            if imported_session_ids:
+                # sessions updated long ago do not move the latest update time, so the list version has to change
+                await connection.execute('UPDATE session_list_state SET generation = generation + 1 WHERE id = 1')
+        return len(imported_session_ids)
+
+    async def get_session(self, session_id: str) -> Session | None:
+        # one round trip: the session columns repeat on every message row, and a session without messages has one row
+        async with self._connect() as connection:
+            records = await connection.fetch(
+                """
+                SELECT s.session_id, s.title, s.create_time, s.update_time,
+                    m.id, m.role, m.content, m.timestamp, m.steps::text AS steps
+                FROM session s
+                LEFT JOIN message m ON m.session_id = s.session_id
+                WHERE s.session_id = $1
+                ORDER BY m.timestamp, m.id
+                """,
+                session_id,
+            )
+        if not records:
+            return None
+
+        session_record = records[0]
+        return Session.model_validate(
+            {
+                'session_id': session_record['session_id'],
+                'title': session_record['title'],
+                'messages': [_record_to_message_data(record) for record in records if record['id'] is not None],
+                'created_at': session_record['create_time'],
+                'updated_at': session_record['update_time'],
+            }
+        )
+
+    async def get_session_summary(self, session_id: str) -> SessionSummary | None:
+        async with self._connect() as connection:
+            record = await connection.fetchrow(f'{_SUMMARY_SELECT} WHERE s.session_id = $1', session_id)
+        return _record_to_summary(record) if record else None
+
+    async def get_session_summaries(self, limit: int, cursor: SessionListCursor | None = None) -> list[SessionSummary]:
+        async with self._connect() as connection:
+            if cursor is None:
+                records = await connection.fetch(
+                    f'{_SUMMARY_SELECT} ORDER BY s.update_time DESC, s.session_id DESC LIMIT $1', limit
+                )
+            else:
+                records = await connection.fetch(
+                    f"""
+                    {_SUMMARY_SELECT}
+                    WHERE (s.update_time, s.session_id) < ($2, $3)
+                    ORDER BY s.update_time DESC, s.session_id DESC
+                    LIMIT $1
+                    """,
+                    limit,
+                    cursor.updated_at,
+                    cursor.session_id,
+                )
+        return [_record_to_summary(record) for record in records]
+
+    async def get_session_version(self, session_id: str) -> int | None:
+        async with self._connect() as connection:
+            record = await connection.fetchrow(
+                """
+                SELECT coalesce((SELECT max(m.id) FROM message m WHERE m.session_id = s.session_id), 0) AS version
+                FROM session s
+                WHERE s.session_id = $1
+                """,
+                session_id,
+            )
+        return record['version'] if record else None
+
+    async def get_session_list_version(self) -> SessionListVersion:
+        async with self._connect() as connection:
+            # both are index lookups: the single state row and the top of the update time index
+            record = await connection.fetchrow(
+                """
+                SELECT (SELECT generation FROM session_list_state WHERE id = 1) AS generation,
+                    (SELECT max(update_time) FROM session) AS updated_at
+                """
+            )
+        return SessionListVersion(generation=record['generation'], updated_at=record['updated_at'])
+
+    async def count_sessions(self) -> int:
+        async with self._connect() as connection:
+            return await connection.fetchval('SELECT count(*) FROM session')
+
+    async def get_session_turns(
+        self,
+        session_id: str,
+        limit: int,
+        before: int | None = None,
+        after: int | None = None,
+        include_steps: bool = False,
+    ) -> list[SessionTurn]:
+        statement, is_forward = _build_turns_statement(before, after, include_steps)
+        cursors = [cursor for cursor in (before, after) if cursor is not None]
+        async with self._connect() as connection:
+            records = await connection.fetch(statement, session_id, limit, *cursors)
+        if not is_forward:
+            records.reverse()
+
+        return [
+            SessionTurn.model_validate(
+                {
+                    'id': record['id'],
+                    'query': record['query'],
+                    'response': record['content'],
+                    'timestamp': record['query_timestamp'].isoformat(),
+                    'steps': from_json(record['steps']) if include_steps else [],
+                }
+            )
+            for record in records
+        ]
+
+    async def get_session_turns_since(self, session_id: str, since: int) -> SessionTurnDelta | None:
+        # left join from the session row so that a missing session and an unchanged one can be told apart; the
+        # messages start at the one at or before the version, which may be the query of the first new turn
+        async with self._connect() as connection:
+            records = await connection.fetch(
+                f"""
+                SELECT m.id, m.role, m.content, m.timestamp, m.steps::text AS steps
+                FROM session s
+                LEFT JOIN message m
+                ON m.session_id = s.session_id AND m.id >= {_MESSAGE_AT_OR_BEFORE.format(cursor='$2')}
+                WHERE s.session_id = $1
+                ORDER BY m.id
+                """,
+                session_id,
+                since,
+            )
+        if not records:
+            return None
+
+        messages = [_record_to_message(record) for record in records if record['id'] is not None]
+        return SessionTurnDelta.from_messages(messages, since)
+
+    async def add_message(
+        self, session_id: str, role: MessageRole, content: str, steps: list[ProcessingStep] | None = None
+    ) -> None:
+        message = Message(role=role, content=content, steps=steps or [])
+        if self.write_buffer is not None:
+            await self.write_buffer.append(session_id, message)
+            return
+
+        async with self._connect() as connection:
+            await self._append_message(connection, session_id, message)
+
+    @staticmethod
+    async def _append_message(connection: asyncpg.Connection, session_id: str, message: Message) -> None:
+        message_id = await connection.fetchval(
+            _APPEND_MESSAGE,
+            session_id,
+            message.role.value,
+            message.content,
+            message.timestamp,
+            to_json(message.steps).decode(),
+        )
+        if message_id is None:
+            raise KeyError(f'Session {session_id} not found')
+
+    async def get_recent_messages(self, session_id: str, max_turns: int = 5) -> list[Message]:
+        async with self._connect() as connection:
+            records = await connection.fetch(_RECENT_MESSAGES, session_id, max_turns * 2)
+        return [_record_to_message(record) for record in reversed(records)]
+
+    async def add_user_message_and_get_recent_messages(
+        self, session_id: str, content: str, max_turns: int = 5
+    ) -> list[Message]:
+        message = Message(role=MessageRole.USER, content=content)
+        if self.write_buffer is not None:
+            await self.write_buffer.append(session_id, message)
+            return await self.get_recent_messages(session_id, max_turns=max_turns)
+
+        async with self._connect() as connection, connection.transaction():
+            await self._append_message(connection, session_id, message)
+            records = await connection.fetch(_RECENT_MESSAGES, session_id, max_turns * 2)
+        return [_record_to_message(record) for record in reversed(records)]
+
+    async def iter_sessions(self, batch_size: int = 100) -> AsyncIterator[Session]:
+        # a server-side cursor over the sessions, with the messages of every fetched batch read in one query
+        async with self._connect() as connection, connection.transaction():
+            cursor = await connection.cursor(
+                'SELECT session_id, title, create_time, update_time FROM session ORDER BY session_id'
+            )
+            while session_records := await cursor.fetch(batch_size):
+                message_records = await connection.fetch(
+                    f"""
+                    SELECT session_id, {_MESSAGE_COLUMNS} FROM message
+                    WHERE session_id = ANY($1::text[])
+                    ORDER BY timestamp, id
+                    """,
+                    [record['session_id'] for record in session_records],
+                )
+                messages_by_session_id: dict[str, list[dict[str, Any]]] = defaultdict(list)
+                for record in message_records:
+                    messages_by_session_id[record['session_id']].append(_record_to_message_data(record))
+
+                for record in session_records:
+                    yield Session.model_validate(
+                        {
+                            'session_id': record['session_id'],
+                            'title': record['title'],
+                            'messages': messages_by_session_id[record['session_id']],
+                            'created_at': record['create_time'],
+                            'updated_at': record['update_time'],
+                        }
+                    )
+
+    async def search_messages(
+        self, query: str, limit: int, cursor: SessionSearchCursor | None = None
+    ) -> list[SessionSearchResult]:
+        async with self._connect() as connection:
+            if cursor is None:
+                records = await connection.fetch(_SEARCH_MESSAGES.format(cursor_condition=''), query, limit)
+            else:
+                records = await connection.fetch(
+                    _SEARCH_MESSAGES.format(cursor_condition='WHERE (matches.rank, matches.id) < ($3, $4)'),
+                    query,
+                    limit,
+                    cursor.rank,
+                    cursor.message_id,
+                )
+        return [
+            SessionSearchResult(
+                session_id=record['session_id'],
+                title=record['title'],
+                message_id=record['id'],
+                turn_id=record['turn_id'],
+                role=record['role'],
+                content=record['content'],
+                timestamp=record['timestamp'],
+                rank=record['rank'],
+            )
+            for record in records
+        ]
+
+    async def delete_session(self, session_id: str) -> bool:
+        # messages are removed by the ON DELETE CASCADE foreign key
+        async with self._connect() as connection:
+            deleted_session_id = await connection.fetchval(
+                'DELETE FROM session WHERE session_id = $1 RETURNING session_id', session_id
+            )
+        return deleted_session_id is not None
+
+    async def delete_expired_sessions(
+        self, updated_before: datetime | None = None, keep_latest: int | None = None, limit: int = 500
+    ) -> int:
+        conditions: list[str] = []
+        parameters: list[Any] = [limit]
+        if updated_before is not None:
+            parameters.append(updated_before)
+            conditions.append(f'update_time < ${len(parameters)}')
+        if keep_latest is not None:
+            parameters.append(keep_latest)
+            conditions.append(
+                'session_id NOT IN ('
+                f'SELECT session_id FROM session ORDER BY update_time DESC, session_id DESC LIMIT ${len(parameters)})'
+            )
+        if not conditions:
+            return 0
+
+        # oldest first, skipping rows locked by concurrent writers so a purge never waits on a live session
+        async with self._connect() as connection:
+            records = await connection.fetch(
+                f"""
+                DELETE FROM session WHERE session_id IN (
+                    SELECT session_id FROM session
+                    WHERE {' OR '.join(conditions)}
+                    ORDER BY update_time, session_id
+                    LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING session_id
+                """,
+                *parameters,
+            )
+        return len(records)
@@ -1,17 +1,63 @@
-from sqlalchemy import select
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+from sqlalchemy import (
+    DateTime,
+    Row,
+    ScalarSelect,
+    Select,
+    Text,
+    and_,
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    true,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from core.enum.session import MessageRole
-from core.model.session import Message, ProcessingStep, Session
+from core.model.session import (
+    Message,
+    ProcessingStep,
+    Session,
+    SessionListCursor,
+    SessionListVersion,
+    SessionSearchCursor,
+    SessionSearchResult,
+    SessionSummary,
+    SessionTurn,
+    SessionTurnDelta,
+)
 from core.protocol.repository.session import SessionRepositoryProtocol
 
-from ..model import DbMessage, DbSession
+from ..model import (
+    MESSAGE_SEARCH_VECTOR,
+    SEARCH_TEXT_CONFIG,
+    DbMessage,
+    DbSession,
+    DbSessionListState,
+    bump_session_list_generation,
+    steps_to_json,
+)
+from ..write_buffer import MessageWriteBuffer
 
 
 class PsqlSessionRepository(SessionRepositoryProtocol):
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, write_buffer: MessageWriteBuffer | None = None):
         self.session = session
+        # appends go through the shared group commit buffer when given, instead of a transaction of their own
+        self.write_buffer = write_buffer
 
     async def create_session(self, title: str, session_id: str | None = None) -> Session:
         core_session = Session(session_id=session_id, title=title) if session_id else Session(title=title)
@@ -26,53 +72,450 @@ class PsqlSessionRepository(SessionRepositoryProtocol):
             await self.session.rollback()
             raise
 
+    async def import_session(self, session: Session) -> bool:
+        return await self.import_sessions([session]) == 1
+
+    async def import_sessions(self, sessions: list[Session]) -> int:
+        # keeps the sessions' own timestamps; message ids are assigned by this database
+        sessions_by_id: dict[str, Session] = {}
+        for session in sessions:
+            sessions_by_id.setdefault(session.session_id, session)
+        if not sessions_by_id:
+            return 0
+
+        try:
+            # one statement per batch of sessions and one per batch of messages, in a single transaction
+            result = await self.session.execute(
+                pg_insert(DbSession)
+                .on_conflict_do_nothing(index_elements=[DbSession.session_id])
+                .returning(DbSession.session_id),
+                [
+                    {
+                        'session_id': session.session_id,
+                        'title': session.title,
+                        'create_time': session.created_at,
+                        'update_time': session.updated_at,
+                    }
+                    for session in sessions_by_id.values()
+                ],
+            )
+            imported_session_ids = set(result.scalars())
+
+            message_rows = [
+                {
+                    'session_id': session.session_id,
+                    'role': message.role.value,
+                    'content': message.content,
+                    'timestamp': message.timestamp,
+                    'steps': steps_to_json(message.steps),
+                }
+                for session in sessions_by_id.values()
+                if session.session_id in imported_session_ids
+                for message in session.messages
+            ]
+            if message_rows:
+                await self.session.execute(insert(DbMessage), message_rows)
+            if imported_session_ids:
+                # sessions updated long ago do not move the latest update time, so the list version has to change
+                await self.session.execute(bump_session_list_generation())
+            await self.session.commit()
+            return len(imported_session_ids)
+        except SQLAlchemyError:
+            await self.session.rollback()
+            raise
+
     async def get_session(self, session_id: str) -> Session | None:
-        result = await self.session.execute(select(DbSession).where(DbSession.session_id == session_id))
+        result = await self.session.execute(
+            select(DbSession).where(DbSession.session_id == session_id).execution_options(populate_existing=True)
+        )
         db_session = result.scalar_one_or_none()
         return db_session.to_core() if db_session else None
 
     async def add_message(
         self, session_id: str, role: MessageRole, content: str, steps: list[ProcessingStep] | None = None
     ) -> None:
-        result = await self.session.execute(select(DbSession).where(DbSession.session_id == session_id))
-        db_session = result.scalar_one_or_none()
+        core_message = Message(role=role, content=content, steps=steps or [])
+        if self.write_buffer is not None:
+            await self.write_buffer.append(session_id, core_message)
+            return
 
-        if db_session is None:
-            raise KeyError(f'Session {session_id} not found')
+        try:
+            result = await self.session.execute(self._build_append_statement(session_id, core_message))
+            if result.scalar_one_or_none() is None:
+                raise KeyError(f'Session {session_id} not found')
+            await self.session.commit()
+        except (SQLAlchemyError, KeyError):
+            await self.session.rollback()
+            raise
 
-        core_message = Message(role=role, content=content, steps=steps or [])
-        db_message = DbMessage.from_core(core_message, session_id=session_id)
+    @staticmethod
+    def _build_append_statement(session_id: str, message: Message) -> Select:
+        """
+        Build a single statement that appends a message without loading the session graph.
+
+        The session row is touched first so that a missing session yields no message id, then the message is
+        inserted, with its processing steps inline, through a chained data-modifying CTE.
+        """
+        touched_session = (
+            update(DbSession)
+            .where(DbSession.session_id == session_id)
+            .values(update_time=message.timestamp)
+            .returning(DbSession.session_id)
+            .cte('touched_session')
+        )
+        new_message = (
+            insert(DbMessage)
+            .from_select(
+                ['session_id', 'role', 'content', 'timestamp', 'steps'],
+                select(
+                    touched_session.c.session_id,
+                    literal(message.role.value, Text),
+                    literal(message.content, Text),
+                    literal(message.timestamp, DateTime(timezone=True)),
+                    literal(steps_to_json(message.steps), JSONB),
+                ),
+            )
+            .returning(DbMessage.id)
+            .cte('new_message')
+        )
+        return select(new_message.c.id)
+
+    async def get_recent_messages(self, session_id: str, max_turns: int = 5) -> list[Message]:
+        result = await self.session.execute(self._build_recent_messages_statement(session_id, max_turns))
+        return [db_message.to_core() for db_message in reversed(result.scalars().all())]
 
-        db_session.messages.append(db_message)
+    async def add_user_message_and_get_recent_messages(
+        self, session_id: str, content: str, max_turns: int = 5
+    ) -> list[Message]:
+        core_message = Message(role=MessageRole.USER, content=content)
+        if self.write_buffer is not None:
+            await self.write_buffer.append(session_id, core_message)
+            return await self.get_recent_messages(session_id, max_turns=max_turns)
 
         try:
+            result = await self.session.execute(self._build_append_statement(session_id, core_message))
+            if result.scalar_one_or_none() is None:
+                raise KeyError(f'Session {session_id} not found')
+
+            result = await self.session.execute(self._build_recent_messages_statement(session_id, max_turns))
+            db_messages = result.scalars().all()
             await self.session.commit()
-            await self.session.refresh(db_session)
-        except SQLAlchemyError:
+        except (SQLAlchemyError, KeyError):
             await self.session.rollback()
             raise
 
-    async def get_recent_messages(self, session_id: str, max_turns: int = 5) -> list[Message]:
-        core_session = await self.get_session(session_id)
-        if core_session is None:
-            return []
-        return core_session.get_recent_messages(max_turns=max_turns)
+        return [db_message.to_core() for db_message in reversed(db_messages)]
+
+    @staticmethod
+    def _build_recent_messages_statement(session_id: str, max_turns: int) -> Select[tuple[DbMessage]]:
+        """Select the newest messages of a session (newest first), bounded by the number of turns."""
+        return (
+            select(DbMessage)
+            .where(DbMessage.session_id == session_id)
+            .order_by(DbMessage.timestamp.desc(), DbMessage.id.desc())
+            .limit(max_turns * 2)
+            .execution_options(populate_existing=True)
+        )
 
-    async def get_all_sessions(self) -> list[Session]:
-        result = await self.session.execute(select(DbSession).order_by(DbSession.update_time.desc()))
-        return [db_session.to_core() for db_session in result.scalars().all()]
+    async def get_session_summaries(self, limit: int, cursor: SessionListCursor | None = None) -> list[SessionSummary]:
+        statement = (
+            self._build_summary_statement()
+            .order_by(DbSession.update_time.desc(), DbSession.session_id.desc())
+            .limit(limit)
+        )
+        if cursor is not None:
+            statement = statement.where(
+                tuple_(DbSession.update_time, DbSession.session_id)
+                < tuple_(literal(cursor.updated_at, DateTime(timezone=True)), literal(cursor.session_id, Text))
+            )
+
+        result = await self.session.execute(statement)
+        return [self._row_to_summary(row) for row in result]
+
+    async def get_session_summary(self, session_id: str) -> SessionSummary | None:
+        result = await self.session.execute(self._build_summary_statement().where(DbSession.session_id == session_id))
+        row = result.one_or_none()
+        return self._row_to_summary(row) if row else None
+
+    async def get_session_version(self, session_id: str) -> int | None:
+        # both lookups are answered from the primary key and the (session_id, id) message index
+        latest_message_id = (
+            select(func.max(DbMessage.id))
+            .where(DbMessage.session_id == DbSession.session_id)
+            .correlate(DbSession)
+            .scalar_subquery()
+        )
+        result = await self.session.execute(
+            select(DbSession.session_id, func.coalesce(latest_message_id, 0).label('version')).where(
+                DbSession.session_id == session_id
+            )
+        )
+        row = result.one_or_none()
+        return row.version if row else None
+
+    async def get_session_list_version(self) -> SessionListVersion:
+        # both are index lookups: the single state row and the top of the update time index
+        result = await self.session.execute(
+            select(
+                select(DbSessionListState.generation).where(DbSessionListState.id == 1).scalar_subquery(),
+                select(func.max(DbSession.update_time)).scalar_subquery(),
+            )
+        )
+        generation, updated_at = result.one()
+        return SessionListVersion(generation=generation, updated_at=updated_at)
+
+    async def count_sessions(self) -> int:
+        return (await self.session.execute(select(func.count()).select_from(DbSession))).scalar_one()
+
+    @staticmethod
+    def _build_summary_statement() -> Select:
+        """Select session summary columns, computing the turn count and in-progress query in SQL."""
+        # a turn is an assistant message directly following a user message, as in `build_session_turns`
+        paired_messages = (
+            select(DbMessage.role, func.lag(DbMessage.role).over(order_by=DbMessage.id).label('query_role'))
+            .where(DbMessage.session_id == DbSession.session_id)
+            .correlate(DbSession)
+            .subquery('paired_messages')
+        )
+        turn_count = (
+            select(func.count())
+            .select_from(paired_messages)
+            .where(
+                paired_messages.c.role == MessageRole.ASSISTANT.value,
+                paired_messages.c.query_role == MessageRole.USER.value,
+            )
+            .scalar_subquery()
+        )
+        last_message = (
+            select(DbMessage.role, DbMessage.content)
+            .where(DbMessage.session_id == DbSession.session_id)
+            .order_by(DbMessage.timestamp.desc(), DbMessage.id.desc())
+            .limit(1)
+            .correlate(DbSession)
+            .lateral('last_message')
+        )
+        return select(
+            DbSession.session_id,
+            DbSession.title,
+            DbSession.update_time,
+            turn_count.label('turn_count'),
+            case((last_message.c.role == MessageRole.USER.value, last_message.c.content)).label('in_progress_query'),
+        ).outerjoin(last_message, true())
+
+    @staticmethod
+    def _row_to_summary(row: Row) -> SessionSummary:
+        return SessionSummary(
+            session_id=row.session_id,
+            title=row.title,
+            turn_count=row.turn_count,
+            updated_at=row.update_time,
+            in_progress_query=row.in_progress_query,
+        )
+
+    async def get_session_turns(
+        self,
+        session_id: str,
+        limit: int,
+        before: int | None = None,
+        after: int | None = None,
+        include_steps: bool = False,
+    ) -> list[SessionTurn]:
+        # pair every message with its predecessor in insertion order, which is also the turn cursor order;
+        # a turn is an assistant message that directly follows a user message
+        window_order = DbMessage.id
+        paired_messages = select(
+            DbMessage.id,
+            DbMessage.role,
+            DbMessage.content,
+            func.lag(DbMessage.role).over(order_by=window_order).label('query_role'),
+            func.lag(DbMessage.content).over(order_by=window_order).label('query'),
+            func.lag(DbMessage.timestamp).over(order_by=window_order).label('query_timestamp'),
+            (DbMessage.steps if include_steps else literal(None, JSONB)).label('steps'),
+        ).where(DbMessage.session_id == session_id)
+        if before is not None:
+            # later messages never change the pairing of earlier ones
+            paired_messages = paired_messages.where(DbMessage.id < before)
+        if after is not None:
+            # a cursor need not be a turn id, so pairing starts at the message at or before it, which may be the
+            # query of the first turn after it; the cursor itself is applied once the messages are paired
+            paired_messages = paired_messages.where(DbMessage.id >= self._message_at_or_before(session_id, after))
+        paired_messages = paired_messages.subquery('paired_messages')
+
+        turn_conditions = [
+            paired_messages.c.role == MessageRole.ASSISTANT.value,
+            paired_messages.c.query_role == MessageRole.USER.value,
+        ]
+        if after is not None:
+            turn_conditions.append(paired_messages.c.id > after)
+
+        is_forward = after is not None and before is None
+        statement = (
+            select(paired_messages)
+            .where(*turn_conditions)
+            .order_by(paired_messages.c.id.asc() if is_forward else paired_messages.c.id.desc())
+            .limit(limit)
+        )
+        result = await self.session.execute(statement)
+        rows = result.all()
+        if not is_forward:
+            rows.reverse()
+
+        return [
+            SessionTurn.model_validate(
+                {
+                    'id': row.id,
+                    'query': row.query,
+                    'response': row.content,
+                    'timestamp': row.query_timestamp.isoformat(),
+                    'steps': row.steps if include_steps else [],
+                }
+            )
+            for row in rows
+        ]
+
+    @staticmethod
+    def _message_at_or_before(session_id: str, cursor: int) -> ScalarSelect[int]:
+        """Id of the latest message of the session at or before the cursor, or 0; a single index lookup."""
+        return (
+            select(func.coalesce(func.max(DbMessage.id), 0))
+            .where(DbMessage.session_id == session_id, DbMessage.id <= cursor)
+            .scalar_subquery()
+        )
+
+    async def get_session_turns_since(self, session_id: str, since: int) -> SessionTurnDelta | None:
+        # left join from the session row so that a missing session and an unchanged one can be told apart; the
+        # messages start at the one at or before the version, which may be the query of the first new turn
+        result = await self.session.execute(
+            select(DbSession.session_id, DbMessage)
+            .outerjoin(
+                DbMessage,
+                and_(
+                    DbMessage.session_id == DbSession.session_id,
+                    DbMessage.id >= self._message_at_or_before(session_id, since),
+                ),
+            )
+            .where(DbSession.session_id == session_id)
+            .order_by(DbMessage.id)
+        )
+        rows = result.all()
+        if not rows:
+            return None
+
+        messages = [db_message.to_core() for _, db_message in rows if db_message is not None]
+        return SessionTurnDelta.from_messages(messages, since)
+
+    async def iter_sessions(self, batch_size: int = 100) -> AsyncIterator[Session]:
+        # a server-side cursor, fetching `batch_size` sessions at a time along with their messages in one query
+        result = await self.session.stream_scalars(
+            select(DbSession).order_by(DbSession.session_id).execution_options(yield_per=batch_size)
+        )
+        async for db_session in result:
+            yield db_session.to_core()
+            # detached right away, so the identity map never holds more than a batch
+            self.session.expunge(db_session)
+
+    async def search_messages(
+        self, query: str, limit: int, cursor: SessionSearchCursor | None = None
+    ) -> list[SessionSearchResult]:
+        # every word of the query has to match, stemmed by the same configuration as the content index
+        ts_query = func.plainto_tsquery(literal_column(f"'{SEARCH_TEXT_CONFIG}'::regconfig"), query)
+        search_vector = literal_column(MESSAGE_SEARCH_VECTOR)
+        matches = (
+            select(
+                DbMessage.id,
+                DbMessage.session_id,
+                DbMessage.role,
+                DbMessage.content,
+                DbMessage.timestamp,
+                func.ts_rank_cd(search_vector, ts_query).label('rank'),
+            )
+            .where(search_vector.bool_op('@@')(ts_query))
+            .subquery('matches')
+        )
+
+        next_message = aliased(DbMessage)
+        answer_id = (
+            select(case((next_message.role == MessageRole.ASSISTANT.value, next_message.id)))
+            .where(next_message.session_id == matches.c.session_id, next_message.id > matches.c.id)
+            .order_by(next_message.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        statement = (
+            select(
+                matches,
+                DbSession.title,
+                case((matches.c.role == MessageRole.ASSISTANT.value, matches.c.id), else_=answer_id).label('turn_id'),
+            )
+            .join(DbSession, DbSession.session_id == matches.c.session_id)
+            .order_by(matches.c.rank.desc(), matches.c.id.desc())
+            .limit(limit)
+        )
+        if cursor is not None:
+            statement = statement.where(
+                tuple_(matches.c.rank, matches.c.id) < tuple_(literal(cursor.rank), literal(cursor.message_id))
+            )
+
+        result = await self.session.execute(statement)
+        return [
+            SessionSearchResult(
+                session_id=row.session_id,
+                title=row.title,
+                message_id=row.id,
+                turn_id=row.turn_id,
+                role=row.role,
+                content=row.content,
+                timestamp=row.timestamp,
+                rank=row.rank,
+            )
+            for row in result
+        ]
 
     async def delete_session(self, session_id: str) -> bool:
-        result = await self.session.execute(select(DbSession).where(DbSession.session_id == session_id))
-        db_session = result.scalar_one_or_none()
+        # messages are removed by the ON DELETE CASCADE foreign key, without loading them
+        try:
+            result = await self.session.execute(
+                delete(DbSession).where(DbSession.session_id == session_id).returning(DbSession.session_id)
+            )
+            deleted = result.scalar_one_or_none() is not None
+            await self.session.commit()
+            return deleted
+        except SQLAlchemyError:
+            await self.session.rollback()
+            raise
+
+    async def delete_expired_sessions(
+        self, updated_before: datetime | None = None, keep_latest: int | None = None, limit: int = 500
+    ) -> int:
+        conditions = []
+        if updated_before is not None:
+            conditions.append(DbSession.update_time < updated_before)
+        if keep_latest is not None:
+            latest_sessions = (
+                select(DbSession.session_id)
+                .order_by(DbSession.update_time.desc(), DbSession.session_id.desc())
+                .limit(keep_latest)
+            )
+            conditions.append(DbSession.session_id.not_in(latest_sessions))
+        if not conditions:
+            return 0
 
-        if db_session is None:
-            return False
+        # oldest first, skipping rows locked by concurrent writers so a purge never waits on a live session
+        expired_sessions = (
+            select(DbSession.session_id)
+            .where(or_(*conditions))
+            .order_by(DbSession.update_time, DbSession.session_id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
 
         try:
-            await self.session.delete(db_session)
+            result = await self.session.execute(
+                delete(DbSession).where(DbSession.session_id.in_(expired_sessions)).returning(DbSession.session_id)
+            )
+            deleted_count = len(result.all())
             await self.session.commit()
-            return True
+            return deleted_count
         except SQLAlchemyError:
             await self.session.rollback()
             raise
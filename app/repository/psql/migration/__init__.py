@@ -0,0 +1,10 @@
+from .base import Migration
+from .runner import MIGRATION_TABLE_NAME, MigrationRunner
+from .versions import MIGRATIONS
+
+__all__ = [
+    'Migration',
+    'MigrationRunner',
+    'MIGRATIONS',
+    'MIGRATION_TABLE_NAME',
+]
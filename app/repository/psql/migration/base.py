@@ -0,0 +1,17 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    A versioned schema change made of raw SQL statements.
+
+    Non-transactional migrations run in autocommit mode, which online operations such as
+    `CREATE INDEX CONCURRENTLY` require. Their statements must be idempotent because a failure can leave
+    them partially applied.
+    """
+
+    version: int
+    description: str
+    statements: list[str] = field(default_factory=list)
+    transactional: bool = True
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from .base import Migration
+from .versions import MIGRATIONS
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_TABLE_NAME = 'schema_migration'
+
+# arbitrary key for the advisory lock that keeps concurrently starting workers from migrating at the same time
+_MIGRATION_LOCK_KEY = 70860031
+_MIGRATION_LOCK_POLL_INTERVAL_SECONDS = 0.5
+
+
+class MigrationRunner:
+    """Apply versioned schema migrations in order, recording each applied version."""
+
+    def __init__(self, engine: AsyncEngine, migrations: list[Migration] | None = None):
+        self.engine = engine
+        self.migrations = sorted(migrations if migrations is not None else MIGRATIONS, key=lambda m: m.version)
+
+    async def upgrade(self) -> list[int]:
+        """
+        Apply all pending migrations.
+
+        Returns:
+            The versions that were applied by this call
+        """
+        applied_versions: list[int] = []
+
+        async with self.engine.connect() as connection:
+            connection = await connection.execution_options(isolation_level='AUTOCOMMIT')
+            await self._acquire_lock(connection)
+
+            try:
+                await connection.exec_driver_sql(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {MIGRATION_TABLE_NAME} (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT NOT NULL,
+                        applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+                    )
+                    """
+                )
+                result = await connection.execute(text(f'SELECT version FROM {MIGRATION_TABLE_NAME}'))
+                existing_versions = set(result.scalars().all())
+
+                for migration in self.migrations:
+                    if migration.version in existing_versions:
+                        continue
+
+                    logger.info(f'Applying migration {migration.version}: {migration.description}')
+                    if migration.transactional:
+                        async with self.engine.begin() as transaction:
+                            await self._apply(transaction, migration)
+                    else:
+                        await self._apply(connection, migration)
+
+                    applied_versions.append(migration.version)
+            finally:
+                await connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': _MIGRATION_LOCK_KEY})
+
+        return applied_versions
+
+    @staticmethod
+    async def _acquire_lock(connection: AsyncConnection) -> None:
+        # polled instead of waited for in pg_advisory_lock: a waiting statement keeps its snapshot open, and a
+        # concurrent index build of the worker holding the lock waits for every older snapshot, so both would hang
+        while not await connection.scalar(text('SELECT pg_try_advisory_lock(:key)'), {'key': _MIGRATION_LOCK_KEY}):
+            await asyncio.sleep(_MIGRATION_LOCK_POLL_INTERVAL_SECONDS)
+
+    async def _apply(self, connection: AsyncConnection, migration: Migration) -> None:
+        for statement in migration.statements:
+            await connection.exec_driver_sql(statement)
+
+        await connection.execute(
+            text(f'INSERT INTO {MIGRATION_TABLE_NAME} (version, description) VALUES (:version, :description)'),
+            {'version': migration.version, 'description': migration.description},
+        )
@@ -0,0 +1,197 @@
+from .base import Migration
+
+MIGRATIONS: list[Migration] = [
+    Migration(
+        version=1,
+        description='Create the baseline schema',
+        statements=[
+            """
+            CREATE TABLE IF NOT EXISTS role (
+                id SERIAL PRIMARY KEY,
+                name TEXT NOT NULL,
+                key TEXT NOT NULL,
+                description TEXT NOT NULL,
+                update_time TIMESTAMP WITH TIME ZONE NOT NULL,
+                create_time TIMESTAMP WITH TIME ZONE NOT NULL
+            )
+            """,
+            'CREATE UNIQUE INDEX IF NOT EXISTS ix_role_name ON role (name)',
+            'CREATE UNIQUE INDEX IF NOT EXISTS ix_role_key ON role (key)',
+            """
+            CREATE TABLE IF NOT EXISTS end_user (
+                id SERIAL PRIMARY KEY,
+                username TEXT NOT NULL,
+                email TEXT NOT NULL,
+                password_hash TEXT,
+                is_verified BOOLEAN,
+                update_time TIMESTAMP WITH TIME ZONE NOT NULL,
+                create_time TIMESTAMP WITH TIME ZONE NOT NULL
+            )
+            """,
+            'CREATE UNIQUE INDEX IF NOT EXISTS ix_end_user_username ON end_user (username)',
+            'CREATE UNIQUE INDEX IF NOT EXISTS ix_end_user_email ON end_user (email)',
+            """
+            CREATE TABLE IF NOT EXISTS user_roles (
+                user_id INTEGER REFERENCES end_user (id) ON DELETE CASCADE,
+                role_id INTEGER REFERENCES role (id) ON DELETE CASCADE,
+                CONSTRAINT unique_user_role UNIQUE (user_id, role_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS session (
+                session_id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                update_time TIMESTAMP WITH TIME ZONE NOT NULL,
+                create_time TIMESTAMP WITH TIME ZONE NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS message (
+                id SERIAL PRIMARY KEY,
+                session_id TEXT NOT NULL REFERENCES session (session_id) ON DELETE CASCADE,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                timestamp TIMESTAMP WITH TIME ZONE NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS processing_step (
+                id SERIAL PRIMARY KEY,
+                message_id INTEGER NOT NULL REFERENCES message (id) ON DELETE CASCADE,
+                description TEXT NOT NULL,
+                status TEXT NOT NULL,
+                timestamp TIMESTAMP WITH TIME ZONE NOT NULL
+            )
+            """,
+        ],
+    ),
+    Migration(
+        version=2,
+        description='Index the hot session and message lookups',
+        statements=[
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_message_session_id_id ON message (session_id, id)',
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_message_session_id_timestamp ON message (session_id, timestamp)',
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_processing_step_message_id ON processing_step (message_id)',
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_session_update_time_session_id ON session (update_time, session_id)',
+        ],
+        transactional=False,
+    ),
+    Migration(
+        version=3,
+        description='Store processing steps inline as a JSONB array on message',
+        statements=[
+            "ALTER TABLE message ADD COLUMN IF NOT EXISTS steps JSONB NOT NULL DEFAULT '[]'",
+            """
+            UPDATE message
+            SET steps = aggregated.steps
+            FROM (
+                SELECT
+                    message_id,
+                    jsonb_agg(
+                        jsonb_build_object('description', description, 'status', status, 'timestamp', timestamp)
+                        ORDER BY id
+                    ) AS steps
+                FROM processing_step
+                GROUP BY message_id
+            ) AS aggregated
+            WHERE message.id = aggregated.message_id
+            """,
+            'DROP TABLE processing_step',
+        ],
+    ),
+    Migration(
+        version=4,
+        description='Index message content for full-text search',
+        statements=[
+            # an expression index leaves the table as it is, where a stored vector column would rewrite it under an
+            # exclusive lock; the configuration is SEARCH_TEXT_CONFIG of the model, which queries use to match it
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_message_content_search
+            ON message USING GIN (to_tsvector('english', content))
+            """,
+        ],
+        transactional=False,
+    ),
+    Migration(
+        version=5,
+        description='Create the session archive, partitioned by month of update time',
+        statements=[
+            # partitions are created by the archival job for the months it archives
+            """
+            CREATE TABLE IF NOT EXISTS session_archive (
+                session_id TEXT NOT NULL,
+                update_time TIMESTAMP WITH TIME ZONE NOT NULL,
+                title TEXT NOT NULL,
+                create_time TIMESTAMP WITH TIME ZONE NOT NULL,
+                archive_time TIMESTAMP WITH TIME ZONE NOT NULL,
+                turn_count INTEGER NOT NULL,
+                in_progress_query TEXT,
+                version INTEGER NOT NULL,
+                messages BYTEA NOT NULL,
+                PRIMARY KEY (session_id, update_time)
+            ) PARTITION BY RANGE (update_time)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_session_archive_update_time_session_id
+            ON session_archive (update_time, session_id)
+            """,
+            # the messages are compressed before they are stored, compressing them again would only cost time
+            'ALTER TABLE session_archive ALTER COLUMN messages SET STORAGE EXTERNAL',
+        ],
+    ),
+    Migration(
+        version=6,
+        description='Make archived sessions searchable',
+        statements=[
+            # no default, so adding the column does not rewrite the archive
+            'ALTER TABLE session_archive ADD COLUMN IF NOT EXISTS search_vector TSVECTOR',
+            # partitioned tables cannot be indexed concurrently, so archival and restores wait for the builds; they are
+            # quick, as no archived session has a vector yet
+            """
+            CREATE INDEX IF NOT EXISTS ix_session_archive_search_vector
+            ON session_archive USING GIN (search_vector)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_session_archive_unsearchable
+            ON session_archive (session_id) WHERE search_vector IS NULL
+            """,
+        ],
+    ),
+    Migration(
+        version=7,
+        description='Count the changes to the session list that its latest update time does not show',
+        statements=[
+            # a single row, so that the version of the session list is two index lookups instead of a count
+            """
+            CREATE TABLE IF NOT EXISTS session_list_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                generation BIGINT NOT NULL
+            )
+            """,
+            'INSERT INTO session_list_state (id, generation) VALUES (1, 0) ON CONFLICT (id) DO NOTHING',
+            # deletions are counted by triggers, so that every way of deleting sessions is; imports by the repositories
+            """
+            CREATE OR REPLACE FUNCTION bump_session_list_generation() RETURNS TRIGGER AS $$
+            BEGIN
+                IF EXISTS (SELECT 1 FROM deleted_sessions) THEN
+                    UPDATE session_list_state SET generation = generation + 1 WHERE id = 1;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+            """,
+            'DROP TRIGGER IF EXISTS session_list_deletion ON session',
+            """
+            CREATE TRIGGER session_list_deletion AFTER DELETE ON session
+            REFERENCING OLD TABLE AS deleted_sessions
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_session_list_generation()
+            """,
+            'DROP TRIGGER IF EXISTS session_list_deletion ON session_archive',
+            """
+            CREATE TRIGGER session_list_deletion AFTER DELETE ON session_archive
+            REFERENCING OLD TABLE AS deleted_sessions
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_session_list_generation()
+            """,
+        ],
+    ),
+]
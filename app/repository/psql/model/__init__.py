@@ -1,5 +1,14 @@
 from .base import Base
-from .session import DbMessage, DbProcessingStep, DbSession
+from .session import (
+    MESSAGE_SEARCH_VECTOR,
+    SEARCH_TEXT_CONFIG,
+    DbMessage,
+    DbSession,
+    DbSessionArchive,
+    DbSessionListState,
+    bump_session_list_generation,
+    steps_to_json,
+)
 from .user import DbRole, DbUser, user_roles
 
 __all__ = [
@@ -8,6 +17,11 @@ __all__ = [
     'DbRole',
     'DbSession',
     'DbMessage',
-    'DbProcessingStep',
+    'DbSessionArchive',
+    'DbSessionListState',
     'user_roles',
+    'steps_to_json',
+    'bump_session_list_generation',
+    'MESSAGE_SEARCH_VECTOR',
+    'SEARCH_TEXT_CONFIG',
 ]
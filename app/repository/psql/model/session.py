@@ -1,45 +1,41 @@
 from datetime import datetime
-from typing import Literal, cast
-
-from sqlalchemy import DateTime, ForeignKey, Integer, Text
+from typing import Any
+
+from sqlalchemy import (
+    BigInteger,
+    CheckConstraint,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    Text,
+    Update,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from core.enum.session import MessageRole
 from core.model.session import Message, ProcessingStep, Session
+from core.type import JsonObject
 
 from .base import Base, TimestampedMixin
 
+# text search configuration of the message content index (migration 4); queries have to use the same one to match it
+SEARCH_TEXT_CONFIG = 'english'
 
-class DbProcessingStep(Base):
-    __tablename__ = 'processing_step'
-
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    message_id: Mapped[int] = mapped_column(Integer, ForeignKey('message.id', ondelete='CASCADE'), nullable=False)
-    description: Mapped[str] = mapped_column(Text, nullable=False)
-    status: Mapped[str] = mapped_column(Text, nullable=False)
-    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
-
-    message: Mapped['DbMessage'] = relationship('DbMessage', back_populates='steps')
-
-    def to_core(self) -> ProcessingStep:
-        return ProcessingStep(
-            description=self.description,
-            status=cast(Literal['in_progress', 'completed'], self.status),
-            timestamp=self.timestamp,
-        )
-
-    @classmethod
-    def from_core(cls, step: ProcessingStep, message_id: int | None = None) -> 'DbProcessingStep':
-        return cls(
-            message_id=message_id,
-            description=step.description,
-            status=step.status,
-            timestamp=step.timestamp,
-        )
+# the indexed expression, as queries have to spell it for the planner to use the index
+MESSAGE_SEARCH_VECTOR = f"to_tsvector('{SEARCH_TEXT_CONFIG}', content)"
 
 
 class DbMessage(Base):
     __tablename__ = 'message'
+    __table_args__ = (
+        Index('ix_message_session_id_id', 'session_id', 'id'),
+        Index('ix_message_session_id_timestamp', 'session_id', 'timestamp'),
+        Index('ix_message_content_search', text(MESSAGE_SEARCH_VECTOR), postgresql_using='gin'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     session_id: Mapped[str] = mapped_column(Text, ForeignKey('session.session_id', ondelete='CASCADE'), nullable=False)
@@ -47,21 +43,27 @@ class DbMessage(Base):
     content: Mapped[str] = mapped_column(Text, nullable=False)
     timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
+    steps: Mapped[list[JsonObject]] = mapped_column(JSONB, nullable=False, default=list, server_default=text("'[]'"))
+
     session: Mapped['DbSession'] = relationship('DbSession', back_populates='messages')
-    steps: Mapped[list['DbProcessingStep']] = relationship(
-        'DbProcessingStep',
-        back_populates='message',
-        cascade='all, delete-orphan',
-        lazy='selectin',
-    )
 
     def to_core(self) -> Message:
-        return Message(
-            role=MessageRole(self.role),
-            content=self.content,
-            timestamp=self.timestamp,
-            steps=[step.to_core() for step in self.steps],
-        )
+        return Message.model_validate(self.to_core_data())
+
+    def to_core_data(self) -> dict[str, Any]:
+        """
+        Get the fields of the core message as plain data.
+
+        Validating a whole tree of plain data is a single call into pydantic-core, which is considerably faster than
+        constructing every nested model (or `model_construct`-ing them) one by one from Python.
+        """
+        return {
+            'id': self.id,
+            'role': self.role,
+            'content': self.content,
+            'timestamp': self.timestamp,
+            'steps': self.steps,
+        }
 
     @classmethod
     def from_core(cls, message: Message, session_id: str | None = None) -> 'DbMessage':
@@ -70,12 +72,17 @@ class DbMessage(Base):
             role=message.role.value,
             content=message.content,
             timestamp=message.timestamp,
-            steps=[DbProcessingStep.from_core(step) for step in message.steps],
+            steps=steps_to_json(message.steps),
         )
 
 
+def steps_to_json(steps: list[ProcessingStep]) -> list[JsonObject]:
+    return [step.model_dump(mode='json') for step in steps]
+
+
 class DbSession(Base, TimestampedMixin):
     __tablename__ = 'session'
+    __table_args__ = (Index('ix_session_update_time_session_id', 'update_time', 'session_id'),)
 
     session_id: Mapped[str] = mapped_column(Text, primary_key=True)
     title: Mapped[str] = mapped_column(Text, nullable=False)
@@ -84,17 +91,20 @@ class DbSession(Base, TimestampedMixin):
         'DbMessage',
         back_populates='session',
         cascade='all, delete-orphan',
+        passive_deletes=True,
         lazy='selectin',
         order_by='DbMessage.timestamp',
     )
 
     def to_core(self) -> Session:
-        return Session(
-            session_id=self.session_id,
-            title=self.title,
-            messages=[msg.to_core() for msg in self.messages],
-            created_at=self.create_time,
-            updated_at=self.update_time,
+        return Session.model_validate(
+            {
+                'session_id': self.session_id,
+                'title': self.title,
+                'messages': [msg.to_core_data() for msg in self.messages],
+                'created_at': self.create_time,
+                'updated_at': self.update_time,
+            }
         )
 
     @classmethod
@@ -102,5 +112,61 @@ class DbSession(Base, TimestampedMixin):
         return cls(
             session_id=session.session_id,
             title=session.title,
+            create_time=session.created_at,
+            update_time=session.updated_at,
             messages=[DbMessage.from_core(msg, session.session_id) for msg in session.messages],
         )
+
+
+class DbSessionArchive(Base):
+    """
+    A cold session moved out of the session and message tables, with its summary precomputed and its messages stored
+    as zlib-compressed JSON. The table is partitioned by month of the update time.
+    """
+
+    __tablename__ = 'session_archive'
+    __table_args__ = (
+        Index('ix_session_archive_update_time_session_id', 'update_time', 'session_id'),
+        Index('ix_session_archive_search_vector', 'search_vector', postgresql_using='gin'),
+        # finds the sessions archived before their messages were made searchable, and is empty once they are
+        Index(
+            'ix_session_archive_unsearchable',
+            'session_id',
+            postgresql_where=text('search_vector IS NULL'),
+        ),
+        {'postgresql_partition_by': 'RANGE (update_time)'},
+    )
+
+    # the partition key has to be part of the primary key
+    session_id: Mapped[str] = mapped_column(Text, primary_key=True)
+    update_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    title: Mapped[str] = mapped_column(Text, nullable=False)
+    create_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    archive_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    turn_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    in_progress_query: Mapped[str | None] = mapped_column(Text, nullable=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    messages: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    # the words of every message, as the messages themselves are compressed
+    search_vector: Mapped[str | None] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+
+
+class DbSessionListState(Base):
+    """
+    The single row counting the changes to the session list that the latest update time does not show: deletions,
+    counted by triggers, and imports of sessions with their own update times.
+    """
+
+    __tablename__ = 'session_list_state'
+    __table_args__ = (CheckConstraint('id = 1'),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    generation: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+def bump_session_list_generation() -> Update:
+    return (
+        update(DbSessionListState)
+        .where(DbSessionListState.id == 1)
+        .values(generation=DbSessionListState.generation + 1)
+    )
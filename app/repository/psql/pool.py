@@ -0,0 +1,59 @@
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+# upper bounds of the checkout wait histogram buckets, the last bucket counts everything slower
+CHECKOUT_WAIT_BUCKETS_SECONDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    checkout_timeouts: int
+    checkout_wait_seconds_total: float
+    checkout_wait_histogram: dict[str, int]
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that also records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checkouts = 0
+        self._checkout_timeouts = 0
+        self._checkout_wait_seconds_total = 0.0
+        self._checkout_wait_bucket_counts = [0] * (len(CHECKOUT_WAIT_BUCKETS_SECONDS) + 1)
+
+    def connect(self) -> PoolProxiedConnection:
+        started_at = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self._checkout_timeouts += 1
+            raise
+
+        waited = time.perf_counter() - started_at
+        self._checkouts += 1
+        self._checkout_wait_seconds_total += waited
+        self._checkout_wait_bucket_counts[bisect_left(CHECKOUT_WAIT_BUCKETS_SECONDS, waited)] += 1
+        return connection
+
+    def get_stats(self) -> PoolStats:
+        bucket_labels = [f'le_{bound}' for bound in CHECKOUT_WAIT_BUCKETS_SECONDS] + ['le_inf']
+        return PoolStats(
+            size=self.size(),
+            checked_in=self.checkedin(),
+            checked_out=self.checkedout(),
+            overflow=self.overflow(),
+            checkouts=self._checkouts,
+            checkout_timeouts=self._checkout_timeouts,
+            checkout_wait_seconds_total=self._checkout_wait_seconds_total,
+            checkout_wait_histogram=dict(zip(bucket_labels, self._checkout_wait_bucket_counts, strict=True)),
+        )
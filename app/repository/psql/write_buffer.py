@@ -0,0 +1,216 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.model.session import Message
+
+from .model import DbMessage, DbSession, steps_to_json
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class MessageWriteBufferStats:
+    batches: int
+    messages: int
+    fallback_batches: int
+    pending: int
+
+
+@dataclass
+class PendingMessage:
+    session_id: str
+    message: Message
+    future: asyncio.Future[None]
+    enqueued_at: float
+
+
+class MessageWriteBuffer:
+    """
+    Group commit of message appends: appends from many sessions are written together, as one multi-row insert in one
+    transaction, at most `max_delay_seconds` after the first of them or as soon as `max_batch_size` are waiting.
+
+    An append returns only once its transaction has been committed, so an acknowledged message is durable and is
+    seen by any read issued afterwards, whichever connection it uses. Batches are written one at a time, in order.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker[AsyncSession], max_delay_seconds: float, max_batch_size: int):
+        self.session_maker = session_maker
+        self.max_delay_seconds = max_delay_seconds
+        self.max_batch_size = max_batch_size
+        self._pending: list[PendingMessage] = []
+        self._batch_full = asyncio.Event()
+        self._writer_task: asyncio.Task | None = None
+        self._batches = 0
+        self._messages = 0
+        self._fallback_batches = 0
+
+    async def append(self, session_id: str, message: Message) -> None:
+        """
+        Append a message and wait until it is committed.
+
+        Raises:
+            KeyError: If the session does not exist
+        """
+        loop = asyncio.get_running_loop()
+        pending = PendingMessage(session_id, message, loop.create_future(), loop.time())
+        self._pending.append(pending)
+
+        if len(self._pending) >= self.max_batch_size:
+            self._batch_full.set()
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._write_pending())
+
+        # shielded, so that a cancelled caller does not leave its message half acknowledged; it is written regardless
+        await asyncio.shield(pending.future)
+
+    async def flush(self) -> None:
+        """Write all pending messages right away and wait for them, e.g. on shutdown."""
+        if self._writer_task is not None:
+            self._batch_full.set()
+            await asyncio.shield(self._writer_task)
+
+    def get_stats(self) -> MessageWriteBufferStats:
+        return MessageWriteBufferStats(
+            batches=self._batches,
+            messages=self._messages,
+            fallback_batches=self._fallback_batches,
+            pending=len(self._pending),
+        )
+
+    async def _write_pending(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch: list[PendingMessage] = []
+        try:
+            while self._pending:
+                delay = self._pending[0].enqueued_at + self.max_delay_seconds - loop.time()
+                if delay > 0 and len(self._pending) < self.max_batch_size:
+                    try:
+                        await asyncio.wait_for(self._batch_full.wait(), delay)
+                    except TimeoutError:
+                        pass
+
+                batch = self._pending[: self.max_batch_size]
+                del self._pending[: self.max_batch_size]
+                if len(self._pending) < self.max_batch_size:
+                    self._batch_full.clear()
+
+                await self._write_batch(batch)
+        finally:
+            self._writer_task = None
+            # only left unresolved if the writer was cancelled, e.g. on shutdown; the appends are shielded, so they
+            # would wait forever otherwise
+            unwritten, self._pending = batch + self._pending, []
+            self._resolve(unwritten, RuntimeError('The message write buffer stopped before the message was written'))
+
+    async def _write_batch(self, batch: list[PendingMessage]) -> None:
+        try:
+            async with self.session_maker() as session:
+                try:
+                    missing_session_ids = await self._insert_batch(session, batch)
+                    await session.commit()
+                except SQLAlchemyError:
+                    await session.rollback()
+                    raise
+        except SQLAlchemyError as e:
+            # e.g. a deadlock with another process; write one by one so that a single bad append fails alone
+            logger.warning(f'Batched message write failed, writing {len(batch)} messages one by one: {e}')
+            self._fallback_batches += 1
+            await self._write_one_by_one(batch)
+            return
+        except Exception as e:
+            self._resolve(batch, e)
+            return
+
+        self._batches += 1
+        for pending in batch:
+            if pending.session_id in missing_session_ids:
+                self._resolve([pending], KeyError(f'Session {pending.session_id} not found'))
+            else:
+                self._messages += 1
+                self._resolve([pending])
+
+    @staticmethod
+    async def _insert_batch(session: AsyncSession, batch: list[PendingMessage]) -> set[str]:
+        """
+        Insert the messages of a batch and touch their sessions in the current transaction.
+
+        Returns:
+            Ids of the sessions that do not exist, whose messages were left out
+        """
+        session_ids = sorted({pending.session_id for pending in batch})
+        # key share locks keep the sessions from being deleted until the messages referencing them are committed
+        result = await session.execute(
+            select(DbSession.session_id)
+            .where(DbSession.session_id.in_(session_ids))
+            .order_by(DbSession.session_id)
+            .with_for_update(key_share=True)
+        )
+        existing_session_ids = set(result.scalars().all())
+
+        update_times = {}
+        message_rows = []
+        for pending in batch:
+            if pending.session_id not in existing_session_ids:
+                continue
+            message = pending.message
+            update_times[pending.session_id] = max(
+                update_times.get(pending.session_id, message.timestamp), message.timestamp
+            )
+            message_rows.append(
+                {
+                    'session_id': pending.session_id,
+                    'role': message.role.value,
+                    'content': message.content,
+                    'timestamp': message.timestamp,
+                    'steps': steps_to_json(message.steps),
+                }
+            )
+
+        if message_rows:
+            # the sessions are updated in the same order as they were locked, so that two writers with overlapping
+            # batches take the row locks in the same order and cannot deadlock
+            await session.execute(
+                update(DbSession),
+                [
+                    {'session_id': session_id, 'update_time': update_time}
+                    for session_id, update_time in sorted(update_times.items())
+                ],
+            )
+            await session.execute(insert(DbMessage), message_rows)
+
+        return set(session_ids) - existing_session_ids
+
+    async def _write_one_by_one(self, batch: list[PendingMessage]) -> None:
+        for pending in batch:
+            try:
+                async with self.session_maker() as session:
+                    try:
+                        missing_session_ids = await self._insert_batch(session, [pending])
+                        await session.commit()
+                    except SQLAlchemyError:
+                        await session.rollback()
+                        raise
+            except Exception as e:
+                self._resolve([pending], e)
+                continue
+
+            if missing_session_ids:
+                self._resolve([pending], KeyError(f'Session {pending.session_id} not found'))
+            else:
+                self._messages += 1
+                self._resolve([pending])
+
+    @staticmethod
+    def _resolve(batch: list[PendingMessage], error: BaseException | None = None) -> None:
+        for pending in batch:
+            if pending.future.done():
+                continue
+            if error is None:
+                pending.future.set_result(None)
+            else:
+                pending.future.set_exception(error)
@@ -0,0 +1,63 @@
+from collections.abc import AsyncGenerator
+from contextlib import AsyncExitStack, asynccontextmanager
+
+from config.settings import SESSION_ARCHIVE_AFTER_DAYS, SESSION_REPOSITORY_BACKEND
+from core.enum.session import SessionRepositoryBackendEnum
+from core.protocol.repository.session import SessionRepositoryProtocol
+from repository.memory.session import get_memory_session_repository
+from repository.psql.archive import SessionArchive
+from repository.psql.connection import Database, get_read_db, psql_db, psql_session_shard_dbs
+from repository.psql.dao.archive_fallback import ArchiveFallbackSessionRepository
+from repository.psql.dao.asyncpg_session import AsyncpgSessionRepository
+from repository.psql.dao.session import PsqlSessionRepository
+from repository.psql.write_buffer import MessageWriteBuffer
+from repository.sqlite.connection import sqlite_db
+from repository.sqlite.session import SqliteSessionRepository
+
+from .session import ShardedSessionRepository
+
+
+async def _open_repository(
+    stack: AsyncExitStack, db: Database, write_buffer: MessageWriteBuffer | None
+) -> SessionRepositoryProtocol:
+    repository: SessionRepositoryProtocol
+    if SESSION_REPOSITORY_BACKEND == SessionRepositoryBackendEnum.ASYNCPG:
+        repository = AsyncpgSessionRepository(db.engine, write_buffer=write_buffer)
+    else:
+        # database sessions only check out a connection once used, so sharded per-session operations hold a single one
+        session = await stack.enter_async_context(db.async_session_maker())
+        repository = PsqlSessionRepository(session, write_buffer=write_buffer)
+
+    if SESSION_ARCHIVE_AFTER_DAYS is not None:
+        return ArchiveFallbackSessionRepository(repository, SessionArchive(db.engine))
+    return repository
+
+
+@asynccontextmanager
+async def session_repository_scope(read_only: bool = False) -> AsyncGenerator[SessionRepositoryProtocol]:
+    """
+    Open a session repository on the configured databases: process memory if that is the configured backend, the
+    embedded SQLite database if one is configured, otherwise PostgreSQL, sharded if session shards are configured.
+
+    Args:
+        read_only: Serve from the read replica when there is one; session shards are always read from directly
+    """
+    if SESSION_REPOSITORY_BACKEND == SessionRepositoryBackendEnum.MEMORY:
+        yield get_memory_session_repository()
+        return
+
+    if sqlite_db is not None:
+        yield SqliteSessionRepository(sqlite_db)
+        return
+
+    async with AsyncExitStack() as stack:
+        if psql_session_shard_dbs:
+            shards = {
+                name: await _open_repository(stack, db, db.message_write_buffer)
+                for name, db in psql_session_shard_dbs.items()
+            }
+            yield ShardedSessionRepository(shards)
+        elif read_only:
+            yield await _open_repository(stack, get_read_db(), None)
+        else:
+            yield await _open_repository(stack, psql_db, psql_db.message_write_buffer)
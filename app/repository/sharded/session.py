@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import logging
+from collections import defaultdict
+from collections.abc import AsyncIterator, Collection, Mapping
+from datetime import datetime
+from uuid import uuid4
+
+from core.enum.session import MessageRole
+from core.model.session import (
+    Message,
+    ProcessingStep,
+    Session,
+    SessionListCursor,
+    SessionListVersion,
+    SessionSearchCursor,
+    SessionSearchResult,
+    SessionSummary,
+    SessionTurn,
+    SessionTurnDelta,
+)
+from core.protocol.repository.session import SessionRepositoryProtocol
+
+logger = logging.getLogger(__name__)
+
+
+def get_shard_name(session_id: str, shard_names: Collection[str]) -> str:
+    """
+    Pick the shard owning a session by rendezvous hashing.
+
+    Every shard scores the session id and the highest score wins, so adding or removing a shard only moves the
+    sessions won or lost by that shard.
+    """
+
+    def score(shard_name: str) -> bytes:
+        return hashlib.sha256(f'{shard_name}:{session_id}'.encode()).digest()
+
+    return max(shard_names, key=score)
+
+
+class ShardedSessionRepository(SessionRepositoryProtocol):
+    """
+    Session repository spreading sessions over several named shard repositories by a hash of the session id.
+
+    A session and all of its messages live on one shard, so every per-session operation is routed to a single shard;
+    only listing and retention fan out to all of them.
+    """
+
+    def __init__(self, shards: Mapping[str, SessionRepositoryProtocol]):
+        if not shards:
+            raise ValueError('At least one shard is required')
+        self.shards = dict(shards)
+
+    def get_shard(self, session_id: str) -> SessionRepositoryProtocol:
+        return self.shards[get_shard_name(session_id, self.shards.keys())]
+
+    async def create_session(self, title: str, session_id: str | None = None) -> Session:
+        # the id has to be known up front to pick the shard
+        session_id = session_id or str(uuid4())
+        return await self.get_shard(session_id).create_session(title, session_id=session_id)
+
+    async def import_session(self, session: Session) -> bool:
+        return await self.get_shard(session.session_id).import_session(session)
+
+    async def import_sessions(self, sessions: list[Session]) -> int:
+        sessions_by_shard_name: dict[str, list[Session]] = defaultdict(list)
+        for session in sessions:
+            sessions_by_shard_name[get_shard_name(session.session_id, self.shards.keys())].append(session)
+        imported_counts = await asyncio.gather(
+            *(self.shards[name].import_sessions(batch) for name, batch in sessions_by_shard_name.items())
+        )
+        return sum(imported_counts)
+
+    async def get_session(self, session_id: str) -> Session | None:
+        return await self.get_shard(session_id).get_session(session_id)
+
+    async def get_session_summary(self, session_id: str) -> SessionSummary | None:
+        return await self.get_shard(session_id).get_session_summary(session_id)
+
+    async def get_session_version(self, session_id: str) -> int | None:
+        return await self.get_shard(session_id).get_session_version(session_id)
+
+    async def get_session_list_version(self) -> SessionListVersion:
+        versions = await asyncio.gather(*(shard.get_session_list_version() for shard in self.shards.values()))
+        updated_ats = [version.updated_at for version in versions if version.updated_at is not None]
+        return SessionListVersion(
+            generation=sum(version.generation for version in versions),
+            updated_at=max(updated_ats, default=None),
+        )
+
+    async def count_sessions(self) -> int:
+        return sum(await asyncio.gather(*(shard.count_sessions() for shard in self.shards.values())))
+
+    async def get_session_turns(
+        self,
+        session_id: str,
+        limit: int,
+        before: int | None = None,
+        after: int | None = None,
+        include_steps: bool = False,
+    ) -> list[SessionTurn]:
+        return await self.get_shard(session_id).get_session_turns(
+            session_id, limit, before=before, after=after, include_steps=include_steps
+        )
+
+    async def get_session_turns_since(self, session_id: str, since: int) -> SessionTurnDelta | None:
+        return await self.get_shard(session_id).get_session_turns_since(session_id, since)
+
+    async def add_message(
+        self, session_id: str, role: MessageRole, content: str, steps: list[ProcessingStep] | None = None
+    ) -> None:
+        await self.get_shard(session_id).add_message(session_id, role, content, steps=steps)
+
+    async def get_recent_messages(self, session_id: str, max_turns: int = 5) -> list[Message]:
+        return await self.get_shard(session_id).get_recent_messages(session_id, max_turns=max_turns)
+
+    async def add_user_message_and_get_recent_messages(
+        self, session_id: str, content: str, max_turns: int = 5
+    ) -> list[Message]:
+        return await self.get_shard(session_id).add_user_message_and_get_recent_messages(
+            session_id, content, max_turns=max_turns
+        )
+
+    async def get_session_summaries(self, limit: int, cursor: SessionListCursor | None = None) -> list[SessionSummary]:
+        # every shard returns its own first `limit` rows after the cursor, so the merged first `limit` rows are exact
+        pages = await asyncio.gather(*(shard.get_session_summaries(limit, cursor) for shard in self.shards.values()))
+        merged = heapq.merge(*pages, key=lambda summary: (summary.updated_at, summary.session_id), reverse=True)
+
+        summaries: list[SessionSummary] = []
+        seen_session_ids: set[str] = set()
+        for summary in merged:
+            # a session being moved by a rebalance may briefly exist on two shards
+            if summary.session_id in seen_session_ids:
+                continue
+            seen_session_ids.add(summary.session_id)
+            summaries.append(summary)
+            if len(summaries) == limit:
+                break
+        return summaries
+
+    async def iter_sessions(self, batch_size: int = 100) -> AsyncIterator[Session]:
+        # shard after shard; a session moved by a concurrent rebalance may be missed or seen twice
+        for shard in self.shards.values():
+            async for session in shard.iter_sessions(batch_size):
+                yield session
+
+    async def search_messages(
+        self, query: str, limit: int, cursor: SessionSearchCursor | None = None
+    ) -> list[SessionSearchResult]:
+        # message ids are assigned per shard, so shards are asked for the results tying with the cursor as well, at
+        # most one per shard, and the session id decides the order between those
+        shard_cursor = cursor.model_copy(update={'message_id': cursor.message_id + 1}) if cursor else None
+        pages = await asyncio.gather(
+            *(shard.search_messages(query, limit + 1, shard_cursor) for shard in self.shards.values())
+        )
+        merged = heapq.merge(
+            *pages, key=lambda result: (result.rank, result.message_id, result.session_id), reverse=True
+        )
+
+        results: list[SessionSearchResult] = []
+        seen_messages: set[tuple[str, MessageRole, datetime]] = set()
+        for result in merged:
+            if cursor is not None and (result.rank, result.message_id, result.session_id) >= (
+                cursor.rank,
+                cursor.message_id,
+                cursor.session_id,
+            ):
+                continue
+            # a session being moved by a rebalance may briefly exist on two shards, with other message ids
+            message_key = (result.session_id, result.role, result.timestamp)
+            if message_key in seen_messages:
+                continue
+            seen_messages.add(message_key)
+            results.append(result)
+            if len(results) == limit:
+                break
+        return results
+
+    async def delete_session(self, session_id: str) -> bool:
+        return await self.get_shard(session_id).delete_session(session_id)
+
+    async def delete_expired_sessions(
+        self, updated_before: datetime | None = None, keep_latest: int | None = None, limit: int = 500
+    ) -> int:
+        shard_names = list(self.shards)
+        keep_latest_per_shard: dict[str, int | None] = dict.fromkeys(shard_names)
+
+        if keep_latest is not None:
+            # the latest sessions are kept globally, so each shard keeps exactly its share of the global top
+            pages = await asyncio.gather(
+                *(self.shards[name].get_session_summaries(keep_latest) for name in shard_names)
+            )
+            merged = heapq.merge(
+                *([(summary, name) for summary in page] for name, page in zip(shard_names, pages, strict=True)),
+                key=lambda item: (item[0].updated_at, item[0].session_id),
+                reverse=True,
+            )
+            keep_latest_per_shard = dict.fromkeys(shard_names, 0)
+            for _, name in itertools.islice(merged, keep_latest):
+                keep_latest_per_shard[name] += 1
+
+        # one shard after the other, so that a call never deletes more than `limit` sessions in total; the batches of
+        # a purge are thus oldest first per shard rather than across all shards
+        deleted_count = 0
+        for name in shard_names:
+            if deleted_count >= limit:
+                break
+            deleted_count += await self.shards[name].delete_expired_sessions(
+                updated_before=updated_before, keep_latest=keep_latest_per_shard[name], limit=limit - deleted_count
+            )
+        return deleted_count
+
+    async def rebalance(self, draining: Collection[str] = ()) -> int:
+        """
+        Move every session to the shard that owns it, e.g. after adding shards or before removing `draining` ones.
+
+        Sessions are copied to their owner before being deleted from their current shard, so an interrupted run
+        leaves at most duplicates, which the next run cleans up. Writes to moving sessions should be paused.
+
+        Returns:
+            Number of moved sessions
+        """
+        owner_names = [name for name in self.shards if name not in draining]
+        if not owner_names:
+            raise ValueError('Cannot drain every shard')
+
+        moved_count = 0
+        for shard_name, shard in self.shards.items():
+            cursor: SessionListCursor | None = None
+            while True:
+                summaries = await shard.get_session_summaries(100, cursor)
+                if not summaries:
+                    break
+                cursor = SessionListCursor(updated_at=summaries[-1].updated_at, session_id=summaries[-1].session_id)
+
+                for summary in summaries:
+                    owner_name = get_shard_name(summary.session_id, owner_names)
+                    if owner_name == shard_name:
+                        continue
+
+                    session = await shard.get_session(summary.session_id)
+                    if session is None:
+                        continue
+                    if not await self.shards[owner_name].import_session(session):
+                        logger.info(f'Session {session.session_id} already exists on shard {owner_name}')
+                    await shard.delete_session(session.session_id)
+                    moved_count += 1
+                    logger.info(f'Moved session {session.session_id} from shard {shard_name} to {owner_name}')
+
+        return moved_count
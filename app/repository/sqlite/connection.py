@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import sqlite3
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from typing import TypeVar
+
+from config.settings import SQLITE_DATABASE_PATH
+from core.constant.user import DEFAULT_ROLE_DESCRIPTION, DEFAULT_ROLE_KEY, DEFAULT_ROLE_NAME
+
+from .schema import MIGRATIONS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def to_db_time(value: datetime) -> str:
+    """Store times as fixed-width UTC ISO 8601 text, so that comparing and ordering the text orders the times."""
+    return value.astimezone(UTC).isoformat(timespec='microseconds')
+
+
+def from_db_time(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+class SqliteDatabase:
+    """
+    Embedded SQLite database in WAL mode, for single-node installs without a PostgreSQL server.
+
+    A single connection is owned by a dedicated thread and every repository call runs there as one unit of work, so
+    calls are serialized (SQLite allows one writer at a time anyway) and never block the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+        self._connection: sqlite3.Connection | None = None
+
+    async def run(self, work: Callable[[sqlite3.Connection], T]) -> T:
+        """Run `work` with the connection on the database thread, committing if it succeeds and rolling back if not."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._run, work)
+
+    def _run(self, work: Callable[[sqlite3.Connection], T]) -> T:
+        if self._connection is None:
+            self._connection = self._connect()
+
+        try:
+            result = work(self._connection)
+            self._connection.commit()
+            return result
+        except BaseException:
+            self._connection.rollback()
+            raise
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute('PRAGMA journal_mode = WAL')
+        # with WAL, NORMAL only risks the last transactions on power loss, never corruption
+        connection.execute('PRAGMA synchronous = NORMAL')
+        connection.execute('PRAGMA foreign_keys = ON')
+        connection.execute('PRAGMA busy_timeout = 5000')
+        return connection
+
+    async def run_migrations(self) -> None:
+        applied_versions = await self.run(self._migrate)
+        if applied_versions:
+            logger.info(f'Applied SQLite migrations: {applied_versions}')
+
+    @staticmethod
+    def _migrate(connection: sqlite3.Connection) -> list[int]:
+        # the schema version is kept in the database header instead of a migration table
+        current_version = connection.execute('PRAGMA user_version').fetchone()[0]
+        applied_versions = []
+        for migration in MIGRATIONS:
+            if migration.version <= current_version:
+                continue
+            for statement in migration.statements:
+                connection.execute(statement)
+            connection.execute(f'PRAGMA user_version = {migration.version}')
+            applied_versions.append(migration.version)
+
+        now = to_db_time(datetime.now(UTC))
+        connection.execute(
+            """
+            INSERT INTO role (key, name, description, create_time, update_time) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO NOTHING
+            """,
+            (DEFAULT_ROLE_KEY, DEFAULT_ROLE_NAME, DEFAULT_ROLE_DESCRIPTION, now, now),
+        )
+        return applied_versions
+
+    async def drop_all_tables(self) -> None:
+        def drop_tables(connection: sqlite3.Connection) -> None:
+            for table_name in (
+                'message_search',
+                'message',
+                'session',
+                'session_list_state',
+                'user_roles',
+                'end_user',
+                'role',
+            ):
+                connection.execute(f'DROP TABLE IF EXISTS {table_name}')
+            connection.execute('PRAGMA user_version = 0')
+
+        await self.run(drop_tables)
+
+    async def close(self) -> None:
+        def close_connection() -> None:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+        await asyncio.get_running_loop().run_in_executor(self._executor, close_connection)
+        self._executor.shutdown()
+
+
+sqlite_db = SqliteDatabase(SQLITE_DATABASE_PATH) if SQLITE_DATABASE_PATH else None
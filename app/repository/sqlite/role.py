@@ -0,0 +1,33 @@
+import sqlite3
+
+from core.model.user import Role
+from core.protocol.repository.role import RoleRepository
+from core.type import IDType
+
+from .connection import SqliteDatabase
+
+
+def _row_to_role(row: sqlite3.Row) -> Role:
+    return Role(id=IDType(row['id']), key=row['key'], name=row['name'])
+
+
+class SqliteRoleRepository(RoleRepository):
+    def __init__(self, database: SqliteDatabase):
+        self.database = database
+
+    async def get_by_key(self, key: str) -> Role | None:
+        row = await self.database.run(
+            lambda connection: connection.execute('SELECT id, key, name FROM role WHERE key = ?', (key,)).fetchone()
+        )
+        return _row_to_role(row) if row else None
+
+    async def get_by_ids(self, ids: list[IDType]) -> list[Role]:
+        if not ids:
+            return []
+
+        rows = await self.database.run(
+            lambda connection: connection.execute(
+                f'SELECT id, key, name FROM role WHERE id IN ({", ".join("?" * len(ids))})', ids
+            ).fetchall()
+        )
+        return [_row_to_role(row) for row in rows]
@@ -0,0 +1,110 @@
+from repository.psql.migration.base import Migration
+
+# the PostgreSQL schema and indexes, with times stored as UTC ISO 8601 text and steps as JSON text
+MIGRATIONS: list[Migration] = [
+    Migration(
+        version=1,
+        description='Create the baseline schema',
+        statements=[
+            """
+            CREATE TABLE IF NOT EXISTS role (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                key TEXT NOT NULL,
+                description TEXT NOT NULL,
+                update_time TEXT NOT NULL,
+                create_time TEXT NOT NULL
+            )
+            """,
+            'CREATE UNIQUE INDEX IF NOT EXISTS ix_role_name ON role (name)',
+            'CREATE UNIQUE INDEX IF NOT EXISTS ix_role_key ON role (key)',
+            """
+            CREATE TABLE IF NOT EXISTS end_user (
+                id INTEGER PRIMARY KEY,
+                username TEXT NOT NULL,
+                email TEXT NOT NULL,
+                password_hash TEXT,
+                is_verified INTEGER NOT NULL DEFAULT 0,
+                update_time TEXT NOT NULL,
+                create_time TEXT NOT NULL
+            )
+            """,
+            'CREATE UNIQUE INDEX IF NOT EXISTS ix_end_user_username ON end_user (username)',
+            'CREATE UNIQUE INDEX IF NOT EXISTS ix_end_user_email ON end_user (email)',
+            """
+            CREATE TABLE IF NOT EXISTS user_roles (
+                user_id INTEGER REFERENCES end_user (id) ON DELETE CASCADE,
+                role_id INTEGER REFERENCES role (id) ON DELETE CASCADE,
+                CONSTRAINT unique_user_role UNIQUE (user_id, role_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS session (
+                session_id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                update_time TEXT NOT NULL,
+                create_time TEXT NOT NULL
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS message (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL REFERENCES session (session_id) ON DELETE CASCADE,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                steps TEXT NOT NULL DEFAULT '[]'
+            )
+            """,
+            'CREATE INDEX IF NOT EXISTS ix_message_session_id_id ON message (session_id, id)',
+            'CREATE INDEX IF NOT EXISTS ix_message_session_id_timestamp ON message (session_id, timestamp)',
+            'CREATE INDEX IF NOT EXISTS ix_session_update_time_session_id ON session (update_time, session_id)',
+        ],
+    ),
+    Migration(
+        version=2,
+        description='Add a full-text search index over message content, maintained by triggers',
+        statements=[
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS message_search USING fts5 (
+                content, content='message', content_rowid='id', tokenize='porter unicode61'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS message_search_insert AFTER INSERT ON message BEGIN
+                INSERT INTO message_search (rowid, content) VALUES (new.id, new.content);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS message_search_delete AFTER DELETE ON message BEGIN
+                INSERT INTO message_search (message_search, rowid, content) VALUES ('delete', old.id, old.content);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS message_search_update AFTER UPDATE OF content ON message BEGIN
+                INSERT INTO message_search (message_search, rowid, content) VALUES ('delete', old.id, old.content);
+                INSERT INTO message_search (rowid, content) VALUES (new.id, new.content);
+            END
+            """,
+            "INSERT INTO message_search (message_search) VALUES ('rebuild')",
+        ],
+    ),
+    Migration(
+        version=3,
+        description='Count the changes to the session list that its latest update time does not show',
+        statements=[
+            """
+            CREATE TABLE IF NOT EXISTS session_list_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                generation INTEGER NOT NULL
+            )
+            """,
+            'INSERT INTO session_list_state (id, generation) VALUES (1, 0) ON CONFLICT (id) DO NOTHING',
+            """
+            CREATE TRIGGER IF NOT EXISTS session_list_deletion AFTER DELETE ON session BEGIN
+                UPDATE session_list_state SET generation = generation + 1 WHERE id = 1;
+            END
+            """,
+        ],
+    ),
+]
@@ -0,0 +1,463 @@
+import sqlite3
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from datetime import datetime
+from functools import partial
+from typing import Any
+
+from pydantic_core import from_json, to_json
+
+from core.enum.session import MessageRole
+from core.model.session import (
+    Message,
+    ProcessingStep,
+    Session,
+    SessionListCursor,
+    SessionListVersion,
+    SessionSearchCursor,
+    SessionSearchResult,
+    SessionSummary,
+    SessionTurn,
+    SessionTurnDelta,
+)
+from core.protocol.repository.session import SessionRepositoryProtocol
+from utility.search import get_search_terms
+
+from .connection import SqliteDatabase, from_db_time, to_db_time
+
+_MESSAGE_COLUMNS = 'id, role, content, timestamp, steps'
+
+# id of the latest message of session `:session_id` at or before a cursor parameter, or 0; a single index lookup
+_MESSAGE_AT_OR_BEFORE = '(SELECT coalesce(max(id), 0) FROM message WHERE session_id = :session_id AND id <= {cursor})'
+
+# a turn is an assistant message directly following a user message, as in `build_session_turns`
+_SUMMARY_SELECT = f"""
+SELECT s.session_id, s.title, s.update_time,
+    (
+        SELECT count(*) FROM (
+            SELECT m.role, lag(m.role) OVER (ORDER BY m.id) AS query_role FROM message m
+            WHERE m.session_id = s.session_id
+        ) paired_messages
+        WHERE paired_messages.role = '{MessageRole.ASSISTANT.value}'
+            AND paired_messages.query_role = '{MessageRole.USER.value}'
+    ) AS turn_count,
+    (
+        SELECT CASE WHEN m.role = '{MessageRole.USER.value}' THEN m.content END FROM message m
+        WHERE m.session_id = s.session_id
+        ORDER BY m.timestamp DESC, m.id DESC
+        LIMIT 1
+    ) AS in_progress_query
+FROM session s
+"""
+
+_SEARCH_MESSAGES = f"""
+SELECT matches.*, s.title,
+    CASE WHEN matches.role = '{MessageRole.ASSISTANT.value}' THEN matches.id ELSE (
+        SELECT CASE WHEN n.role = '{MessageRole.ASSISTANT.value}' THEN n.id END FROM message n
+        WHERE n.session_id = matches.session_id AND n.id > matches.id
+        ORDER BY n.id
+        LIMIT 1
+    ) END AS turn_id
+FROM (
+    SELECT m.id, m.session_id, m.role, m.content, m.timestamp, -bm25(message_search) AS rank
+    FROM message_search
+    JOIN message m ON m.id = message_search.rowid
+    WHERE message_search MATCH :query
+) matches
+JOIN session s ON s.session_id = matches.session_id
+WHERE :cursor_rank IS NULL OR (matches.rank, matches.id) < (:cursor_rank, :cursor_message_id)
+ORDER BY matches.rank DESC, matches.id DESC
+LIMIT :limit
+"""
+
+
+def _row_to_message_data(row: sqlite3.Row) -> dict[str, Any]:
+    return {
+        'id': row['id'],
+        'role': row['role'],
+        'content': row['content'],
+        'timestamp': from_db_time(row['timestamp']),
+        'steps': from_json(row['steps']),
+    }
+
+
+def _row_to_summary(row: sqlite3.Row) -> SessionSummary:
+    return SessionSummary(
+        session_id=row['session_id'],
+        title=row['title'],
+        turn_count=row['turn_count'],
+        updated_at=from_db_time(row['update_time']),
+        in_progress_query=row['in_progress_query'],
+    )
+
+
+def _append_message(connection: sqlite3.Connection, session_id: str, message: Message) -> None:
+    timestamp = to_db_time(message.timestamp)
+    cursor = connection.execute('UPDATE session SET update_time = ? WHERE session_id = ?', (timestamp, session_id))
+    if cursor.rowcount == 0:
+        raise KeyError(f'Session {session_id} not found')
+    connection.execute(
+        'INSERT INTO message (session_id, role, content, timestamp, steps) VALUES (?, ?, ?, ?, ?)',
+        (session_id, message.role.value, message.content, timestamp, to_json(message.steps).decode()),
+    )
+
+
+def _select_recent_messages(connection: sqlite3.Connection, session_id: str, max_turns: int) -> list[Message]:
+    rows = connection.execute(
+        f'SELECT {_MESSAGE_COLUMNS} FROM message WHERE session_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?',
+        (session_id, max_turns * 2),
+    ).fetchall()
+    return [Message.model_validate(_row_to_message_data(row)) for row in reversed(rows)]
+
+
+def _select_sessions_after(connection: sqlite3.Connection, after_session_id: str, limit: int) -> list[Session]:
+    session_rows = connection.execute(
+        """
+        SELECT session_id, title, create_time, update_time FROM session
+        WHERE session_id > ?
+        ORDER BY session_id
+        LIMIT ?
+        """,
+        (after_session_id, limit),
+    ).fetchall()
+    if not session_rows:
+        return []
+
+    session_ids = [row['session_id'] for row in session_rows]
+    message_rows = connection.execute(
+        f"""
+        SELECT session_id, {_MESSAGE_COLUMNS} FROM message
+        WHERE session_id IN ({', '.join('?' * len(session_ids))})
+        ORDER BY timestamp, id
+        """,
+        session_ids,
+    ).fetchall()
+    messages_by_session_id: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for row in message_rows:
+        messages_by_session_id[row['session_id']].append(_row_to_message_data(row))
+
+    return [
+        Session.model_validate(
+            {
+                'session_id': row['session_id'],
+                'title': row['title'],
+                'messages': messages_by_session_id[row['session_id']],
+                'created_at': from_db_time(row['create_time']),
+                'updated_at': from_db_time(row['update_time']),
+            }
+        )
+        for row in session_rows
+    ]
+
+
+class SqliteSessionRepository(SessionRepositoryProtocol):
+    def __init__(self, database: SqliteDatabase):
+        self.database = database
+
+    async def create_session(self, title: str, session_id: str | None = None) -> Session:
+        session = Session(session_id=session_id, title=title) if session_id else Session(title=title)
+
+        def insert_session(connection: sqlite3.Connection) -> None:
+            connection.execute(
+                'INSERT INTO session (session_id, title, create_time, update_time) VALUES (?, ?, ?, ?)',
+                (session.session_id, session.title, to_db_time(session.created_at), to_db_time(session.updated_at)),
+            )
+
+        await self.database.run(insert_session)
+        return session
+
+    async def import_session(self, session: Session) -> bool:
+        return await self.import_sessions([session]) == 1
+
+    async def import_sessions(self, sessions: list[Session]) -> int:
+        def insert_sessions(connection: sqlite3.Connection) -> int:
+            imported_count = 0
+            for session in sessions:
+                cursor = connection.execute(
+                    """
+                    INSERT INTO session (session_id, title, create_time, update_time) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (session_id) DO NOTHING
+                    """,
+                    (session.session_id, session.title, to_db_time(session.created_at), to_db_time(session.updated_at)),
+                )
+                if cursor.rowcount == 0:
+                    continue
+
+                # message ids are assigned by this database
+                connection.executemany(
+                    'INSERT INTO message (session_id, role, content, timestamp, steps) VALUES (?, ?, ?, ?, ?)',
+                    [
+                        (
+                            session.session_id,
+                            message.role.value,
+                            message.content,
+                            to_db_time(message.timestamp),
+                            to_json(message.steps).decode(),
+                        )
+                        for message in session.messages
+                    ],
+                )
+                imported_count += 1
+            if imported_count:
+                # sessions updated long ago do not move the latest update time, so the list version has to change
+                connection.execute('UPDATE session_list_state SET generation = generation + 1 WHERE id = 1')
+            return imported_count
+
+        # the whole batch is a single transaction
+        return await self.database.run(insert_sessions)
+
+    async def get_session(self, session_id: str) -> Session | None:
+        def select_session(connection: sqlite3.Connection) -> Session | None:
+            session_row = connection.execute(
+                'SELECT session_id, title, create_time, update_time FROM session WHERE session_id = ?', (session_id,)
+            ).fetchone()
+            if session_row is None:
+                return None
+
+            message_rows = connection.execute(
+                f'SELECT {_MESSAGE_COLUMNS} FROM message WHERE session_id = ? ORDER BY timestamp, id', (session_id,)
+            ).fetchall()
+            return Session.model_validate(
+                {
+                    'session_id': session_row['session_id'],
+                    'title': session_row['title'],
+                    'messages': [_row_to_message_data(row) for row in message_rows],
+                    'created_at': from_db_time(session_row['create_time']),
+                    'updated_at': from_db_time(session_row['update_time']),
+                }
+            )
+
+        return await self.database.run(select_session)
+
+    async def get_session_summary(self, session_id: str) -> SessionSummary | None:
+        def select_summary(connection: sqlite3.Connection) -> SessionSummary | None:
+            row = connection.execute(f'{_SUMMARY_SELECT} WHERE s.session_id = ?', (session_id,)).fetchone()
+            return _row_to_summary(row) if row else None
+
+        return await self.database.run(select_summary)
+
+    async def get_session_summaries(self, limit: int, cursor: SessionListCursor | None = None) -> list[SessionSummary]:
+        def select_summaries(connection: sqlite3.Connection) -> list[SessionSummary]:
+            if cursor is None:
+                rows = connection.execute(
+                    f'{_SUMMARY_SELECT} ORDER BY s.update_time DESC, s.session_id DESC LIMIT ?', (limit,)
+                ).fetchall()
+            else:
+                rows = connection.execute(
+                    f"""
+                    {_SUMMARY_SELECT}
+                    WHERE (s.update_time, s.session_id) < (?, ?)
+                    ORDER BY s.update_time DESC, s.session_id DESC
+                    LIMIT ?
+                    """,
+                    (to_db_time(cursor.updated_at), cursor.session_id, limit),
+                ).fetchall()
+            return [_row_to_summary(row) for row in rows]
+
+        return await self.database.run(select_summaries)
+
+    async def get_session_version(self, session_id: str) -> int | None:
+        def select_version(connection: sqlite3.Connection) -> int | None:
+            row = connection.execute(
+                """
+                SELECT coalesce((SELECT max(m.id) FROM message m WHERE m.session_id = s.session_id), 0) AS version
+                FROM session s
+                WHERE s.session_id = ?
+                """,
+                (session_id,),
+            ).fetchone()
+            return row['version'] if row else None
+
+        return await self.database.run(select_version)
+
+    async def get_session_list_version(self) -> SessionListVersion:
+        def select_list_version(connection: sqlite3.Connection) -> SessionListVersion:
+            row = connection.execute(
+                """
+                SELECT (SELECT generation FROM session_list_state WHERE id = 1) AS generation,
+                    (SELECT max(update_time) FROM session) AS updated_at
+                """
+            ).fetchone()
+            return SessionListVersion(
+                generation=row['generation'],
+                updated_at=from_db_time(row['updated_at']) if row['updated_at'] else None,
+            )
+
+        return await self.database.run(select_list_version)
+
+    async def count_sessions(self) -> int:
+        def select_count(connection: sqlite3.Connection) -> int:
+            return connection.execute('SELECT count(*) FROM session').fetchone()[0]
+
+        return await self.database.run(select_count)
+
+    async def get_session_turns(
+        self,
+        session_id: str,
+        limit: int,
+        before: int | None = None,
+        after: int | None = None,
+        include_steps: bool = False,
+    ) -> list[SessionTurn]:
+        conditions = ['session_id = :session_id']
+        turn_conditions = [f"role = '{MessageRole.ASSISTANT.value}'", f"query_role = '{MessageRole.USER.value}'"]
+        if before is not None:
+            conditions.append('id < :before')
+        if after is not None:
+            # pairing starts at the message at or before the cursor, which may be the query of the first turn after it
+            conditions.append(f'id >= {_MESSAGE_AT_OR_BEFORE.format(cursor=":after")}')
+            turn_conditions.append('id > :after')
+        is_forward = after is not None and before is None
+
+        # pair every message with its predecessor in insertion order, which is also the turn cursor order
+        statement = f"""
+            SELECT id, content, query, query_timestamp, steps FROM (
+                SELECT id, role, content,
+                    lag(role) OVER (ORDER BY id) AS query_role,
+                    lag(content) OVER (ORDER BY id) AS query,
+                    lag(timestamp) OVER (ORDER BY id) AS query_timestamp,
+                    {'steps' if include_steps else 'NULL'} AS steps
+                FROM message
+                WHERE {' AND '.join(conditions)}
+            )
+            WHERE {' AND '.join(turn_conditions)}
+            ORDER BY id {'ASC' if is_forward else 'DESC'}
+            LIMIT :limit
+        """
+        parameters = {'session_id': session_id, 'before': before, 'after': after, 'limit': limit}
+
+        def select_turns(connection: sqlite3.Connection) -> list[SessionTurn]:
+            rows = connection.execute(statement, parameters).fetchall()
+            if not is_forward:
+                rows.reverse()
+            return [
+                SessionTurn.model_validate(
+                    {
+                        'id': row['id'],
+                        'query': row['query'],
+                        'response': row['content'],
+                        'timestamp': from_db_time(row['query_timestamp']).isoformat(),
+                        'steps': from_json(row['steps']) if include_steps else [],
+                    }
+                )
+                for row in rows
+            ]
+
+        return await self.database.run(select_turns)
+
+    async def get_session_turns_since(self, session_id: str, since: int) -> SessionTurnDelta | None:
+        def select_turns_since(connection: sqlite3.Connection) -> SessionTurnDelta | None:
+            if connection.execute('SELECT 1 FROM session WHERE session_id = ?', (session_id,)).fetchone() is None:
+                return None
+
+            # from the message at or before the version, which may be the query of the first new turn
+            rows = connection.execute(
+                f"""
+                SELECT {_MESSAGE_COLUMNS} FROM message
+                WHERE session_id = :session_id AND id >= {_MESSAGE_AT_OR_BEFORE.format(cursor=':since')}
+                ORDER BY id
+                """,
+                {'session_id': session_id, 'since': since},
+            ).fetchall()
+            messages = [Message.model_validate(_row_to_message_data(row)) for row in rows]
+            return SessionTurnDelta.from_messages(messages, since)
+
+        return await self.database.run(select_turns_since)
+
+    async def add_message(
+        self, session_id: str, role: MessageRole, content: str, steps: list[ProcessingStep] | None = None
+    ) -> None:
+        message = Message(role=role, content=content, steps=steps or [])
+        await self.database.run(lambda connection: _append_message(connection, session_id, message))
+
+    async def get_recent_messages(self, session_id: str, max_turns: int = 5) -> list[Message]:
+        return await self.database.run(lambda connection: _select_recent_messages(connection, session_id, max_turns))
+
+    async def add_user_message_and_get_recent_messages(
+        self, session_id: str, content: str, max_turns: int = 5
+    ) -> list[Message]:
+        message = Message(role=MessageRole.USER, content=content)
+
+        def append_and_select(connection: sqlite3.Connection) -> list[Message]:
+            _append_message(connection, session_id, message)
+            return _select_recent_messages(connection, session_id, max_turns)
+
+        return await self.database.run(append_and_select)
+
+    async def iter_sessions(self, batch_size: int = 100) -> AsyncIterator[Session]:
+        # every batch is a unit of work of its own, so other calls get the database thread in between
+        after_session_id = ''
+        while sessions := await self.database.run(
+            partial(_select_sessions_after, after_session_id=after_session_id, limit=batch_size)
+        ):
+            for session in sessions:
+                yield session
+            after_session_id = sessions[-1].session_id
+
+    async def search_messages(
+        self, query: str, limit: int, cursor: SessionSearchCursor | None = None
+    ) -> list[SessionSearchResult]:
+        terms = get_search_terms(query)
+        if not terms:
+            return []
+
+        # every word of the query has to match; quoting keeps words from being read as query syntax
+        parameters = {
+            'query': ' '.join(f'"{term}"' for term in terms),
+            'cursor_rank': cursor.rank if cursor else None,
+            'cursor_message_id': cursor.message_id if cursor else None,
+            'limit': limit,
+        }
+
+        def select_matches(connection: sqlite3.Connection) -> list[SessionSearchResult]:
+            return [
+                SessionSearchResult(
+                    session_id=row['session_id'],
+                    title=row['title'],
+                    message_id=row['id'],
+                    turn_id=row['turn_id'],
+                    role=row['role'],
+                    content=row['content'],
+                    timestamp=from_db_time(row['timestamp']),
+                    rank=row['rank'],
+                )
+                for row in connection.execute(_SEARCH_MESSAGES, parameters).fetchall()
+            ]
+
+        return await self.database.run(select_matches)
+
+    async def delete_session(self, session_id: str) -> bool:
+        # messages are removed by the ON DELETE CASCADE foreign key
+        def delete_session_row(connection: sqlite3.Connection) -> bool:
+            return connection.execute('DELETE FROM session WHERE session_id = ?', (session_id,)).rowcount > 0
+
+        return await self.database.run(delete_session_row)
+
+    async def delete_expired_sessions(
+        self, updated_before: datetime | None = None, keep_latest: int | None = None, limit: int = 500
+    ) -> int:
+        conditions = []
+        if updated_before is not None:
+            conditions.append('update_time < :updated_before')
+        if keep_latest is not None:
+            conditions.append(
+                'session_id NOT IN ('
+                'SELECT session_id FROM session ORDER BY update_time DESC, session_id DESC LIMIT :keep_latest)'
+            )
+        if not conditions:
+            return 0
+
+        statement = f"""
+            DELETE FROM session WHERE session_id IN (
+                SELECT session_id FROM session
+                WHERE {' OR '.join(conditions)}
+                ORDER BY update_time, session_id
+                LIMIT :limit
+            )
+        """
+        parameters = {
+            'updated_before': to_db_time(updated_before) if updated_before else None,
+            'keep_latest': keep_latest,
+            'limit': limit,
+        }
+        return await self.database.run(lambda connection: connection.execute(statement, parameters).rowcount)
@@ -0,0 +1,117 @@
+import sqlite3
+from datetime import UTC, datetime
+
+from core.error import NotFoundError
+from core.model.user import Role, User
+from core.protocol.repository.user import UserRepository
+from core.type import IDType
+
+from .connection import SqliteDatabase, to_db_time
+
+_USER_COLUMNS = 'id, username, email, password_hash, is_verified'
+
+
+def _select_users(connection: sqlite3.Connection, condition: str = '', parameters: tuple = ()) -> list[User]:
+    user_rows = connection.execute(
+        f'SELECT {_USER_COLUMNS} FROM end_user {condition} ORDER BY id', parameters
+    ).fetchall()
+    if not user_rows:
+        return []
+
+    user_ids = [row['id'] for row in user_rows]
+    role_rows = connection.execute(
+        f"""
+        SELECT user_roles.user_id, role.id, role.key, role.name FROM user_roles
+        JOIN role ON role.id = user_roles.role_id
+        WHERE user_roles.user_id IN ({', '.join('?' * len(user_ids))})
+        ORDER BY role.id
+        """,
+        user_ids,
+    ).fetchall()
+    roles_by_user_id: dict[int, list[Role]] = {}
+    for row in role_rows:
+        roles_by_user_id.setdefault(row['user_id'], []).append(
+            Role(id=IDType(row['id']), key=row['key'], name=row['name'])
+        )
+
+    return [
+        User(
+            id=IDType(row['id']),
+            username=row['username'],
+            email=row['email'],
+            password_hash=row['password_hash'],
+            is_verified=bool(row['is_verified']),
+            roles=roles_by_user_id.get(row['id'], []),
+        )
+        for row in user_rows
+    ]
+
+
+def _set_roles(connection: sqlite3.Connection, user_id: int, roles: list[Role]) -> None:
+    connection.execute('DELETE FROM user_roles WHERE user_id = ?', (user_id,))
+    # roles that do not exist are skipped, as by the PostgreSQL repository
+    connection.executemany(
+        'INSERT INTO user_roles (user_id, role_id) SELECT ?, id FROM role WHERE id = ?',
+        [(user_id, role.id) for role in roles],
+    )
+
+
+class SqliteUserRepository(UserRepository):
+    def __init__(self, database: SqliteDatabase):
+        self.database = database
+
+    async def create(self, user: User) -> User:
+        def insert_user(connection: sqlite3.Connection) -> User:
+            now = to_db_time(datetime.now(UTC))
+            cursor = connection.execute(
+                """
+                INSERT INTO end_user (username, email, password_hash, is_verified, create_time, update_time)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (user.username, user.email, user.password_hash, user.is_verified, now, now),
+            )
+            user_id = cursor.lastrowid
+            _set_roles(connection, user_id, user.roles)
+            return _select_users(connection, 'WHERE id = ?', (user_id,))[0]
+
+        return await self.database.run(insert_user)
+
+    async def get_all(self) -> list[User]:
+        return await self.database.run(_select_users)
+
+    async def get_by_id(self, user_id: IDType) -> User | None:
+        users = await self.database.run(lambda connection: _select_users(connection, 'WHERE id = ?', (user_id,)))
+        return users[0] if users else None
+
+    async def get_by_username_or_email(self, username: str | None, email: str | None) -> User | None:
+        users = await self.database.run(
+            lambda connection: _select_users(connection, 'WHERE username = ? OR email = ?', (username, email))
+        )
+        return users[0] if users else None
+
+    async def update(self, user: User) -> User:
+        def update_user(connection: sqlite3.Connection) -> User:
+            cursor = connection.execute(
+                """
+                UPDATE end_user SET username = ?, email = ?, password_hash = ?, is_verified = ?, update_time = ?
+                WHERE id = ?
+                """,
+                (
+                    user.username,
+                    user.email,
+                    user.password_hash,
+                    user.is_verified,
+                    to_db_time(datetime.now(UTC)),
+                    user.id,
+                ),
+            )
+            if cursor.rowcount == 0:
+                raise NotFoundError('User not found')
+
+            _set_roles(connection, user.id, user.roles)
+            return _select_users(connection, 'WHERE id = ?', (user.id,))[0]
+
+        return await self.database.run(update_user)
+
+    async def delete(self, user_id: IDType) -> None:
+        await self.database.run(lambda connection: connection.execute('DELETE FROM end_user WHERE id = ?', (user_id,)))
@@ -297,8 +297,9 @@ class AgentService:
 
         if is_new:
             try:
-                await self.session_service.add_user_message(session_id, query)
-                session_history = await self.session_service.get_recent_messages(session_id, MAX_SESSION_CONTEXT_TURNS)
+                session_history = await self.session_service.add_user_message_and_get_recent_messages(
+                    session_id, query, MAX_SESSION_CONTEXT_TURNS
+                )
 
                 asyncio.create_task(self._process_query_background(task, session_history))
             except Exception as e:
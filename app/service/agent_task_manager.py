@@ -2,27 +2,32 @@ import asyncio
 import logging
 from collections.abc import AsyncIterator
 from datetime import UTC, datetime
+from functools import partial
 
 from core.enum.agent import AgentEventTypeEnum
+from core.enum.session import SessionEventTypeEnum
+from service.session_event import SessionEventBroker, get_session_event_broker
 
 logger = logging.getLogger(__name__)
 
 
 class AgentTask:
-    def __init__(self, session_id: str, query: str):
+    def __init__(self, session_id: str, query: str, event_broker: SessionEventBroker | None = None):
         self.session_id = session_id
         self.query = query
         self.started_at = datetime.now(UTC)
         self.events: list[tuple[AgentEventTypeEnum, dict]] = []
         self.is_complete = False
         self.error: str | None = None
-        self.subscribers: set[asyncio.Queue] = set()
-        self._lock = asyncio.Lock()
+        self.subscriber_count = 0
+        self._changed = asyncio.Condition()
+        self._event_broker = event_broker or get_session_event_broker()
 
     async def add_event(self, event_type: AgentEventTypeEnum, data: dict) -> None:
         """Add an event and notify all subscribers."""
-        async with self._lock:
+        async with self._changed:
             self.events.append((event_type, data))
+            was_complete = self.is_complete
 
             if event_type == AgentEventTypeEnum.DONE:
                 self.is_complete = True
@@ -30,51 +35,41 @@ class AgentTask:
                 self.is_complete = True
                 self.error = data.get('error')
 
-            dead_queues: set[asyncio.Queue] = set()
-            for queue in self.subscribers:
-                try:
-                    # notify all subscribers
-                    queue.put_nowait((event_type, data))
-                except Exception as e:
-                    logger.warning(f'Failed to notify subscriber: {e}')
-                    dead_queues.add(queue)
-
-            self.subscribers -= dead_queues
-
-    async def subscribe(self) -> AsyncIterator[tuple[AgentEventTypeEnum, dict]]:
-        """Subscribe to events from this task, including replaying past events."""
-        queue: asyncio.Queue[tuple[AgentEventTypeEnum, dict] | None] = asyncio.Queue()
+            if self.is_complete and not was_complete:
+                self._event_broker.publish(SessionEventTypeEnum.AGENT_FINISHED, self.session_id)
 
-        async with self._lock:
-            for event_type, data in self.events:
-                await queue.put((event_type, data))
+            self._changed.notify_all()
 
-            if self.is_complete:
-                await queue.put(None)
-            else:
-                self.subscribers.add(queue)
+    def _has_news(self, next_index: int) -> bool:
+        return next_index < len(self.events) or self.is_complete
 
+    async def subscribe(self) -> AsyncIterator[tuple[AgentEventTypeEnum, dict]]:
+        """Subscribe to events from this task, including replaying past events, until the task is complete."""
+        # subscribers read the shared event list at their own pace instead of getting a queue of their own, so a slow
+        # subscriber holds nothing beyond the events of the task
+        next_index = 0
+        self.subscriber_count += 1
         try:
             while True:
-                item = await queue.get()
-                if item is None:
-                    break
-                yield item
+                async with self._changed:
+                    await self._changed.wait_for(partial(self._has_news, next_index))
+                    events = self.events[next_index:]
+                if not events:
+                    return
+
+                next_index += len(events)
+                for event in events:
+                    yield event
         finally:
-            async with self._lock:
-                self.subscribers.discard(queue)
-
-    async def unsubscribe(self, queue: asyncio.Queue) -> None:
-        """Remove a subscriber."""
-        async with self._lock:
-            self.subscribers.discard(queue)
+            self.subscriber_count -= 1
 
 
 class AgentTaskManager:
     """Manages agent processing tasks across sessions."""
 
-    def __init__(self):
+    def __init__(self, event_broker: SessionEventBroker | None = None):
         self._tasks: dict[str, AgentTask] = {}
+        self._event_broker = event_broker or get_session_event_broker()
         self._lock = asyncio.Lock()
         self._cleanup_task: asyncio.Task | None = None
 
@@ -111,7 +106,7 @@ class AgentTaskManager:
             keys_to_remove = []
 
             for key, task in self._tasks.items():
-                if task.is_complete and not task.subscribers:
+                if task.is_complete and not task.subscriber_count:
                     age = (now - task.started_at).total_seconds()
                     if age > 3600:  # 1 hour
                         keys_to_remove.append(key)
@@ -135,8 +130,9 @@ class AgentTaskManager:
                 logger.info(f'Reusing existing task for session {session_id}')
                 return task, False
             else:
-                task = AgentTask(session_id, query)
+                task = AgentTask(session_id, query, event_broker=self._event_broker)
                 self._tasks[key] = task
+                self._event_broker.publish(SessionEventTypeEnum.AGENT_STARTED, session_id, in_progress_query=query)
                 logger.info(f'Created new task for session {session_id}')
                 return task, True
 
@@ -1,35 +1,197 @@
+import asyncio
 import logging
+from datetime import UTC, datetime, timedelta
 
-from core.enum.session import MessageRole
-from core.model.session import Message, ProcessingStep, Session
+from core.enum.session import MessageRole, SessionEventTypeEnum
+from core.error import InvalidArgumentError
+from core.model.session import (
+    Message,
+    ProcessingStep,
+    Session,
+    SessionListCursor,
+    SessionListVersion,
+    SessionSearchCursor,
+    SessionSearchResult,
+    SessionSummary,
+    SessionTurn,
+    SessionTurnDelta,
+)
 from core.protocol.repository.session import SessionRepositoryProtocol
+from service.session_cache import SessionResponseCache, get_session_response_cache
+from service.session_event import SessionEventBroker, get_session_event_broker
 
 logger = logging.getLogger(__name__)
 
 
 class SessionService:
-    def __init__(self, session_repo: SessionRepositoryProtocol):
+    def __init__(
+        self,
+        session_repo: SessionRepositoryProtocol,
+        response_cache: SessionResponseCache | None = None,
+        event_broker: SessionEventBroker | None = None,
+    ):
         self.session_repo = session_repo
+        self.response_cache = response_cache or get_session_response_cache()
+        self.event_broker = event_broker or get_session_event_broker()
 
     async def create_session(self, title: str) -> Session:
-        return await self.session_repo.create_session(title=title)
+        session = await self.session_repo.create_session(title=title)
+        self.event_broker.publish(SessionEventTypeEnum.CREATED, session.session_id, title=session.title)
+        return session
 
     async def add_user_message(self, session_id: str, content: str) -> None:
-        await self.session_repo.add_message(session_id, MessageRole.USER, content)
+        try:
+            await self.session_repo.add_message(session_id, MessageRole.USER, content)
+        finally:
+            self.response_cache.invalidate(session_id)
+        self.event_broker.publish(SessionEventTypeEnum.UPDATED, session_id, in_progress_query=content)
 
     async def add_assistant_message(
         self, session_id: str, content: str, steps: list[ProcessingStep] | None = None
     ) -> None:
-        await self.session_repo.add_message(session_id, MessageRole.ASSISTANT, content, steps=steps)
+        try:
+            await self.session_repo.add_message(session_id, MessageRole.ASSISTANT, content, steps=steps)
+        finally:
+            self.response_cache.invalidate(session_id)
+        self.event_broker.publish(SessionEventTypeEnum.UPDATED, session_id)
 
     async def get_recent_messages(self, session_id: str, max_turns: int) -> list[Message]:
         return await self.session_repo.get_recent_messages(session_id, max_turns)
 
+    async def add_user_message_and_get_recent_messages(
+        self, session_id: str, content: str, max_turns: int
+    ) -> list[Message]:
+        try:
+            messages = await self.session_repo.add_user_message_and_get_recent_messages(session_id, content, max_turns)
+        finally:
+            self.response_cache.invalidate(session_id)
+        self.event_broker.publish(SessionEventTypeEnum.UPDATED, session_id, in_progress_query=content)
+        return messages
+
     async def get_session(self, session_id: str) -> Session | None:
         return await self.session_repo.get_session(session_id)
 
-    async def get_all_sessions(self) -> list[Session]:
-        return await self.session_repo.get_all_sessions()
+    async def get_session_summary(self, session_id: str) -> SessionSummary | None:
+        return await self.session_repo.get_session_summary(session_id)
+
+    async def get_session_version(self, session_id: str) -> int | None:
+        return await self.session_repo.get_session_version(session_id)
+
+    async def get_session_list_version(self) -> SessionListVersion:
+        return await self.session_repo.get_session_list_version()
+
+    async def get_session_turns(
+        self,
+        session_id: str,
+        limit: int,
+        before: int | None = None,
+        after: int | None = None,
+        include_steps: bool = False,
+    ) -> tuple[list[SessionTurn], bool]:
+        """
+        Get a window of session turns in chronological order.
+
+        Without cursors the newest turns are returned; `before` pages towards older turns and `after` towards
+        newer ones.
+
+        Returns:
+            Tuple of (turns, has_more) where has_more indicates that more turns exist in the paging direction
+        """
+        if before is not None and after is not None:
+            raise InvalidArgumentError('Only one of before and after can be given')
+
+        turns = await self.session_repo.get_session_turns(
+            session_id, limit + 1, before=before, after=after, include_steps=include_steps
+        )
+        if len(turns) <= limit:
+            return turns, False
+
+        return (turns[:limit] if after is not None else turns[1:]), True
+
+    async def get_session_turns_since(self, session_id: str, since: int) -> SessionTurnDelta | None:
+        return await self.session_repo.get_session_turns_since(session_id, since)
+
+    async def get_session_summaries(
+        self, limit: int, cursor: SessionListCursor | None = None
+    ) -> tuple[list[SessionSummary], SessionListCursor | None]:
+        """
+        Get a page of session summaries, most recently updated first.
+
+        Returns:
+            Tuple of (summaries, next_cursor) where next_cursor is None on the last page
+        """
+        summaries = await self.session_repo.get_session_summaries(limit + 1, cursor)
+        if len(summaries) <= limit:
+            return summaries, None
+
+        summaries = summaries[:limit]
+        last_summary = summaries[-1]
+        return summaries, SessionListCursor(updated_at=last_summary.updated_at, session_id=last_summary.session_id)
+
+    async def search_sessions(
+        self, query: str, limit: int, cursor: SessionSearchCursor | None = None
+    ) -> tuple[list[SessionSearchResult], SessionSearchCursor | None]:
+        """
+        Search the messages of every session for all words of `query`, most relevant first.
+
+        Returns:
+            Tuple of (results, next_cursor) where next_cursor is None on the last page
+        """
+        results = await self.session_repo.search_messages(query, limit + 1, cursor)
+        if len(results) <= limit:
+            return results, None
+
+        results = results[:limit]
+        last_result = results[-1]
+        return results, SessionSearchCursor(
+            rank=last_result.rank, message_id=last_result.message_id, session_id=last_result.session_id
+        )
 
     async def delete_session(self, session_id: str) -> bool:
-        return await self.session_repo.delete_session(session_id)
+        try:
+            deleted = await self.session_repo.delete_session(session_id)
+        finally:
+            self.response_cache.invalidate(session_id)
+        if deleted:
+            self.event_broker.publish(SessionEventTypeEnum.DELETED, session_id)
+        return deleted
+
+    async def purge_expired_sessions(
+        self,
+        max_age: timedelta | None = None,
+        keep_latest: int | None = None,
+        batch_size: int = 500,
+        batch_pause_seconds: float = 0,
+    ) -> int:
+        """
+        Delete sessions older than `max_age` or beyond the `keep_latest` most recent ones, in batches.
+
+        Args:
+            max_age: Delete sessions not updated within this period
+            keep_latest: Delete all but this many most recently updated sessions
+            batch_size: Maximum number of sessions deleted per statement
+            batch_pause_seconds: Pause between batches to limit the load on the database
+
+        Returns:
+            Number of deleted sessions
+        """
+        if max_age is None and keep_latest is None:
+            return 0
+
+        updated_before = datetime.now(UTC) - max_age if max_age is not None else None
+        deleted_count = 0
+
+        while True:
+            batch_count = await self.session_repo.delete_expired_sessions(
+                updated_before=updated_before, keep_latest=keep_latest, limit=batch_size
+            )
+            deleted_count += batch_count
+            if batch_count < batch_size:
+                break
+            await asyncio.sleep(batch_pause_seconds)
+
+        if deleted_count:
+            self.response_cache.clear()
+            self.event_broker.publish(SessionEventTypeEnum.RESET)
+            logger.info(f'Purged {deleted_count} expired sessions')
+        return deleted_count
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+
+from config.settings import SESSION_CACHE_MAX_BYTES
+
+
+@dataclass(frozen=True)
+class SessionCacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    entries: int
+    versions: int
+    size_bytes: int
+    max_bytes: int
+
+
+class SessionResponseCache:
+    """
+    In-process LRU cache of rendered session responses, bounded by the total size of the cached bodies.
+
+    Entries are keyed by session id, the session's cache version and a variant describing the request (paging
+    parameters). Writing to a session bumps its version and drops its entries, so a response rendered from data
+    read before the write can never be served afterwards, even if it is stored once the write has happened.
+
+    Versions are kept for sessions with cached entries, and for the `max_idle_versions` latest written sessions
+    without any. A session without a version of its own is at the version floor, which is raised past every version
+    that is forgotten, so forgetting a version can only reject a response, never accept a stale one.
+    """
+
+    def __init__(self, max_bytes: int, max_idle_versions: int = 10_000):
+        self.max_bytes = max_bytes
+        self.max_idle_versions = max_idle_versions
+        self._entries: OrderedDict[tuple[str, int, Hashable], bytes] = OrderedDict()
+        self._session_keys: dict[str, set[tuple[str, int, Hashable]]] = {}
+        self._versions: dict[str, int] = {}  # sessions with cached entries
+        self._idle_versions: OrderedDict[str, int] = OrderedDict()  # written sessions without any, oldest first
+        self._next_version = 1
+        self._version_floor = 0
+        self._size_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get_version(self, session_id: str) -> int:
+        """Get the current cache version of a session, to be captured before reading the data to cache."""
+        version = self._versions.get(session_id)
+        if version is None:
+            version = self._idle_versions.get(session_id, self._version_floor)
+        return version
+
+    def get(self, session_id: str, version: int, variant: Hashable) -> bytes | None:
+        key = (session_id, version, variant)
+        body = self._entries.get(key)
+
+        if body is None:
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return body
+
+    def put(self, session_id: str, version: int, variant: Hashable, body: bytes) -> None:
+        """Store a rendered response, unless the session was written since `version` was read."""
+        if not self.enabled or len(body) > self.max_bytes or version != self.get_version(session_id):
+            return
+
+        key = (session_id, version, variant)
+        self._remove(key)
+        self._entries[key] = body
+        self._session_keys.setdefault(session_id, set()).add(key)
+        self._versions[session_id] = version
+        self._idle_versions.pop(session_id, None)
+        self._size_bytes += len(body)
+
+        while self._size_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._evictions += 1
+
+    def invalidate(self, session_id: str) -> None:
+        """Drop all cached responses of a session and bump its version."""
+        self._invalidations += 1
+        for key in self._session_keys.pop(session_id, set()):
+            self._size_bytes -= len(self._entries.pop(key))
+
+        self._versions.pop(session_id, None)
+        self._set_idle_version(session_id, self._next_version)
+        self._next_version += 1
+
+    def clear(self) -> None:
+        """Drop all cached responses and bump the version of every session, e.g. after a bulk deletion."""
+        self._version_floor = self._next_version
+        self._next_version += 1
+        self._invalidations += 1
+        self._entries.clear()
+        self._session_keys.clear()
+        self._versions.clear()
+        self._idle_versions.clear()
+        self._size_bytes = 0
+
+    def get_stats(self) -> SessionCacheStats:
+        return SessionCacheStats(
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            invalidations=self._invalidations,
+            entries=len(self._entries),
+            versions=len(self._versions) + len(self._idle_versions),
+            size_bytes=self._size_bytes,
+            max_bytes=self.max_bytes,
+        )
+
+    def _remove(self, key: tuple[str, int, Hashable]) -> None:
+        body = self._entries.pop(key, None)
+        if body is None:
+            return
+
+        self._size_bytes -= len(body)
+        session_keys = self._session_keys.get(key[0])
+        if session_keys is not None:
+            session_keys.discard(key)
+            if not session_keys:
+                del self._session_keys[key[0]]
+                self._set_idle_version(key[0], self._versions.pop(key[0]))
+
+    def _set_idle_version(self, session_id: str, version: int) -> None:
+        self._idle_versions[session_id] = version
+        self._idle_versions.move_to_end(session_id)
+        while len(self._idle_versions) > self.max_idle_versions:
+            _, forgotten_version = self._idle_versions.popitem(last=False)
+            self._version_floor = max(self._version_floor, forgotten_version)
+
+
+_session_response_cache: SessionResponseCache | None = None
+
+
+def get_session_response_cache() -> SessionResponseCache:
+    """Get or create the global session response cache instance."""
+    global _session_response_cache
+    if _session_response_cache is None:
+        _session_response_cache = SessionResponseCache(max_bytes=SESSION_CACHE_MAX_BYTES)
+    return _session_response_cache
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+
+from core.enum.session import SessionEventTypeEnum
+from core.model.session import SessionEvent
+
+logger = logging.getLogger(__name__)
+
+
+class SessionEventSubscription:
+    def __init__(self, session_ids: Iterable[str] | None, max_queue_size: int):
+        self.session_ids = frozenset(session_ids) if session_ids is not None else None
+        self.queue: asyncio.Queue[SessionEvent] = asyncio.Queue(maxsize=max_queue_size)
+
+    def matches(self, event: SessionEvent) -> bool:
+        return self.session_ids is None or event.session_id is None or event.session_id in self.session_ids
+
+    def put(self, event: SessionEvent) -> None:
+        """Queue an event; a subscriber too slow to keep up gets a reset in place of its backlog."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning('Session event subscriber fell behind, resetting it')
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(SessionEvent(id=event.id, type=SessionEventTypeEnum.RESET))
+
+
+class SessionEventBroker:
+    """
+    Fans session change events out to subscribers, each watching every session or a set of sessions.
+
+    Recent events are kept so that a reconnecting client can resume from the last event id it received; when that
+    id is no longer covered, the client gets a reset event and should refetch.
+    """
+
+    def __init__(self, history_size: int = 1000, max_queue_size: int = 256):
+        self._history: deque[SessionEvent] = deque(maxlen=history_size)
+        self._subscriptions: set[SessionEventSubscription] = set()
+        self._max_queue_size = max_queue_size
+        self._next_event_id = 1
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    @property
+    def last_event_id(self) -> int:
+        return self._next_event_id - 1
+
+    def publish(
+        self,
+        event_type: SessionEventTypeEnum,
+        session_id: str | None = None,
+        title: str | None = None,
+        in_progress_query: str | None = None,
+    ) -> SessionEvent:
+        event = SessionEvent(
+            id=self._next_event_id,
+            type=event_type,
+            session_id=session_id,
+            title=title,
+            in_progress_query=in_progress_query,
+        )
+        self._next_event_id += 1
+        self._history.append(event)
+
+        for subscription in self._subscriptions:
+            if subscription.matches(event):
+                subscription.put(event)
+
+        return event
+
+    async def subscribe(
+        self, session_ids: Iterable[str] | None = None, last_event_id: int | None = None
+    ) -> AsyncIterator[SessionEvent]:
+        """
+        Subscribe to session events until the iterator is closed.
+
+        Args:
+            session_ids: Only receive events of these sessions, all sessions if None
+            last_event_id: Replay the events published after this one first
+        """
+        subscription = SessionEventSubscription(session_ids, self._max_queue_size)
+        self._subscriptions.add(subscription)
+
+        try:
+            if last_event_id is not None:
+                for event in self._get_replay(subscription, last_event_id):
+                    yield event
+
+            while True:
+                yield await subscription.queue.get()
+        finally:
+            self._subscriptions.discard(subscription)
+
+    def _get_replay(self, subscription: SessionEventSubscription, last_event_id: int) -> list[SessionEvent]:
+        if last_event_id >= self._next_event_id:
+            # the id was issued by another process or before a restart
+            return [SessionEvent(id=self.last_event_id, type=SessionEventTypeEnum.RESET)]
+
+        oldest_event_id = self._history[0].id if self._history else self._next_event_id
+        if last_event_id + 1 < oldest_event_id:
+            return [SessionEvent(id=self.last_event_id, type=SessionEventTypeEnum.RESET)]
+
+        return [event for event in self._history if event.id > last_event_id and subscription.matches(event)]
+
+
+_session_event_broker: SessionEventBroker | None = None
+
+
+def get_session_event_broker() -> SessionEventBroker:
+    """Get or create the global session event broker instance."""
+    global _session_event_broker
+    if _session_event_broker is None:
+        _session_event_broker = SessionEventBroker()
+    return _session_event_broker
@@ -0,0 +1,28 @@
+import base64
+import json
+from typing import Any
+
+
+def encode_cursor(values: list[Any]) -> str:
+    """Encode JSON-serializable keyset values as an opaque, URL-safe cursor token."""
+    payload = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> list[Any]:
+    """
+    Decode a cursor token created by `encode_cursor`.
+
+    Raises:
+        ValueError: If the token is not a valid cursor
+    """
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(payload)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+
+    return values
@@ -0,0 +1,21 @@
+import hashlib
+
+
+def make_etag(*parts: object) -> str:
+    """Build a strong entity tag from the values that determine a response body."""
+    digest = hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check an `If-None-Match` header against an entity tag.
+
+    Uses the weak comparison required for `If-None-Match`, so `W/` prefixed tags match their strong counterparts.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+
+    return any(candidate.strip().removeprefix('W/') == etag for candidate in if_none_match.split(','))
@@ -0,0 +1,33 @@
+import re
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+def get_words(text: str) -> list[str]:
+    """Split text into lowercase words, ignoring punctuation."""
+    return [word.lower() for word in _WORD_PATTERN.findall(text)]
+
+
+def get_search_terms(query: str) -> list[str]:
+    """Split a search query into lowercase words, ignoring punctuation and repeated words."""
+    return list(dict.fromkeys(get_words(query)))
+
+
+def make_snippet(content: str, terms: list[str], max_length: int = 160) -> str:
+    """
+    Cut a window of `content` around the first occurrence of any of the search terms.
+
+    Terms are matched as word prefixes, so that longer forms of a term, such as "koalas" for "koala", are found too.
+    """
+    if len(content) <= max_length:
+        return content
+
+    lowered_content = content.lower()
+    match_positions = [
+        match.start() for term in terms if (match := re.search(rf'\b{re.escape(term)}', lowered_content)) is not None
+    ]
+    first_match = min(match_positions, default=0)
+
+    start = max(0, min(first_match - max_length // 4, len(content) - max_length))
+    end = start + max_length
+    return f'{"…" if start > 0 else ""}{content[start:end].strip()}{"…" if end < len(content) else ""}'
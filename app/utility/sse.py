@@ -0,0 +1,60 @@
+import asyncio
+import contextlib
+import logging
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+
+from config.settings import SSE_DISCONNECT_CHECK_INTERVAL_SECONDS, SSE_HEARTBEAT_INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_MESSAGE = ': heartbeat\n\n'
+
+
+async def with_heartbeat(
+    messages: AsyncGenerator[str],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    heartbeat_interval: float = SSE_HEARTBEAT_INTERVAL_SECONDS,
+    disconnect_check_interval: float = SSE_DISCONNECT_CHECK_INTERVAL_SECONDS,
+) -> AsyncIterator[str]:
+    """
+    Relay SSE messages, sending a comment heartbeat whenever the stream has been idle for `heartbeat_interval`.
+
+    While waiting for the next message `is_disconnected` is checked every `disconnect_check_interval`; once the
+    client is gone, `messages` is closed right away instead of on the next failed write, so that whatever it is
+    subscribed to is released promptly.
+    """
+    loop = asyncio.get_running_loop()
+    next_message: asyncio.Future[str] | None = None
+    last_sent_at = loop.time()
+
+    try:
+        while True:
+            if next_message is None:
+                next_message = asyncio.ensure_future(anext(messages))
+
+            done, _ = await asyncio.wait({next_message}, timeout=min(heartbeat_interval, disconnect_check_interval))
+            if done:
+                try:
+                    message = next_message.result()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    next_message = None
+
+                yield message
+                last_sent_at = loop.time()
+                continue
+
+            if await is_disconnected():
+                logger.info('Client disconnected from an idle event stream')
+                return
+
+            if loop.time() - last_sent_at >= heartbeat_interval:
+                yield HEARTBEAT_MESSAGE
+                last_sent_at = loop.time()
+    finally:
+        if next_message is not None:
+            next_message.cancel()
+            with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+                await next_message
+        await messages.aclose()
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from datetime import UTC, datetime, timedelta
+
+from config.settings import (
+    SESSION_ARCHIVE_AFTER_DAYS,
+    SESSION_ARCHIVE_BATCH_PAUSE_SECONDS,
+    SESSION_ARCHIVE_BATCH_SIZE,
+    SESSION_ARCHIVE_INTERVAL_SECONDS,
+    SESSION_REPOSITORY_BACKEND,
+)
+from core.enum.session import SessionRepositoryBackendEnum
+from repository.psql.archive import SessionArchive
+from repository.psql.connection import psql_db, psql_session_shard_dbs
+from repository.sqlite.connection import sqlite_db
+
+logger = logging.getLogger(__name__)
+
+
+def is_session_archival_enabled() -> bool:
+    # only sessions stored in PostgreSQL are archived
+    return (
+        SESSION_ARCHIVE_AFTER_DAYS is not None
+        and sqlite_db is None
+        and SESSION_REPOSITORY_BACKEND != SessionRepositoryBackendEnum.MEMORY
+    )
+
+
+async def archive_cold_sessions() -> int:
+    """Archive every session not updated within the archival period, in batches, on each session database."""
+    if SESSION_ARCHIVE_AFTER_DAYS is None:
+        return 0
+
+    updated_before = datetime.now(UTC) - timedelta(days=SESSION_ARCHIVE_AFTER_DAYS)
+    archived_count = 0
+    for db in list(psql_session_shard_dbs.values()) or [psql_db]:
+        archive = SessionArchive(db.engine)
+        while True:
+            batch_count = await archive.archive_sessions(updated_before, limit=SESSION_ARCHIVE_BATCH_SIZE)
+            archived_count += batch_count
+            if batch_count < SESSION_ARCHIVE_BATCH_SIZE:
+                break
+            await asyncio.sleep(SESSION_ARCHIVE_BATCH_PAUSE_SECONDS)
+
+        # sessions archived before archived sessions were searchable; none once they have all been indexed
+        while await archive.index_unsearchable_sessions(limit=SESSION_ARCHIVE_BATCH_SIZE) == SESSION_ARCHIVE_BATCH_SIZE:
+            await asyncio.sleep(SESSION_ARCHIVE_BATCH_PAUSE_SECONDS)
+
+    if archived_count:
+        logger.info(f'Archived {archived_count} cold sessions')
+    return archived_count
+
+
+async def run_session_archival_loop() -> None:
+    """Periodically archive cold sessions until cancelled."""
+    while True:
+        try:
+            await archive_cold_sessions()
+            await asyncio.sleep(SESSION_ARCHIVE_INTERVAL_SECONDS)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f'Error in session archival loop: {e}', exc_info=True)
+            await asyncio.sleep(SESSION_ARCHIVE_INTERVAL_SECONDS)
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from config.settings import (
+    SESSION_RETENTION_BATCH_PAUSE_SECONDS,
+    SESSION_RETENTION_BATCH_SIZE,
+    SESSION_RETENTION_DAYS,
+    SESSION_RETENTION_INTERVAL_SECONDS,
+    SESSION_RETENTION_MAX_SESSIONS,
+)
+from repository.sharded.connection import session_repository_scope
+from service.session import SessionService
+
+logger = logging.getLogger(__name__)
+
+
+def is_session_retention_enabled() -> bool:
+    return SESSION_RETENTION_DAYS is not None or SESSION_RETENTION_MAX_SESSIONS is not None
+
+
+async def purge_expired_sessions() -> int:
+    async with session_repository_scope() as session_repo:
+        session_service = SessionService(session_repo=session_repo)
+        return await session_service.purge_expired_sessions(
+            max_age=timedelta(days=SESSION_RETENTION_DAYS) if SESSION_RETENTION_DAYS is not None else None,
+            keep_latest=SESSION_RETENTION_MAX_SESSIONS,
+            batch_size=SESSION_RETENTION_BATCH_SIZE,
+            batch_pause_seconds=SESSION_RETENTION_BATCH_PAUSE_SECONDS,
+        )
+
+
+async def run_session_retention_loop() -> None:
+    """Periodically purge expired sessions until cancelled."""
+    while True:
+        try:
+            await purge_expired_sessions()
+            await asyncio.sleep(SESSION_RETENTION_INTERVAL_SECONDS)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f'Error in session retention loop: {e}', exc_info=True)
+            await asyncio.sleep(SESSION_RETENTION_INTERVAL_SECONDS)
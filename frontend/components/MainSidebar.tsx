@@ -1,6 +1,6 @@
 import { MessageCirclePlusIcon, MessageSquareTextIcon, Trash2Icon } from 'lucide-react';
 import { useRouter } from 'next/router';
-import { memo, type ReactNode, useState } from 'react';
+import { memo, type ReactNode, useEffect, useRef, useState } from 'react';
 import svgDrKoalaLogo from '@/assets/dr-koala.svg';
 import SimpleConfirmDialog from '@/components/SimpleConfirmDialog';
 import SVG from '@/components/SVG';
@@ -18,15 +18,35 @@ import {
   useSidebar,
 } from '@/components/ui/sidebar';
 import { useDeleteSession } from '@/hooks/useDeleteSession';
+import { useSessionEvents } from '@/hooks/useSessionEvents';
 import { useTopicSessions } from '@/hooks/useTopicSessions';
 
 function MainSidebar() {
   const router = useRouter();
-  const { data: topicSessions, isLoading } = useTopicSessions();
+  const { data: topicSessions, isLoading, hasNextPage, isFetchingNextPage, fetchNextPage } = useTopicSessions();
+  useSessionEvents();
   const { isMobile, setOpenMobile, setOpen } = useSidebar();
   const deleteSessionMutation = useDeleteSession();
   const [deleteDialogOpen, setDeleteDialogOpen] = useState(false);
   const [sessionToDelete, setSessionToDelete] = useState<string | null>(null);
+  const loadMoreRef = useRef<HTMLDivElement>(null);
+
+  // load the next page of sessions once the end of the list scrolls into view
+  useEffect(() => {
+    const loadMoreElement = loadMoreRef.current;
+    if (!loadMoreElement || !hasNextPage) return;
+
+    const observer = new IntersectionObserver((entries) => {
+      if (entries.some((entry) => entry.isIntersecting) && !isFetchingNextPage) {
+        fetchNextPage();
+      }
+    });
+    observer.observe(loadMoreElement);
+
+    return () => {
+      observer.disconnect();
+    };
+  }, [hasNextPage, isFetchingNextPage, fetchNextPage]);
 
   const handleNewTopicSession = () => {
     if (isMobile) {
@@ -118,6 +138,11 @@ function MainSidebar() {
                 ))
               )}
             </SidebarMenu>
+            {hasNextPage && (
+              <div ref={loadMoreRef} className="px-2 py-4 text-sm text-muted-foreground text-center">
+                {isFetchingNextPage ? 'Loading...' : null}
+              </div>
+            )}
           </SidebarGroupContent>
         </SidebarGroup>
       </SidebarContent>
@@ -0,0 +1,43 @@
+import { useQueryClient } from '@tanstack/react-query';
+import { useEffect } from 'react';
+import { API_BASE_URL } from '@/constants/api';
+import type { components } from '@/types/apiSchema';
+import { useTopicSession } from './useTopicSession';
+import { useTopicSessions } from './useTopicSessions';
+
+type SessionEvent = components['schemas']['SessionEvent'];
+
+/**
+ * Keep the session queries fresh from the server-pushed session event stream instead of polling.
+ * The browser reconnects on its own and resumes from the last received event id.
+ */
+export const useSessionEvents = () => {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    const baseUrlWithSlash = API_BASE_URL.endsWith('/') ? API_BASE_URL : `${API_BASE_URL}/`;
+    const eventSource = new EventSource(new URL('sessions/events', baseUrlWithSlash).toString());
+
+    eventSource.onmessage = (message: MessageEvent<string>) => {
+      const event = JSON.parse(message.data) as SessionEvent;
+
+      queryClient.invalidateQueries({
+        queryKey: useTopicSessions.getQueryKey(),
+      });
+
+      if (event.type === 'reset') {
+        queryClient.invalidateQueries({
+          queryKey: ['agent', 'topicSession'],
+        });
+      } else if (event.session_id && (event.type === 'updated' || event.type === 'agent_finished')) {
+        queryClient.invalidateQueries({
+          queryKey: useTopicSession.getQueryKey(event.session_id),
+        });
+      }
+    };
+
+    return () => {
+      eventSource.close();
+    };
+  }, [queryClient]);
+};
@@ -1,27 +1,53 @@
-import { useQuery } from '@tanstack/react-query';
-import { useMemo } from 'react';
+import { useInfiniteQuery } from '@tanstack/react-query';
+import { useEffect, useMemo } from 'react';
 import type { components } from '@/types/apiSchema';
 import type { TopicSessionHistory } from '@/types/topicSession';
 import { queryFunction } from '@/utils/fetch';
 
+const TOPIC_SESSION_TURNS_LIMIT = 100;
+
+type RetrieveSessionResponse = components['schemas']['RetrieveSessionResponseModel'];
+
 export const useTopicSession = (topicSessionId: string, enabled: boolean) => {
   const {
     data: rawData,
     isLoading,
     error,
-  } = useQuery<components['schemas']['RetrieveSessionResponseModel']>({
+    hasNextPage,
+    isFetchingNextPage,
+    fetchNextPage,
+  } = useInfiniteQuery({
     queryKey: useTopicSession.getQueryKey(topicSessionId),
-    queryFn: () => queryFunction({ path: `/sessions/${topicSessionId}` }),
+    queryFn: ({ pageParam }) =>
+      queryFunction<RetrieveSessionResponse>({
+        path: `/sessions/${topicSessionId}`,
+        searchParams: {
+          limit: String(TOPIC_SESSION_TURNS_LIMIT),
+          include_steps: 'true',
+          ...(pageParam ? { before: String(pageParam) } : {}),
+        },
+      }),
+    // the first page holds the latest turns, every next one the turns before the oldest turn loaded so far
+    initialPageParam: null as number | null,
+    getNextPageParam: (lastPage) => (lastPage.has_more ? (lastPage.turns[0]?.id ?? null) : null),
     enabled,
   });
 
+  // the whole history is shown, so older pages are loaded until there are none left
+  useEffect(() => {
+    if (enabled && hasNextPage && !isFetchingNextPage) {
+      fetchNextPage();
+    }
+  }, [enabled, hasNextPage, isFetchingNextPage, fetchNextPage]);
+
   const data = useMemo<TopicSessionHistory | null>(() => {
     if (!rawData) return null;
 
+    const [latestPage] = rawData.pages;
     return {
-      id: rawData.id,
-      turns: rawData.turns,
-      inProgressQuery: rawData.in_progress_query ?? null,
+      id: latestPage.id,
+      turns: [...rawData.pages].reverse().flatMap((page) => page.turns),
+      inProgressQuery: latestPage.in_progress_query ?? null,
     };
   }, [rawData]);
 
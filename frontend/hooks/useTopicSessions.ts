@@ -1,39 +1,48 @@
-import { useQuery } from '@tanstack/react-query';
+import { useInfiniteQuery } from '@tanstack/react-query';
 import { useMemo } from 'react';
 import type { components } from '@/types/apiSchema';
 import type { TopicSession } from '@/types/topicSession';
 import { queryFunction } from '@/utils/fetch';
 
+const TOPIC_SESSIONS_PAGE_SIZE = 100;
+
+type ListSessionsResponse = components['schemas']['ListSessionsResponseModel'];
+
 export const useTopicSessions = () => {
-  const { data, isLoading, error } = useQuery<components['schemas']['RetrieveSessionResponseModel'][]>({
+  const { data, isLoading, error, hasNextPage, isFetchingNextPage, fetchNextPage } = useInfiniteQuery({
     queryKey: useTopicSessions.getQueryKey(),
-    queryFn: () =>
-      queryFunction<components['schemas']['RetrieveSessionResponseModel'][]>({
+    queryFn: ({ pageParam }) =>
+      queryFunction<ListSessionsResponse>({
         path: '/sessions',
+        searchParams: {
+          limit: String(TOPIC_SESSIONS_PAGE_SIZE),
+          ...(pageParam ? { cursor: pageParam } : {}),
+        },
       }),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? null,
   });
 
   const topicSessions = useMemo<TopicSession[]>(() => {
     if (!data) return [];
 
-    return data
-      .map((session) => {
-        const query = session.title;
-        const timestamp = session.turns[0]?.timestamp ?? new Date().toISOString();
-
-        return {
-          id: session.id,
-          query,
-          timestamp,
-        };
-      })
-      .sort((a, b) => new Date(b.timestamp).getTime() - new Date(a.timestamp).getTime());
+    // sessions are already ordered by their last update on the server, page after page
+    return data.pages.flatMap((page) =>
+      page.items.map((session) => ({
+        id: session.id,
+        query: session.title,
+        timestamp: session.updated_at,
+      })),
+    );
   }, [data]);
 
   return {
     data: topicSessions,
     isLoading,
     error,
+    hasNextPage,
+    isFetchingNextPage,
+    fetchNextPage,
   };
 };
 
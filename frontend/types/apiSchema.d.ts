@@ -93,6 +93,23 @@ export interface paths {
     patch?: never;
     trace?: never;
   };
+  '/sessions/events': {
+    parameters: {
+      query?: never;
+      header?: never;
+      path?: never;
+      cookie?: never;
+    };
+    /** Get Session Events */
+    get: operations['get_session_events_sessions_events_get'];
+    put?: never;
+    post?: never;
+    delete?: never;
+    options?: never;
+    head?: never;
+    patch?: never;
+    trace?: never;
+  };
   '/sessions/{session_id}': {
     parameters: {
       query?: never;
@@ -156,6 +173,13 @@ export interface components {
       /** Detail */
       detail?: components['schemas']['ValidationError'][];
     };
+    /** ListSessionsResponseModel */
+    ListSessionsResponseModel: {
+      /** Items */
+      items: components['schemas']['SessionSummaryResponseModel'][];
+      /** Next Cursor */
+      next_cursor?: string | null;
+    };
     /** ProcessingStep */
     ProcessingStep: {
       /** Description */
@@ -181,6 +205,16 @@ export interface components {
       turns: components['schemas']['SessionTurn'][];
       /** In Progress Query */
       in_progress_query?: string | null;
+      /**
+       * Turn Count
+       * @default 0
+       */
+      turn_count?: number;
+      /**
+       * Has More
+       * @default false
+       */
+      has_more?: boolean;
     };
     /** RetrieveUserModel */
     RetrieveUserModel: {
@@ -193,8 +227,51 @@ export interface components {
       /** Is Verified */
       is_verified: boolean;
     };
+    /** SessionSummaryResponseModel */
+    SessionSummaryResponseModel: {
+      /** Id */
+      id: string;
+      /** Title */
+      title: string;
+      /** Turn Count */
+      turn_count: number;
+      /**
+       * Updated At
+       * Format: date-time
+       */
+      updated_at: string;
+      /** In Progress Query */
+      in_progress_query?: string | null;
+    };
+    /** SessionEvent */
+    SessionEvent: {
+      /**
+       * Id
+       * @default 0
+       */
+      id?: number;
+      type: components['schemas']['SessionEventTypeEnum'];
+      /** Session Id */
+      session_id?: string | null;
+      /** Title */
+      title?: string | null;
+      /** In Progress Query */
+      in_progress_query?: string | null;
+      /**
+       * Timestamp
+       * Format: date-time
+       */
+      timestamp?: string;
+    };
+    /**
+     * SessionEventTypeEnum
+     * @enum {string}
+     */
+    SessionEventTypeEnum: 'created' | 'updated' | 'deleted' | 'agent_started' | 'agent_finished' | 'reset';
     /** SessionTurn */
     SessionTurn: {
+      /** Id */
+      id?: number | null;
       /** Query */
       query: string;
       /** Response */
@@ -440,7 +517,10 @@ export interface operations {
   };
   get_all_sessions_sessions_get: {
     parameters: {
-      query?: never;
+      query?: {
+        limit?: number;
+        cursor?: string | null;
+      };
       header?: never;
       path?: never;
       cookie?: never;
@@ -453,7 +533,16 @@ export interface operations {
           [name: string]: unknown;
         };
         content: {
-          'application/json': components['schemas']['RetrieveSessionResponseModel'][];
+          'application/json': components['schemas']['ListSessionsResponseModel'];
+        };
+      };
+      /** @description Validation Error */
+      422: {
+        headers: {
+          [name: string]: unknown;
+        };
+        content: {
+          'application/json': components['schemas']['HTTPValidationError'];
         };
       };
     };
@@ -491,9 +580,50 @@ export interface operations {
       };
     };
   };
+  get_session_events_sessions_events_get: {
+    parameters: {
+      query?: {
+        /** @description Only stream events of these sessions */
+        session_id?: string[] | null;
+      };
+      header?: {
+        'last-event-id'?: number | null;
+      };
+      path?: never;
+      cookie?: never;
+    };
+    requestBody?: never;
+    responses: {
+      /** @description Successful Response */
+      200: {
+        headers: {
+          [name: string]: unknown;
+        };
+        content: {
+          'application/json': components['schemas']['SessionEvent'];
+        };
+      };
+      /** @description Validation Error */
+      422: {
+        headers: {
+          [name: string]: unknown;
+        };
+        content: {
+          'application/json': components['schemas']['HTTPValidationError'];
+        };
+      };
+    };
+  };
   get_session_by_id_sessions__session_id__get: {
     parameters: {
-      query?: never;
+      query?: {
+        /** @description Only return turns older than this turn id */
+        before?: number | null;
+        /** @description Only return turns newer than this turn id */
+        after?: number | null;
+        limit?: number;
+        include_steps?: boolean;
+      };
       header?: never;
       path: {
         session_id: string;
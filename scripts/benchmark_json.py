@@ -0,0 +1,74 @@
+"""
+Compare JSON encoding paths for session responses and agent stream chunks.
+
+Usage: PYTHONPATH=app python scripts/benchmark_json.py [--turns 500] [--repeat 200]
+"""
+
+import argparse
+import json
+import timeit
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+from fastapi.encoders import jsonable_encoder
+from pydantic_core import to_json
+
+from api.http.schema.agent import AskAgentResponseStreamChunkModel
+from api.http.schema.session import RetrieveSessionResponseModel
+from core.model.session import ProcessingStep, SessionTurn
+
+
+def build_session_response(turn_count: int) -> RetrieveSessionResponseModel:
+    turns = [
+        SessionTurn(
+            id=index * 2 + 2,
+            query=f'Question {index} about koalas and their habitat?',
+            response='Koalas live in eucalyptus forests of eastern Australia. ' * 20,
+            timestamp=datetime.now(UTC).isoformat(),
+            steps=[ProcessingStep(description=f'Step {step}', status='completed') for step in range(4)],
+        )
+        for index in range(turn_count)
+    ]
+    return RetrieveSessionResponseModel(id='session', title='Koalas', turns=turns, turn_count=turn_count)
+
+
+def report(name: str, candidates: dict[str, Callable[[], object]], repeat: int) -> None:
+    print(f'{name} ({repeat} runs)')
+    baseline = None
+    for label, encode in candidates.items():
+        elapsed = min(timeit.repeat(encode, number=repeat, repeat=3))
+        baseline = baseline or elapsed
+        print(f'  {label:<40} {elapsed / repeat * 1e6:>10.1f} us/op  {baseline / elapsed:>5.1f}x')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--turns', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    response = build_session_response(args.turns)
+    report(
+        f'RetrieveSessionResponseModel with {args.turns} turns',
+        {
+            'json.dumps(jsonable_encoder(model))': lambda: json.dumps(jsonable_encoder(response)).encode(),
+            'json.dumps(model.model_dump(mode=json))': lambda: json.dumps(response.model_dump(mode='json')).encode(),
+            'model.model_dump_json()': lambda: response.model_dump_json().encode(),
+            'pydantic_core.to_json(model)': lambda: to_json(response),
+        },
+        args.repeat,
+    )
+
+    chunk = AskAgentResponseStreamChunkModel(content='Koalas sleep up to 22 hours a day.')
+    report(
+        'AskAgentResponseStreamChunkModel SSE frame',
+        {
+            'json.dumps(chunk.model_dump())': lambda: f'data: {json.dumps(chunk.model_dump())}\n\n',
+            'chunk.model_dump_json()': lambda: f'data: {chunk.model_dump_json()}\n\n',
+        },
+        args.repeat * 500,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Compare the ORM and the asyncpg session repositories on the hot session operations.
+
+The tables of the given database are dropped and recreated, so point it at a scratch database.
+
+Usage: PYTHONPATH=app python scripts/benchmark_session_repository.py --database-url postgresql+asyncpg://... \
+    [--sessions 200] [--messages 40] [--repeat 500] [--concurrency 1]
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+
+from core.enum.session import MessageRole
+from core.model.session import ProcessingStep
+from core.protocol.repository.session import SessionRepositoryProtocol
+from repository.psql.connection import Database
+from repository.psql.dao.asyncpg_session import AsyncpgSessionRepository
+from repository.psql.dao.session import PsqlSessionRepository
+
+STEPS = [ProcessingStep(description=f'Step {index}', status='completed') for index in range(4)]
+
+
+async def seed(session_repo: SessionRepositoryProtocol, session_count: int, message_count: int) -> list[str]:
+    session_ids = []
+    for session_index in range(session_count):
+        session = await session_repo.create_session(title=f'Session {session_index}')
+        for message_index in range(message_count // 2):
+            await session_repo.add_message(session.session_id, MessageRole.USER, f'Question {message_index}')
+            await session_repo.add_message(
+                session.session_id, MessageRole.ASSISTANT, 'Koalas eat eucalyptus leaves. ' * 20, steps=STEPS
+            )
+        session_ids.append(session.session_id)
+    return session_ids
+
+
+def orm_repository(database: Database) -> Callable[[], AbstractAsyncContextManager[SessionRepositoryProtocol]]:
+    @asynccontextmanager
+    async def open_repository():
+        async with database.async_session_maker() as session:
+            yield PsqlSessionRepository(session)
+
+    return open_repository
+
+
+def asyncpg_repository(database: Database) -> Callable[[], AbstractAsyncContextManager[SessionRepositoryProtocol]]:
+    @asynccontextmanager
+    async def open_repository():
+        yield AsyncpgSessionRepository(database.engine)
+
+    return open_repository
+
+
+async def measure(
+    open_repository: Callable[[], AbstractAsyncContextManager[SessionRepositoryProtocol]],
+    operation: Callable[[SessionRepositoryProtocol, int], Awaitable[object]],
+    repeat: int,
+    concurrency: int,
+) -> float:
+    """Run `operation` `repeat` times over `concurrency` workers, each with a repository per request as the API does."""
+
+    async def worker(worker_index: int) -> None:
+        for index in range(worker_index, repeat, concurrency):
+            async with open_repository() as session_repo:
+                await operation(session_repo, index)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker(worker_index) for worker_index in range(concurrency)))
+    return time.perf_counter() - started_at
+
+
+async def run(args: argparse.Namespace) -> None:
+    database = Database(args.database_url, liveness_check_interval=None)
+    await database.drop_all_tables()
+    await database.run_migrations()
+
+    async with database.async_session_maker() as session:
+        session_ids = await seed(PsqlSessionRepository(session), args.sessions, args.messages)
+
+    def session_id(index: int) -> str:
+        return session_ids[index % len(session_ids)]
+
+    operations: dict[str, Callable[[SessionRepositoryProtocol, int], Awaitable[object]]] = {
+        'add_message': lambda repo, index: repo.add_message(session_id(index), MessageRole.USER, 'Another question'),
+        'get_recent_messages': lambda repo, index: repo.get_recent_messages(session_id(index), max_turns=5),
+        'get_session_summaries': lambda repo, index: repo.get_session_summaries(20),
+        'get_session': lambda repo, index: repo.get_session(session_id(index)),
+    }
+    repositories = {'orm': orm_repository(database), 'asyncpg': asyncpg_repository(database)}
+
+    print(
+        f'{args.sessions} sessions of {args.messages} messages, {args.repeat} runs per operation, '
+        f'{args.concurrency} concurrent'
+    )
+    try:
+        for label, operation in operations.items():
+            elapsed_by_repository = {}
+            for repository_label, open_repository in repositories.items():
+                # warm up the connection pool and the prepared statement caches
+                await measure(open_repository, operation, min(args.repeat, 20), args.concurrency)
+                elapsed_by_repository[repository_label] = await measure(
+                    open_repository, operation, args.repeat, args.concurrency
+                )
+
+            orm_elapsed = elapsed_by_repository['orm']
+            for repository_label, elapsed in elapsed_by_repository.items():
+                print(
+                    f'  {label:<24} {repository_label:<8} {elapsed / args.repeat * 1e3:>8.3f} ms/op  '
+                    f'{orm_elapsed / elapsed:>5.1f}x'
+                )
+    finally:
+        await database.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Compare ways of building core session models from database rows.
+
+Usage: PYTHONPATH=app python scripts/benchmark_to_core.py [--messages 500] [--repeat 50]
+"""
+
+import argparse
+import timeit
+from datetime import UTC, datetime
+
+from core.enum.session import MessageRole
+from core.model.session import Message, ProcessingStep, Session
+from repository.psql.model import DbMessage, DbSession
+
+
+def build_db_session(message_count: int) -> DbSession:
+    timestamp = datetime.now(UTC)
+    steps = [ProcessingStep(description=f'Step {index}', status='completed') for index in range(4)]
+    messages = [
+        Message(
+            id=index + 1,
+            role=MessageRole.USER if index % 2 == 0 else MessageRole.ASSISTANT,
+            content='Koalas live in eucalyptus forests of eastern Australia. ' * 10,
+            timestamp=timestamp,
+            steps=[] if index % 2 == 0 else steps,
+        )
+        for index in range(message_count)
+    ]
+    db_session = DbSession.from_core(Session(title='Koalas', messages=messages))
+    for db_message, message in zip(db_session.messages, messages, strict=True):
+        db_message.id = message.id
+    return db_session
+
+
+def validated_message(db_message: DbMessage) -> Message:
+    return Message(
+        id=db_message.id,
+        role=MessageRole(db_message.role),
+        content=db_message.content,
+        timestamp=db_message.timestamp,
+        steps=[ProcessingStep.model_validate(step) for step in db_message.steps],
+    )
+
+
+def constructed_message(db_message: DbMessage) -> Message:
+    return Message.model_construct(
+        id=db_message.id,
+        role=MessageRole(db_message.role),
+        content=db_message.content,
+        timestamp=db_message.timestamp,
+        steps=[
+            ProcessingStep.model_construct(
+                description=step['description'],
+                status=step['status'],
+                timestamp=datetime.fromisoformat(step['timestamp']),
+            )
+            for step in db_message.steps
+        ],
+    )
+
+
+def constructed_session(db_session: DbSession) -> Session:
+    return Session.model_construct(
+        session_id=db_session.session_id,
+        title=db_session.title,
+        messages=[constructed_message(db_message) for db_message in db_session.messages],
+        created_at=db_session.create_time,
+        updated_at=db_session.update_time,
+    )
+
+
+def validated_session(db_session: DbSession) -> Session:
+    return Session(
+        session_id=db_session.session_id,
+        title=db_session.title,
+        messages=[validated_message(db_message) for db_message in db_session.messages],
+        created_at=db_session.create_time,
+        updated_at=db_session.update_time,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    db_session = build_db_session(args.messages)
+    assert validated_session(db_session) == constructed_session(db_session) == db_session.to_core()
+
+    print(f'DbSession.to_core with {args.messages} messages ({args.repeat} runs)')
+    baseline = None
+    for label, convert in {
+        'per-model validated construction': lambda: validated_session(db_session),
+        'per-model model_construct': lambda: constructed_session(db_session),
+        'DbSession.to_core (single validation)': db_session.to_core,
+    }.items():
+        elapsed = min(timeit.repeat(convert, number=args.repeat, repeat=3))
+        baseline = baseline or elapsed
+        print(f'  {label:<40} {elapsed / args.repeat * 1e3:>8.2f} ms/op  {baseline / elapsed:>5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
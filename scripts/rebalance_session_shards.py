@@ -0,0 +1,62 @@
+"""
+Move sessions to the session shard owning them, after shards were added to `SESSION_SHARDS` or before removing some.
+
+Pause writes while this runs: a message added to a session while it is copied would be lost with the source copy.
+
+Usage: PYTHONPATH=app python scripts/rebalance_session_shards.py [--drain SHARD ...] [--from-main-database]
+"""
+
+import argparse
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+
+from core.protocol.repository.session import SessionRepositoryProtocol
+from repository.psql.connection import psql_db, psql_session_shard_dbs
+from repository.psql.dao.session import PsqlSessionRepository
+from repository.sharded.session import ShardedSessionRepository
+
+# name of the main database when moving the sessions it held before sharding was configured
+MAIN_DATABASE_SHARD_NAME = '__main__'
+
+
+async def rebalance(draining: list[str], from_main_database: bool) -> int:
+    dbs = dict(psql_session_shard_dbs)
+    if from_main_database:
+        dbs[MAIN_DATABASE_SHARD_NAME] = psql_db
+        draining = [*draining, MAIN_DATABASE_SHARD_NAME]
+
+    unknown_shards = set(draining) - dbs.keys()
+    if unknown_shards:
+        raise SystemExit(f'Unknown shards to drain: {sorted(unknown_shards)}')
+
+    for name, db in psql_session_shard_dbs.items():
+        if name not in draining:
+            await db.run_migrations()
+
+    async with AsyncExitStack() as stack:
+        shards: dict[str, SessionRepositoryProtocol] = {
+            name: PsqlSessionRepository(await stack.enter_async_context(db.async_session_maker()))
+            for name, db in dbs.items()
+        }
+        return await ShardedSessionRepository(shards).rebalance(draining=draining)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--drain', action='append', default=[], help='Move all sessions off this shard')
+    parser.add_argument(
+        '--from-main-database', action='store_true', help='Move the sessions of the main database onto the shards'
+    )
+    args = parser.parse_args()
+
+    if not psql_session_shard_dbs:
+        raise SystemExit('No session shards configured, set SESSION_SHARDS')
+
+    logging.basicConfig(level=logging.INFO)
+    moved_count = asyncio.run(rebalance(args.drain, args.from_main_database))
+    print(f'Moved {moved_count} sessions')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Export every session to newline-delimited JSON, or import sessions from it, to back sessions up or move them between
+databases or backends.
+
+Sessions are streamed one at a time: exports read them from server-side cursors in batches, and imports insert them
+in batches of `--batch-size`, so memory use does not grow with the number of sessions. Imports keep the session ids and
+timestamps, skip sessions that already exist, and assign new message ids.
+
+With the in-memory backend, stop the server first: this loads and rewrites the same data directory.
+
+Usage:
+    PYTHONPATH=app python scripts/transfer_sessions.py export [--output FILE] [--batch-size N]
+    PYTHONPATH=app python scripts/transfer_sessions.py import [--input FILE] [--batch-size N]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from contextlib import nullcontext
+from typing import IO
+
+from config.settings import SESSION_MEMORY_DATA_DIR, SESSION_REPOSITORY_BACKEND
+from core.enum.session import SessionRepositoryBackendEnum
+from core.model.session import Session
+from repository.memory.session import get_memory_session_repository
+from repository.psql.connection import psql_db, psql_session_shard_dbs
+from repository.sharded.connection import session_repository_scope
+from repository.sqlite.connection import sqlite_db
+
+logger = logging.getLogger(__name__)
+
+
+async def export_sessions(output: IO[str], batch_size: int) -> int:
+    exported_count = 0
+    async with session_repository_scope(read_only=True) as session_repo:
+        async for session in session_repo.iter_sessions(batch_size):
+            output.write(f'{session.model_dump_json()}\n')
+            exported_count += 1
+    return exported_count
+
+
+async def import_sessions(input_: IO[str], batch_size: int) -> tuple[int, int]:
+    """
+    Returns:
+        Number of imported sessions, and of skipped sessions that already existed
+    """
+    # the schema has to exist when importing into a new database
+    if sqlite_db is not None:
+        await sqlite_db.run_migrations()
+    elif SESSION_REPOSITORY_BACKEND != SessionRepositoryBackendEnum.MEMORY:
+        for db in [psql_db, *psql_session_shard_dbs.values()]:
+            await db.run_migrations()
+
+    imported_count = 0
+    read_count = 0
+    async with session_repository_scope() as session_repo:
+        batch: list[Session] = []
+        for line in input_:
+            if not line.strip():
+                continue
+            batch.append(Session.model_validate_json(line))
+            if len(batch) == batch_size:
+                imported_count += await session_repo.import_sessions(batch)
+                read_count += len(batch)
+                logger.info(f'Imported {imported_count} of {read_count} sessions')
+                batch = []
+        if batch:
+            imported_count += await session_repo.import_sessions(batch)
+            read_count += len(batch)
+    return imported_count, read_count - imported_count
+
+
+async def close_databases() -> None:
+    if sqlite_db is not None:
+        await sqlite_db.close()
+    if SESSION_REPOSITORY_BACKEND == SessionRepositoryBackendEnum.MEMORY:
+        # writes the imported sessions to the snapshot
+        await get_memory_session_repository().close()
+
+
+async def transfer(args: argparse.Namespace) -> None:
+    try:
+        if args.command == 'export':
+            with open(args.output, 'w') if args.output else nullcontext(sys.stdout) as output:
+                exported_count = await export_sessions(output, args.batch_size)
+            logger.info(f'Exported {exported_count} sessions')
+        else:
+            with open(args.input) if args.input else nullcontext(sys.stdin) as input_:
+                imported_count, skipped_count = await import_sessions(input_, args.batch_size)
+            logger.info(f'Imported {imported_count} sessions, skipped {skipped_count} existing ones')
+    finally:
+        await close_databases()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help='Write every session to NDJSON')
+    export_parser.add_argument('--output', help='File to write to, standard output by default')
+    import_parser = subparsers.add_parser('import', help='Read sessions from NDJSON')
+    import_parser.add_argument('--input', help='File to read from, standard input by default')
+    for subparser in (export_parser, import_parser):
+        subparser.add_argument('--batch-size', type=int, default=500, help='Sessions per database round trip')
+    args = parser.parse_args()
+
+    if SESSION_REPOSITORY_BACKEND == SessionRepositoryBackendEnum.MEMORY and not SESSION_MEMORY_DATA_DIR:
+        raise SystemExit('Sessions kept in memory without SESSION_MEMORY_DATA_DIR only exist in the server process')
+
+    # logs go to standard error, so that exports can be piped from standard output
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(transfer(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from core.enum.agent import AgentEventTypeEnum
+from service.agent_task_manager import AgentTask
+from service.session_event import SessionEventBroker
+
+
+@pytest.fixture
+def task() -> AgentTask:
+    return AgentTask('session-1', 'koalas', event_broker=SessionEventBroker())
+
+
+async def _collect(task: AgentTask) -> list[AgentEventTypeEnum]:
+    return [event_type async for event_type, _ in task.subscribe()]
+
+
+class TestAgentTask:
+    @pytest.mark.asyncio
+    async def test_live_subscribers_end_when_the_task_completes(self, task: AgentTask):
+        await task.add_event(AgentEventTypeEnum.CONTENT, {'content': 'Koalas'})
+        subscribers = [asyncio.ensure_future(_collect(task)) for _ in range(2)]
+        while task.subscriber_count < 2:
+            await asyncio.sleep(0)
+
+        await task.add_event(AgentEventTypeEnum.CONTENT, {'content': ' sleep'})
+        await task.add_event(AgentEventTypeEnum.DONE, {})
+
+        expected_events = [AgentEventTypeEnum.CONTENT, AgentEventTypeEnum.CONTENT, AgentEventTypeEnum.DONE]
+        assert await asyncio.wait_for(asyncio.gather(*subscribers), timeout=1) == [expected_events] * 2
+        assert task.subscriber_count == 0
+
+    @pytest.mark.asyncio
+    async def test_late_subscribers_replay_a_completed_task(self, task: AgentTask):
+        await task.add_event(AgentEventTypeEnum.CONTENT, {'content': 'Koalas'})
+        await task.add_event(AgentEventTypeEnum.ERROR, {'error': 'Search failed'})
+
+        assert await asyncio.wait_for(_collect(task), timeout=1) == [
+            AgentEventTypeEnum.CONTENT,
+            AgentEventTypeEnum.ERROR,
+        ]
+        assert (task.is_complete, task.error) == (True, 'Search failed')
+
+    @pytest.mark.asyncio
+    async def test_slow_subscribers_read_the_shared_events(self, task: AgentTask):
+        events = task.subscribe()
+        first_event = asyncio.ensure_future(anext(events))
+        while not task.subscriber_count:
+            await asyncio.sleep(0)
+
+        for index in range(100):
+            await task.add_event(AgentEventTypeEnum.CONTENT, {'content': str(index)})
+        await task.add_event(AgentEventTypeEnum.DONE, {})
+
+        assert (await first_event)[1] == {'content': '0'}
+        remaining_events = [data async for _, data in events]
+        assert len(remaining_events) == 100
+        assert task.subscriber_count == 0
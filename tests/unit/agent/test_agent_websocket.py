@@ -0,0 +1,125 @@
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
+
+import pytest
+
+pytest.importorskip('autogen_agentchat')
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.testclient import WebSocketTestSession
+
+from api.http.router import agent
+from core.enum.agent import AgentEventTypeEnum
+from service.agent_task_manager import AgentTask
+from service.session_event import SessionEventBroker
+
+# the query is the content chunks to stream, and a trailing `...` keeps the task running instead of finishing it
+UNFINISHED_SUFFIX = '...'
+
+
+class ScriptedAgentService:
+    """Agent service streaming the words of the query through a real agent task, as they are produced."""
+
+    def __init__(self):
+        self.producers: set[asyncio.Task] = set()
+
+    async def process_query_stream(self, query: str, session_id: str) -> AsyncIterator[tuple[AgentEventTypeEnum, dict]]:
+        task = AgentTask(session_id, query, event_broker=SessionEventBroker())
+        producer = asyncio.create_task(self._produce(task, query))
+        self.producers.add(producer)
+        producer.add_done_callback(self.producers.discard)
+
+        async for event in task.subscribe():
+            yield event
+
+    @staticmethod
+    async def _produce(task: AgentTask, query: str) -> None:
+        # events are only added once the stream is subscribed, like a running agent
+        while not task.subscriber_count:
+            await asyncio.sleep(0)
+        for word in query.removesuffix(UNFINISHED_SUFFIX).split():
+            await task.add_event(AgentEventTypeEnum.CONTENT, {'content': word})
+        if not query.endswith(UNFINISHED_SUFFIX):
+            await task.add_event(AgentEventTypeEnum.DONE, {})
+
+
+@asynccontextmanager
+async def scripted_agent_service_scope() -> AsyncGenerator[ScriptedAgentService]:
+    yield ScriptedAgentService()
+
+
+@pytest.fixture
+def websocket(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(agent, 'agent_service_scope', scripted_agent_service_scope)
+    app = FastAPI()
+    app.include_router(agent.router)
+    with TestClient(app) as client, client.websocket_connect('/ask-agent/ws') as websocket:
+        yield websocket
+
+
+def ask(websocket: WebSocketTestSession, stream: int, query: str, credit: int = 10) -> None:
+    websocket.send_json({'op': 'ask', 'stream': stream, 'session_id': 'session-1', 'query': query, 'credit': credit})
+
+
+def receive_until_done(websocket: WebSocketTestSession, stream: int) -> list[dict]:
+    frames = []
+    while True:
+        frame = websocket.receive_json()
+        frames.append(frame)
+        if frame['s'] == stream and ('done' in frame or 'error' in frame):
+            return frames
+
+
+class TestAgentWebSocket:
+    def test_ask_streams_chunks_until_done(self, websocket: WebSocketTestSession):
+        ask(websocket, 1, 'koalas sleep')
+
+        assert receive_until_done(websocket, 1) == [
+            {'s': 1, 'content': 'koalas'},
+            {'s': 1, 'content': 'sleep'},
+            {'s': 1, 'done': True},
+        ]
+
+    def test_finished_streams_free_their_slots(self, websocket: WebSocketTestSession):
+        for stream in range(agent.MAX_WEBSOCKET_STREAMS * 2):
+            ask(websocket, stream, 'koalas')
+
+            assert receive_until_done(websocket, stream) == [
+                {'s': stream, 'content': 'koalas'},
+                {'s': stream, 'done': True},
+            ]
+
+    def test_streams_wait_for_credit(self, websocket: WebSocketTestSession):
+        ask(websocket, 1, 'koalas sleep all day', credit=1)
+        ask(websocket, 2, 'wombats')
+
+        frames = receive_until_done(websocket, 2)
+        assert [frame for frame in frames if frame['s'] == 1] in ([], [{'s': 1, 'content': 'koalas'}])
+
+        websocket.send_json({'op': 'credit', 'stream': 1, 'credit': 10})
+        frames += receive_until_done(websocket, 1)
+        assert [frame for frame in frames if frame['s'] == 1] == [
+            {'s': 1, 'content': 'koalas'},
+            {'s': 1, 'content': 'sleep'},
+            {'s': 1, 'content': 'all'},
+            {'s': 1, 'content': 'day'},
+            {'s': 1, 'done': True},
+        ]
+
+    def test_cancel_stops_a_stream_and_frees_its_id(self, websocket: WebSocketTestSession):
+        ask(websocket, 1, f'koalas{UNFINISHED_SUFFIX}')
+        assert websocket.receive_json() == {'s': 1, 'content': 'koalas'}
+
+        websocket.send_json({'op': 'cancel', 'stream': 1})
+        ask(websocket, 1, 'wombats')
+
+        assert receive_until_done(websocket, 1) == [{'s': 1, 'content': 'wombats'}, {'s': 1, 'done': True}]
+
+    def test_invalid_frames_are_rejected(self, websocket: WebSocketTestSession):
+        websocket.send_text('not json')
+        assert websocket.receive_json() == {'error': 'Invalid frame'}
+
+        websocket.send_json({'op': 'ask', 'stream': 1, 'session_id': 'session-1'})
+        assert websocket.receive_json() == {'s': 1, 'error': 'Missing session_id or query'}
@@ -0,0 +1,50 @@
+"""Schema migrations; the runner tests run against the database at `TEST_DATABASE_URL`, whose tables are dropped."""
+
+import asyncio
+import os
+from collections.abc import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+
+from repository.psql.connection import Database
+from repository.psql.migration import MIGRATIONS, MigrationRunner
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+
+@pytest_asyncio.fixture(loop_scope='function')
+async def test_database() -> AsyncGenerator[Database]:
+    if TEST_DATABASE_URL is None:
+        pytest.skip('TEST_DATABASE_URL is not set')
+
+    database = Database(TEST_DATABASE_URL, liveness_check_interval=None)
+    await database.drop_all_tables()
+    try:
+        yield database
+    finally:
+        await database.engine.dispose()
+
+
+class TestPsqlMigrations:
+    def test_migration_versions_are_sequential(self):
+        versions = [migration.version for migration in MIGRATIONS]
+
+        assert versions == list(range(1, len(MIGRATIONS) + 1))
+
+    def test_concurrent_index_builds_run_outside_transactions(self):
+        for migration in MIGRATIONS:
+            if any('CONCURRENTLY' in statement for statement in migration.statements):
+                assert not migration.transactional
+
+
+class TestPsqlMigrationRunner:
+    @pytest.mark.asyncio
+    async def test_concurrent_upgrades_apply_every_migration_once(self, test_database: Database):
+        # concurrently starting workers, one of them building indexes concurrently while the other waits for the lock
+        runners = [MigrationRunner(test_database.engine) for _ in range(2)]
+
+        applied_versions = await asyncio.wait_for(asyncio.gather(*(runner.upgrade() for runner in runners)), timeout=60)
+
+        assert sorted(applied_versions[0] + applied_versions[1]) == [migration.version for migration in MIGRATIONS]
+        assert await runners[0].upgrade() == []
@@ -0,0 +1,77 @@
+from datetime import UTC, datetime
+
+from core.enum.session import MessageRole
+from core.model.session import Message, ProcessingStep, Session
+from repository.psql.model import DbMessage, DbSession
+
+
+def _build_session() -> Session:
+    timestamp = datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=UTC)
+    steps = [
+        ProcessingStep(description='Searching the web', status='completed', timestamp=timestamp),
+        ProcessingStep(description='Thinking...', status='in_progress', timestamp=timestamp),
+    ]
+    return Session(
+        session_id='session-1',
+        title='Koalas',
+        messages=[
+            Message(id=1, role=MessageRole.USER, content='What do koalas eat?', timestamp=timestamp),
+            Message(id=2, role=MessageRole.ASSISTANT, content='Eucalyptus.', timestamp=timestamp, steps=steps),
+        ],
+        created_at=timestamp,
+        updated_at=timestamp,
+    )
+
+
+class TestPsqlModelConversion:
+    def test_session_to_core_matches_per_model_construction(self):
+        session = _build_session()
+        db_session = DbSession.from_core(session)
+        for db_message, message in zip(db_session.messages, session.messages, strict=True):
+            db_message.id = message.id
+
+        converted = db_session.to_core()
+        constructed = Session(
+            session_id=db_session.session_id,
+            title=db_session.title,
+            messages=[
+                Message(
+                    id=db_message.id,
+                    role=MessageRole(db_message.role),
+                    content=db_message.content,
+                    timestamp=db_message.timestamp,
+                    steps=[ProcessingStep.model_validate(step) for step in db_message.steps],
+                )
+                for db_message in db_session.messages
+            ],
+            created_at=db_session.create_time,
+            updated_at=db_session.update_time,
+        )
+
+        assert converted == constructed == session
+        assert converted.model_dump_json() == constructed.model_dump_json()
+        assert isinstance(converted.messages[1].steps[0], ProcessingStep)
+        assert converted.messages[0].role is MessageRole.USER
+
+    def test_message_to_core_keeps_step_timestamps(self):
+        message = _build_session().messages[1]
+        db_message = DbMessage.from_core(message, 'session-1')
+        db_message.id = message.id
+
+        assert db_message.to_core() == message
+
+    def test_message_to_core_reads_migrated_step_timestamps(self):
+        db_message = DbMessage(
+            id=1,
+            session_id='session-1',
+            role=MessageRole.ASSISTANT.value,
+            content='Eucalyptus.',
+            timestamp=datetime(2025, 1, 2, tzinfo=UTC),
+            steps=[{'description': 'Searching', 'status': 'completed', 'timestamp': '2025-01-02T03:04:05.6789+00:00'}],
+        )
+
+        assert db_message.to_core().steps == [
+            ProcessingStep(
+                description='Searching', status='completed', timestamp=datetime(2025, 1, 2, 3, 4, 5, 678900, tzinfo=UTC)
+            )
+        ]
@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from repository.psql.pool import InstrumentedAsyncAdaptedQueuePool
+
+
+class TestInstrumentedPool:
+    @pytest.mark.asyncio
+    async def test_pool_records_checkouts_and_timeouts(self):
+        pytest.importorskip('aiosqlite')
+        engine = create_async_engine(
+            'sqlite+aiosqlite:///:memory:',
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.01,
+        )
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text('SELECT 1'))
+                with pytest.raises(PoolTimeoutError):
+                    async with engine.connect():
+                        pass
+
+                stats = engine.pool.get_stats()
+                assert stats.checked_out == 1
+
+            stats = engine.pool.get_stats()
+        finally:
+            await engine.dispose()
+
+        assert (stats.checkouts, stats.checkout_timeouts, stats.checked_out) == (1, 1, 0)
+        assert sum(stats.checkout_wait_histogram.values()) == 1
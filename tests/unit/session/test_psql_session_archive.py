@@ -0,0 +1,181 @@
+"""Archival of cold sessions; runs against the database at `TEST_DATABASE_URL`, whose tables are dropped and recreated."""
+
+import os
+from collections.abc import AsyncGenerator
+from datetime import UTC, datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from core.enum.session import MessageRole
+from core.model.session import SessionSearchCursor
+from repository.psql.archive import SessionArchive
+from repository.psql.connection import Database
+from repository.psql.dao.archive_fallback import ArchiveFallbackSessionRepository
+from repository.psql.dao.asyncpg_session import AsyncpgSessionRepository
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+
+@pytest_asyncio.fixture(loop_scope='function')
+async def test_database() -> AsyncGenerator[Database]:
+    if TEST_DATABASE_URL is None:
+        pytest.skip('TEST_DATABASE_URL is not set')
+
+    database = Database(TEST_DATABASE_URL, liveness_check_interval=None)
+    await database.drop_all_tables()
+    await database.run_migrations()
+    try:
+        yield database
+    finally:
+        await database.engine.dispose()
+
+
+@pytest.fixture
+def live_repo(test_database: Database) -> AsyncpgSessionRepository:
+    return AsyncpgSessionRepository(test_database.engine)
+
+
+@pytest.fixture
+def archive(test_database: Database) -> SessionArchive:
+    return SessionArchive(test_database.engine)
+
+
+@pytest.fixture
+def session_repo(live_repo: AsyncpgSessionRepository, archive: SessionArchive) -> ArchiveFallbackSessionRepository:
+    return ArchiveFallbackSessionRepository(live_repo, archive)
+
+
+async def create_cold_session(
+    session_repo: ArchiveFallbackSessionRepository, test_database: Database, title: str, days_ago: int
+) -> str:
+    session = await session_repo.create_session(title=title)
+    await session_repo.add_message(session.session_id, MessageRole.USER, f'question about {title}')
+    await session_repo.add_message(session.session_id, MessageRole.ASSISTANT, f'answer about {title}')
+    await session_repo.add_message(session.session_id, MessageRole.USER, f'follow-up about {title}')
+    async with test_database.engine.begin() as connection:
+        await connection.execute(
+            text('UPDATE session SET update_time = :update_time WHERE session_id = :session_id'),
+            {'update_time': datetime.now(UTC) - timedelta(days=days_ago), 'session_id': session.session_id},
+        )
+    return session.session_id
+
+
+class TestPsqlSessionArchive:
+    @pytest.mark.asyncio
+    async def test_archived_sessions_stay_readable(
+        self,
+        test_database: Database,
+        live_repo: AsyncpgSessionRepository,
+        archive: SessionArchive,
+        session_repo: ArchiveFallbackSessionRepository,
+    ):
+        cold_session_id = await create_cold_session(session_repo, test_database, 'Koalas', days_ago=100)
+        hot_session = await session_repo.create_session(title='Wombats')
+        cold_session = await session_repo.get_session(cold_session_id)
+        cold_summary = await session_repo.get_session_summary(cold_session_id)
+        summaries = await session_repo.get_session_summaries(10)
+
+        assert await archive.archive_sessions(datetime.now(UTC) - timedelta(days=30)) == 1
+        assert await archive.archive_sessions(datetime.now(UTC) - timedelta(days=30)) == 0
+
+        assert await live_repo.get_session(cold_session_id) is None
+        assert await session_repo.get_session(cold_session_id) == cold_session
+        assert await session_repo.get_session_summary(cold_session_id) == cold_summary
+        assert await session_repo.get_session_version(cold_session_id) == cold_session.get_version()
+        assert await session_repo.get_session_turns(cold_session_id, 10) == cold_session.get_turn_window(10)
+        assert await session_repo.get_session_turns_since(cold_session_id, 0) == cold_session.get_turns_since(0)
+        assert await session_repo.get_recent_messages(cold_session_id, 1) == cold_session.get_recent_messages(1)
+        assert await session_repo.get_session_summaries(10) == summaries
+        assert [summary.session_id for summary in summaries] == [hot_session.session_id, cold_session_id]
+        assert await session_repo.count_sessions() == 2
+        assert [session async for session in session_repo.iter_sessions()] == [hot_session, cold_session]
+        assert await session_repo.import_sessions([cold_session, hot_session]) == 0
+
+        async with test_database.engine.connect() as connection:
+            partition_count = await connection.scalar(
+                text("SELECT count(*) FROM pg_inherits WHERE inhparent = 'session_archive'::regclass")
+            )
+        assert partition_count >= 1
+
+    @pytest.mark.asyncio
+    async def test_writing_restores_with_message_ids(
+        self,
+        test_database: Database,
+        live_repo: AsyncpgSessionRepository,
+        archive: SessionArchive,
+        session_repo: ArchiveFallbackSessionRepository,
+    ):
+        cold_session_id = await create_cold_session(session_repo, test_database, 'Koalas', days_ago=100)
+        cold_session = await session_repo.get_session(cold_session_id)
+        await archive.archive_sessions(datetime.now(UTC) - timedelta(days=30))
+
+        await session_repo.add_message(cold_session_id, MessageRole.ASSISTANT, 'answer to the follow-up')
+
+        restored_session = await live_repo.get_session(cold_session_id)
+        assert restored_session is not None
+        assert restored_session.messages[:-1] == cold_session.messages
+        assert restored_session.messages[-1].id > cold_session.get_version()
+        assert await archive.get_session(cold_session_id) is None
+        with pytest.raises(KeyError):
+            await session_repo.add_message('missing', MessageRole.USER, 'question')
+
+    @pytest.mark.asyncio
+    async def test_deleting_and_expiring_archived_sessions(
+        self, test_database: Database, archive: SessionArchive, session_repo: ArchiveFallbackSessionRepository
+    ):
+        oldest_session_id = await create_cold_session(session_repo, test_database, 'Koalas', days_ago=300)
+        older_session_id = await create_cold_session(session_repo, test_database, 'Wombats', days_ago=200)
+        old_session_id = await create_cold_session(session_repo, test_database, 'Platypuses', days_ago=100)
+        hot_session = await session_repo.create_session(title='Echidnas')
+        assert await archive.archive_sessions(datetime.now(UTC) - timedelta(days=30)) == 3
+
+        assert await session_repo.delete_session(oldest_session_id)
+        assert await session_repo.get_session(oldest_session_id) is None
+        assert await session_repo.delete_expired_sessions(keep_latest=2) == 1
+        assert await session_repo.get_session(older_session_id) is None
+        assert [summary.session_id for summary in await session_repo.get_session_summaries(10)] == [
+            hot_session.session_id,
+            old_session_id,
+        ]
+
+    @pytest.mark.asyncio
+    async def test_archived_sessions_stay_searchable(
+        self, test_database: Database, archive: SessionArchive, session_repo: ArchiveFallbackSessionRepository
+    ):
+        await create_cold_session(session_repo, test_database, 'Koalas', days_ago=100)
+        await create_cold_session(session_repo, test_database, 'Koalas and wombats', days_ago=0)
+        results = await session_repo.search_messages('koalas', 10)
+        assert len(results) == 6
+
+        assert await archive.archive_sessions(datetime.now(UTC) - timedelta(days=30)) == 1
+
+        assert await session_repo.search_messages('koalas', 10) == results
+        pages = []
+        cursor = None
+        while page := await session_repo.search_messages('koalas', 4, cursor):
+            pages.append(page)
+            cursor = SessionSearchCursor(
+                rank=page[-1].rank, message_id=page[-1].message_id, session_id=page[-1].session_id
+            )
+        assert [len(page) for page in pages] == [4, 2]
+        assert [result for page in pages for result in page] == results
+        assert await session_repo.search_messages('platypus', 10) == []
+
+    @pytest.mark.asyncio
+    async def test_sessions_archived_without_a_search_vector_are_indexed(
+        self, test_database: Database, archive: SessionArchive, session_repo: ArchiveFallbackSessionRepository
+    ):
+        await create_cold_session(session_repo, test_database, 'Koalas', days_ago=100)
+        results = await session_repo.search_messages('koalas', 10)
+        await archive.archive_sessions(datetime.now(UTC) - timedelta(days=30))
+        # as archived before archived sessions were searchable
+        async with test_database.engine.begin() as connection:
+            await connection.execute(text('UPDATE session_archive SET search_vector = NULL'))
+        assert await session_repo.search_messages('koalas', 10) == []
+
+        assert await archive.index_unsearchable_sessions() == 1
+        assert await archive.index_unsearchable_sessions() == 0
+
+        assert await session_repo.search_messages('koalas', 10) == results
@@ -0,0 +1,172 @@
+"""Message write buffer; the database tests run against the database at `TEST_DATABASE_URL`, whose tables are dropped."""
+
+import asyncio
+import os
+from collections.abc import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.enum.session import MessageRole
+from core.model.session import Message
+from repository.psql.connection import Database
+from repository.psql.dao.session import PsqlSessionRepository
+from repository.psql.write_buffer import MessageWriteBuffer, PendingMessage
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+
+class RecordingWriteBuffer(MessageWriteBuffer):
+    """Write buffer recording its transactions instead of running them, with sessions missing or failing on demand."""
+
+    def __init__(self, max_delay_seconds: float = 0.01, max_batch_size: int = 100):
+        # an unbound session maker is enough, as nothing is executed on its sessions
+        super().__init__(async_sessionmaker(), max_delay_seconds=max_delay_seconds, max_batch_size=max_batch_size)
+        self.transactions: list[list[str]] = []
+        self.missing_session_ids: set[str] = set()
+        self.failing_session_ids: set[str] = set()
+        self.hanging_session_ids: set[str] = set()
+
+    async def _insert_batch(self, session: AsyncSession, batch: list[PendingMessage]) -> set[str]:
+        session_ids = [pending.session_id for pending in batch]
+        if self.hanging_session_ids.intersection(session_ids):
+            await asyncio.Event().wait()
+        if self.failing_session_ids.intersection(session_ids):
+            raise OperationalError('INSERT', {}, Exception('deadlock detected'))
+        self.transactions.append(session_ids)
+        return self.missing_session_ids.intersection(session_ids)
+
+
+def make_message(content: str) -> Message:
+    return Message(role=MessageRole.USER, content=content)
+
+
+# database fixtures have to share the event loop of the test using their connections
+@pytest_asyncio.fixture(loop_scope='function')
+async def test_database() -> AsyncGenerator[Database]:
+    if TEST_DATABASE_URL is None:
+        pytest.skip('TEST_DATABASE_URL is not set')
+
+    database = Database(TEST_DATABASE_URL, liveness_check_interval=None)
+    await database.drop_all_tables()
+    await database.run_migrations()
+    try:
+        yield database
+    finally:
+        await database.engine.dispose()
+
+
+class TestMessageWriteBuffer:
+    @pytest.mark.asyncio
+    async def test_concurrent_appends_are_committed_in_one_transaction(self):
+        write_buffer = RecordingWriteBuffer()
+
+        await asyncio.gather(
+            *(write_buffer.append(f'session-{index}', make_message('What do koalas eat?')) for index in range(20))
+        )
+
+        assert write_buffer.transactions == [[f'session-{index}' for index in range(20)]]
+        stats = write_buffer.get_stats()
+        assert (stats.batches, stats.messages, stats.pending) == (1, 20, 0)
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_written_without_waiting_for_the_delay(self):
+        write_buffer = RecordingWriteBuffer(max_delay_seconds=60, max_batch_size=5)
+
+        await asyncio.wait_for(
+            asyncio.gather(*(write_buffer.append(f'session-{index}', make_message('Hi')) for index in range(10))),
+            timeout=1,
+        )
+
+        assert [len(transaction) for transaction in write_buffer.transactions] == [5, 5]
+
+    @pytest.mark.asyncio
+    async def test_append_to_missing_session_fails_alone(self):
+        write_buffer = RecordingWriteBuffer()
+        write_buffer.missing_session_ids = {'missing'}
+
+        results = await asyncio.gather(
+            write_buffer.append('session-1', make_message('Hi')),
+            write_buffer.append('missing', make_message('Hi')),
+            return_exceptions=True,
+        )
+
+        assert results[0] is None
+        assert isinstance(results[1], KeyError)
+        assert write_buffer.transactions == [['session-1', 'missing']]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_retried_one_append_at_a_time(self):
+        write_buffer = RecordingWriteBuffer()
+        write_buffer.failing_session_ids = {'failing'}
+
+        results = await asyncio.gather(
+            *(
+                write_buffer.append(session_id, make_message('Hi'))
+                for session_id in ['session-1', 'failing', 'session-2']
+            ),
+            return_exceptions=True,
+        )
+
+        assert results[0] is None and results[2] is None
+        assert isinstance(results[1], OperationalError)
+        assert write_buffer.transactions == [['session-1'], ['session-2']]
+        assert write_buffer.get_stats().fallback_batches == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_pending_appends_right_away(self):
+        write_buffer = RecordingWriteBuffer(max_delay_seconds=60)
+        append_task = asyncio.create_task(write_buffer.append('session-1', make_message('Hi')))
+        await asyncio.sleep(0)
+
+        await asyncio.wait_for(write_buffer.flush(), timeout=1)
+
+        assert append_task.done()
+        assert write_buffer.transactions == [['session-1']]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_writer_fails_the_unwritten_appends(self):
+        write_buffer = RecordingWriteBuffer(max_batch_size=1)
+        write_buffer.hanging_session_ids = {'session-1'}
+        append_tasks = [
+            asyncio.create_task(write_buffer.append(session_id, make_message('Hi')))
+            for session_id in ['session-1', 'session-2']
+        ]
+        # the first append hangs in its transaction, and the second waits behind it
+        while write_buffer.get_stats().pending != 1:
+            await asyncio.sleep(0.01)
+
+        write_buffer._writer_task.cancel()
+
+        results = await asyncio.wait_for(asyncio.gather(*append_tasks, return_exceptions=True), timeout=1)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert write_buffer.get_stats().pending == 0
+
+    @pytest.mark.asyncio
+    async def test_sessions_are_updated_in_lock_order(self, test_database: Database):
+        async with test_database.async_session_maker() as session:
+            session_repo = PsqlSessionRepository(session)
+            session_ids = [
+                (await session_repo.create_session(title=f'Koalas {index}')).session_id for index in range(8)
+            ]
+        write_buffer = MessageWriteBuffer(test_database.async_session_maker, max_delay_seconds=0.01, max_batch_size=100)
+
+        updated_session_ids = []
+
+        def record_session_updates(connection, cursor, statement, parameters, context, executemany) -> None:
+            if statement.startswith('UPDATE session '):
+                updated_session_ids.extend(row[-1] for row in (parameters if executemany else [parameters]))
+
+        # a writer appending in the opposite order would otherwise lock the rows the other way round and deadlock
+        event.listen(test_database.engine.sync_engine, 'before_cursor_execute', record_session_updates)
+        try:
+            await asyncio.gather(
+                *(write_buffer.append(session_id, make_message('Hi')) for session_id in reversed(session_ids))
+            )
+        finally:
+            event.remove(test_database.engine.sync_engine, 'before_cursor_execute', record_session_updates)
+
+        assert updated_session_ids == sorted(session_ids)
@@ -0,0 +1,86 @@
+import pytest
+
+from repository.memory.session import InMemorySessionRepository
+from service.session import SessionService
+from service.session_cache import SessionResponseCache
+
+
+@pytest.fixture
+def response_cache() -> SessionResponseCache:
+    return SessionResponseCache(max_bytes=10)
+
+
+class TestSessionResponseCache:
+    def test_get_counts_hits_and_misses(self, response_cache: SessionResponseCache):
+        version = response_cache.get_version('session-1')
+
+        assert response_cache.get('session-1', version, 'default') is None
+        response_cache.put('session-1', version, 'default', b'body')
+
+        assert response_cache.get('session-1', version, 'default') == b'body'
+        stats = response_cache.get_stats()
+        assert (stats.hits, stats.misses, stats.entries, stats.size_bytes) == (1, 1, 1, 4)
+
+    def test_put_evicts_least_recently_used_over_budget(self, response_cache: SessionResponseCache):
+        response_cache.put('session-1', 0, 'default', b'1111')
+        response_cache.put('session-2', 0, 'default', b'2222')
+        response_cache.get('session-1', 0, 'default')
+        response_cache.put('session-3', 0, 'default', b'3333')
+
+        assert response_cache.get('session-2', 0, 'default') is None
+        assert response_cache.get('session-1', 0, 'default') == b'1111'
+        assert response_cache.get_stats().evictions == 1
+
+    def test_put_skips_bodies_larger_than_budget(self, response_cache: SessionResponseCache):
+        response_cache.put('session-1', 0, 'default', b'x' * 11)
+
+        assert response_cache.get_stats().entries == 0
+
+    def test_invalidate_rejects_responses_rendered_before_the_write(self, response_cache: SessionResponseCache):
+        version = response_cache.get_version('session-1')
+        response_cache.put('session-1', version, 'default', b'old')
+
+        response_cache.invalidate('session-1')
+        response_cache.put('session-1', version, 'other', b'stale')
+
+        new_version = response_cache.get_version('session-1')
+        assert new_version != version
+        assert response_cache.get('session-1', version, 'default') is None
+        assert response_cache.get('session-1', version, 'other') is None
+        assert response_cache.get_stats().size_bytes == 0
+
+    def test_clear_bumps_every_session_version(self, response_cache: SessionResponseCache):
+        version = response_cache.get_version('session-1')
+
+        response_cache.clear()
+        response_cache.put('session-1', version, 'default', b'stale')
+
+        assert response_cache.get_stats().entries == 0
+
+    def test_versions_of_written_sessions_stay_bounded(self):
+        response_cache = SessionResponseCache(max_bytes=10, max_idle_versions=3)
+        response_cache.put('cached', 0, 'default', b'body')
+        stale_version = response_cache.get_version('session-0')
+
+        for index in range(100):
+            response_cache.invalidate(f'session-{index}')
+
+        assert response_cache.get_stats().versions == 4
+        # forgotten versions still reject responses rendered before the write, and cached sessions keep theirs
+        response_cache.put('session-0', stale_version, 'default', b'stale')
+        assert response_cache.get('session-0', stale_version, 'default') is None
+        assert response_cache.get('cached', response_cache.get_version('cached'), 'default') == b'body'
+
+        response_cache.put('session-0', response_cache.get_version('session-0'), 'default', b'new')
+        response_cache.invalidate('cached')
+        assert response_cache.get_stats().versions == 4
+
+    @pytest.mark.asyncio
+    async def test_session_service_writes_invalidate_cached_responses(self, response_cache: SessionResponseCache):
+        session_service = SessionService(session_repo=InMemorySessionRepository(), response_cache=response_cache)
+        session = await session_service.create_session(title='Koalas')
+        response_cache.put(session.session_id, response_cache.get_version(session.session_id), 'default', b'body')
+
+        await session_service.add_user_message(session.session_id, 'What do koalas eat?')
+
+        assert response_cache.get_stats().entries == 0
@@ -0,0 +1,50 @@
+import pytest
+
+from repository.memory.session import InMemorySessionRepository
+from service.session import SessionService
+from utility.etag import etag_matches, make_etag
+
+
+@pytest.fixture
+def session_service() -> SessionService:
+    return SessionService(session_repo=InMemorySessionRepository())
+
+
+class TestSessionEtag:
+    def test_make_etag_is_strong_and_depends_on_every_part(self):
+        etag = make_etag('session-1', 3, None, 20, False)
+
+        assert etag.startswith('"') and etag.endswith('"')
+        assert etag == make_etag('session-1', 3, None, 20, False)
+        assert etag != make_etag('session-1', 4, None, 20, False)
+
+    def test_etag_matches_if_none_match_lists_and_weak_tags(self):
+        etag = make_etag('session-1', 3)
+
+        assert etag_matches(f'"other", {etag}', etag)
+        assert etag_matches(f'W/{etag}', etag)
+        assert etag_matches('*', etag)
+        assert not etag_matches(None, etag)
+        assert not etag_matches('"other"', etag)
+
+    @pytest.mark.asyncio
+    async def test_session_version_changes_with_every_message(self, session_service: SessionService):
+        session = await session_service.create_session(title='Koalas')
+        assert await session_service.get_session_version(session.session_id) == 0
+
+        await session_service.add_user_message(session.session_id, 'What do koalas eat?')
+        first_version = await session_service.get_session_version(session.session_id)
+        await session_service.add_assistant_message(session.session_id, 'Eucalyptus leaves.')
+
+        assert (await session_service.get_session_version(session.session_id) or 0) > (first_version or 0) > 0
+        assert await session_service.get_session_version('missing') is None
+
+    @pytest.mark.asyncio
+    async def test_session_list_version_changes_on_create_and_delete(self, session_service: SessionService):
+        empty_version = await session_service.get_session_list_version()
+        session = await session_service.create_session(title='Koalas')
+        created_version = await session_service.get_session_list_version()
+        await session_service.delete_session(session.session_id)
+
+        assert empty_version != created_version
+        assert await session_service.session_repo.count_sessions() == 0
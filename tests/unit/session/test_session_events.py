@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from core.enum.session import SessionEventTypeEnum
+from core.model.session import SessionEvent
+from repository.memory.session import InMemorySessionRepository
+from service.session import SessionService
+from service.session_cache import SessionResponseCache
+from service.session_event import SessionEventBroker
+from utility.sse import HEARTBEAT_MESSAGE, with_heartbeat
+
+
+@pytest.fixture
+def event_broker() -> SessionEventBroker:
+    return SessionEventBroker(history_size=3, max_queue_size=2)
+
+
+async def _next_event(events) -> SessionEvent:
+    return await asyncio.wait_for(anext(events), timeout=1)
+
+
+async def _wait_for_subscriber(event_broker: SessionEventBroker) -> None:
+    while not event_broker.subscriber_count:
+        await asyncio.sleep(0)
+
+
+class TestSessionEventBroker:
+    @pytest.mark.asyncio
+    async def test_subscribe_filters_by_session_ids(self, event_broker: SessionEventBroker):
+        events = event_broker.subscribe(['session-2'])
+        pending = asyncio.ensure_future(_next_event(events))
+        await _wait_for_subscriber(event_broker)
+
+        event_broker.publish(SessionEventTypeEnum.UPDATED, 'session-1')
+        event_broker.publish(SessionEventTypeEnum.UPDATED, 'session-2')
+
+        event = await pending
+        assert (event.session_id, event.id) == ('session-2', 2)
+        await events.aclose()
+        assert event_broker.subscriber_count == 0
+
+    @pytest.mark.asyncio
+    async def test_subscribe_replays_events_after_last_event_id(self, event_broker: SessionEventBroker):
+        for session_id in ['session-1', 'session-2', 'session-3']:
+            event_broker.publish(SessionEventTypeEnum.CREATED, session_id)
+
+        events = event_broker.subscribe(last_event_id=1)
+
+        assert [(await _next_event(events)).session_id for _ in range(2)] == ['session-2', 'session-3']
+        await events.aclose()
+
+    @pytest.mark.asyncio
+    async def test_subscribe_resets_when_history_no_longer_covers_last_event_id(self, event_broker: SessionEventBroker):
+        for index in range(5):
+            event_broker.publish(SessionEventTypeEnum.CREATED, f'session-{index}')
+
+        events = event_broker.subscribe(last_event_id=1)
+
+        assert (await _next_event(events)).type == SessionEventTypeEnum.RESET
+        await events.aclose()
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_gets_reset_instead_of_backlog(self, event_broker: SessionEventBroker):
+        events = event_broker.subscribe()
+        pending = asyncio.ensure_future(_next_event(events))
+        await _wait_for_subscriber(event_broker)
+        event_broker.publish(SessionEventTypeEnum.CREATED, 'session-0')
+        await pending
+
+        for index in range(1, 4):
+            event_broker.publish(SessionEventTypeEnum.CREATED, f'session-{index}')
+
+        event = await _next_event(events)
+        assert (event.type, event.id) == (SessionEventTypeEnum.RESET, 4)
+        await events.aclose()
+
+    @pytest.mark.asyncio
+    async def test_session_service_publishes_write_events(self):
+        session_service = SessionService(
+            session_repo=InMemorySessionRepository(),
+            response_cache=SessionResponseCache(max_bytes=0),
+            event_broker=SessionEventBroker(),
+        )
+        session = await session_service.create_session(title='Koalas')
+        await session_service.add_user_message(session.session_id, 'What do koalas eat?')
+        await session_service.add_assistant_message(session.session_id, 'Eucalyptus leaves.')
+        await session_service.delete_session(session.session_id)
+
+        events = session_service.event_broker.subscribe(last_event_id=0)
+        published = [await _next_event(events) for _ in range(4)]
+        await events.aclose()
+
+        assert [event.type for event in published] == [
+            SessionEventTypeEnum.CREATED,
+            SessionEventTypeEnum.UPDATED,
+            SessionEventTypeEnum.UPDATED,
+            SessionEventTypeEnum.DELETED,
+        ]
+        assert published[1].in_progress_query == 'What do koalas eat?'
+        assert published[2].in_progress_query is None
+
+
+class TestSseHeartbeat:
+    @pytest.mark.asyncio
+    async def test_with_heartbeat_fills_idle_gaps(self):
+        async def messages():
+            yield 'data: 1\n\n'
+            await asyncio.sleep(0.05)
+            yield 'data: 2\n\n'
+
+        async def is_disconnected() -> bool:
+            return False
+
+        relayed = [
+            message
+            async for message in with_heartbeat(
+                messages(), is_disconnected, heartbeat_interval=0.01, disconnect_check_interval=0.01
+            )
+        ]
+
+        assert relayed[0] == 'data: 1\n\n' and relayed[-1] == 'data: 2\n\n'
+        assert HEARTBEAT_MESSAGE in relayed[1:-1]
+
+    @pytest.mark.asyncio
+    async def test_with_heartbeat_releases_subscription_of_gone_client(self, event_broker: SessionEventBroker):
+        async def messages():
+            async for event in event_broker.subscribe():
+                yield f'data: {event.id}\n\n'
+
+        async def is_disconnected() -> bool:
+            return True
+
+        relayed = [
+            message
+            async for message in with_heartbeat(
+                messages(), is_disconnected, heartbeat_interval=1, disconnect_check_interval=0.01
+            )
+        ]
+
+        assert relayed == []
+        assert event_broker.subscriber_count == 0
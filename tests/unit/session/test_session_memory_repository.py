@@ -0,0 +1,129 @@
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+from core.enum.session import MessageRole
+from repository.memory.journal import LOG_FILE_NAME
+from repository.memory.session import InMemorySessionRepository
+
+
+@pytest.fixture
+def session_repository() -> InMemorySessionRepository:
+    return InMemorySessionRepository()
+
+
+class TestInMemorySessionRepository:
+    @pytest.mark.asyncio
+    async def test_add_user_message_and_get_recent_messages(self, session_repository: InMemorySessionRepository):
+        session = await session_repository.create_session(title='Koalas')
+
+        for index in range(3):
+            await session_repository.add_message(session.session_id, MessageRole.USER, f'question {index}')
+            await session_repository.add_message(session.session_id, MessageRole.ASSISTANT, f'answer {index}')
+
+        recent_messages = await session_repository.add_user_message_and_get_recent_messages(
+            session.session_id, 'question 3', max_turns=2
+        )
+
+        assert [message.content for message in recent_messages] == [
+            'answer 1',
+            'question 2',
+            'answer 2',
+            'question 3',
+        ]
+        assert recent_messages[-1].role == MessageRole.USER
+
+    @pytest.mark.asyncio
+    async def test_add_user_message_and_get_recent_messages_unknown_session(
+        self, session_repository: InMemorySessionRepository
+    ):
+        with pytest.raises(KeyError):
+            await session_repository.add_user_message_and_get_recent_messages('missing', 'question')
+
+
+class TestPersistedInMemorySessionRepository:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('snapshot_every', [1, 4, 1000])
+    async def test_sessions_survive_a_restart(self, tmp_path: Path, snapshot_every: int):
+        session_repository = InMemorySessionRepository(data_dir=str(tmp_path), snapshot_every=snapshot_every)
+        kept_session = await session_repository.create_session(title='Kept')
+        deleted_session = await session_repository.create_session(title='Deleted')
+        await session_repository.add_message(kept_session.session_id, MessageRole.USER, 'question')
+        await session_repository.add_message(kept_session.session_id, MessageRole.ASSISTANT, 'answer')
+        await session_repository.delete_session(deleted_session.session_id)
+        # stop without a final snapshot, as a crash would
+        await session_repository.flush()
+        session_repository._journal.close()
+
+        reloaded_repository = InMemorySessionRepository(data_dir=str(tmp_path), snapshot_every=snapshot_every)
+
+        assert await reloaded_repository.get_session(kept_session.session_id) == kept_session
+        assert await reloaded_repository.get_session(deleted_session.session_id) is None
+        assert await reloaded_repository.get_session_summaries(10) == await session_repository.get_session_summaries(10)
+
+        await reloaded_repository.add_message(kept_session.session_id, MessageRole.USER, 'follow-up')
+        messages = (await reloaded_repository.get_session(kept_session.session_id)).messages
+        assert [message.id for message in messages] == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_close_leaves_only_a_snapshot(self, tmp_path: Path):
+        session_repository = InMemorySessionRepository(data_dir=str(tmp_path))
+        session = await session_repository.create_session(title='Koalas')
+        await session_repository.add_message(session.session_id, MessageRole.USER, 'question')
+        await session_repository.close()
+
+        assert (tmp_path / LOG_FILE_NAME).stat().st_size == 0
+        assert await InMemorySessionRepository(data_dir=str(tmp_path)).get_session(session.session_id) == session
+
+    @pytest.mark.asyncio
+    async def test_incomplete_last_log_record_is_dropped(self, tmp_path: Path):
+        session_repository = InMemorySessionRepository(data_dir=str(tmp_path))
+        session = await session_repository.create_session(title='Koalas')
+        await session_repository.flush()
+        session_repository._journal.close()
+        with (tmp_path / LOG_FILE_NAME).open('ab') as log_file:
+            log_file.write(b'{"op": "message", "session_id"')
+
+        reloaded_repository = InMemorySessionRepository(data_dir=str(tmp_path))
+        await reloaded_repository.add_message(session.session_id, MessageRole.USER, 'question')
+        await reloaded_repository.flush()
+        reloaded_repository._journal.close()
+
+        restored_session = await InMemorySessionRepository(data_dir=str(tmp_path)).get_session(session.session_id)
+        assert [message.content for message in restored_session.messages] == ['question']
+
+    @pytest.mark.asyncio
+    async def test_changes_during_a_snapshot_are_kept_until_it_replaces_the_log(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        session_repository = InMemorySessionRepository(data_dir=str(tmp_path), snapshot_every=2)
+        session = await session_repository.create_session(title='Koalas')
+        await session_repository.flush()
+
+        journal = session_repository._journal
+        snapshot_started = threading.Event()
+        snapshot_released = threading.Event()
+        write_snapshot = journal.write_snapshot
+
+        def held_write_snapshot(*args) -> None:
+            snapshot_started.set()
+            snapshot_released.wait(timeout=5)
+            write_snapshot(*args)
+
+        monkeypatch.setattr(journal, 'write_snapshot', held_write_snapshot)
+        await session_repository.add_message(session.session_id, MessageRole.USER, 'question')
+        await asyncio.to_thread(snapshot_started.wait, 5)
+
+        # the snapshot is held in its thread, and changes still go through
+        await session_repository.add_message(session.session_id, MessageRole.ASSISTANT, 'answer')
+        assert journal.has_pending_records
+        assert b'answer' not in (tmp_path / LOG_FILE_NAME).read_bytes()
+
+        snapshot_released.set()
+        await session_repository.flush()
+        journal.close()
+
+        restored_session = await InMemorySessionRepository(data_dir=str(tmp_path)).get_session(session.session_id)
+        assert [message.content for message in restored_session.messages] == ['question', 'answer']
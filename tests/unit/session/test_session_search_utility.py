@@ -0,0 +1,19 @@
+from utility.search import get_search_terms, make_snippet
+
+
+class TestSessionSearchUtility:
+    def test_get_search_terms_ignores_punctuation_case_and_repeats(self):
+        assert get_search_terms('Koalas, koalas & EUCALYPTUS?!') == ['koalas', 'eucalyptus']
+        assert get_search_terms('?!') == []
+
+    def test_make_snippet_keeps_short_content(self):
+        assert make_snippet('Koalas eat eucalyptus.', ['eucalyptus']) == 'Koalas eat eucalyptus.'
+
+    def test_make_snippet_cuts_around_first_match(self):
+        content = f'{"filler " * 40}Koalas eat eucalyptus leaves. {"filler " * 40}'
+
+        snippet = make_snippet(content, ['koala'], max_length=60)
+
+        assert snippet.startswith('…') and snippet.endswith('…')
+        assert 'Koalas eat eucalyptus' in snippet
+        assert len(snippet) <= 62
@@ -0,0 +1,152 @@
+from datetime import timedelta
+
+import pytest
+
+from core.error import InvalidArgumentError
+from core.model.session import ProcessingStep
+from repository.memory.session import InMemorySessionRepository
+from service.session import SessionService
+
+
+@pytest.fixture
+def session_service() -> SessionService:
+    return SessionService(session_repo=InMemorySessionRepository())
+
+
+class TestSessionService:
+    @pytest.mark.asyncio
+    async def test_get_session_summaries_paginates_with_cursor(self, session_service: SessionService):
+        created_ids = [(await session_service.create_session(title=f'Topic {index}')).session_id for index in range(5)]
+
+        first_page, cursor = await session_service.get_session_summaries(limit=2)
+        assert cursor is not None
+        second_page, cursor = await session_service.get_session_summaries(limit=2, cursor=cursor)
+        assert cursor is not None
+        last_page, cursor = await session_service.get_session_summaries(limit=2, cursor=cursor)
+        assert cursor is None
+
+        listed_ids = [summary.session_id for summary in first_page + second_page + last_page]
+        assert sorted(listed_ids) == sorted(created_ids)
+        assert len(last_page) == 1
+
+    @pytest.mark.asyncio
+    async def test_search_sessions_paginates_with_cursor(self, session_service: SessionService):
+        for index in range(3):
+            session = await session_service.create_session(title=f'Topic {index}')
+            await session_service.add_user_message(session.session_id, f'Tell me about koalas, part {index}')
+
+        first_page, cursor = await session_service.search_sessions('koalas', limit=2)
+        assert cursor is not None
+        last_page, cursor = await session_service.search_sessions('koalas', limit=2, cursor=cursor)
+        assert cursor is None
+
+        contents = [result.content for result in first_page + last_page]
+        assert sorted(contents) == [f'Tell me about koalas, part {index}' for index in range(3)]
+
+    @pytest.mark.asyncio
+    async def test_get_session_summaries_reports_turns_and_in_progress_query(self, session_service: SessionService):
+        session = await session_service.create_session(title='Koalas')
+        await session_service.add_user_message(session.session_id, 'What do koalas eat?')
+        await session_service.add_assistant_message(session.session_id, 'Eucalyptus leaves.')
+        await session_service.add_user_message(session.session_id, 'How much do they sleep?')
+
+        summaries, _ = await session_service.get_session_summaries(limit=10)
+
+        assert len(summaries) == 1
+        assert summaries[0].title == 'Koalas'
+        assert summaries[0].turn_count == 1
+        assert summaries[0].in_progress_query == 'How much do they sleep?'
+
+    @pytest.mark.asyncio
+    async def test_get_session_summaries_orders_by_last_update(self, session_service: SessionService):
+        older = await session_service.create_session(title='Older')
+        newer = await session_service.create_session(title='Newer')
+        await session_service.add_user_message(older.session_id, 'bump')
+
+        summaries, _ = await session_service.get_session_summaries(limit=10)
+
+        assert [summary.session_id for summary in summaries] == [older.session_id, newer.session_id]
+        assert summaries[0].updated_at >= summaries[1].updated_at
+
+    @pytest.mark.asyncio
+    async def test_get_session_turns_windows_with_cursors(self, session_service: SessionService):
+        session = await session_service.create_session(title='Koalas')
+        for index in range(5):
+            await session_service.add_user_message(session.session_id, f'question {index}')
+            await session_service.add_assistant_message(
+                session.session_id,
+                f'answer {index}',
+                steps=[ProcessingStep(description='Thinking...', status='completed')],
+            )
+
+        latest_turns, has_more = await session_service.get_session_turns(session.session_id, limit=2)
+        assert [turn.query for turn in latest_turns] == ['question 3', 'question 4']
+        assert has_more
+        assert all(turn.steps == [] for turn in latest_turns)
+
+        older_turns, has_more = await session_service.get_session_turns(
+            session.session_id, limit=2, before=latest_turns[0].id, include_steps=True
+        )
+        assert [turn.query for turn in older_turns] == ['question 1', 'question 2']
+        assert has_more
+        assert all(len(turn.steps) == 1 for turn in older_turns)
+
+        newer_turns, has_more = await session_service.get_session_turns(
+            session.session_id, limit=10, after=older_turns[-1].id
+        )
+        assert [turn.query for turn in newer_turns] == ['question 3', 'question 4']
+        assert not has_more
+
+    @pytest.mark.asyncio
+    async def test_get_session_turns_rejects_both_cursors(self, session_service: SessionService):
+        session = await session_service.create_session(title='Koalas')
+
+        with pytest.raises(InvalidArgumentError):
+            await session_service.get_session_turns(session.session_id, limit=2, before=10, after=1)
+
+    @pytest.mark.asyncio
+    async def test_get_session_turns_since_returns_only_new_turns(self, session_service: SessionService):
+        session = await session_service.create_session(title='Koalas')
+        await session_service.add_user_message(session.session_id, 'question 0')
+        await session_service.add_assistant_message(session.session_id, 'answer 0')
+
+        delta = await session_service.get_session_turns_since(session.session_id, since=0)
+        assert delta is not None
+        assert [turn.query for turn in delta.turns] == ['question 0']
+        last_turn_id = delta.turns[-1].id
+        assert last_turn_id is not None
+
+        await session_service.add_user_message(session.session_id, 'question 1')
+        delta = await session_service.get_session_turns_since(session.session_id, since=last_turn_id)
+        assert delta is not None
+        assert delta.turns == []
+        assert delta.in_progress_query == 'question 1'
+        in_progress_version = delta.version
+        assert in_progress_version > last_turn_id
+
+        await session_service.add_assistant_message(session.session_id, 'answer 1')
+        delta = await session_service.get_session_turns_since(session.session_id, since=last_turn_id)
+        assert delta is not None
+        assert [(turn.query, turn.response) for turn in delta.turns] == [('question 1', 'answer 1')]
+        assert delta.in_progress_query is None
+        assert delta.version > in_progress_version
+
+        assert await session_service.get_session_turns_since('missing', since=0) is None
+
+    @pytest.mark.asyncio
+    async def test_purge_expired_sessions_keeps_latest_in_batches(self, session_service: SessionService):
+        sessions = [await session_service.create_session(title=f'Topic {index}') for index in range(5)]
+
+        deleted_count = await session_service.purge_expired_sessions(keep_latest=2, batch_size=2)
+
+        assert deleted_count == 3
+        summaries, _ = await session_service.get_session_summaries(limit=10)
+        assert {summary.session_id for summary in summaries} == {sessions[3].session_id, sessions[4].session_id}
+
+    @pytest.mark.asyncio
+    async def test_purge_expired_sessions_by_age(self, session_service: SessionService):
+        await session_service.create_session(title='Recent')
+
+        assert await session_service.purge_expired_sessions(max_age=timedelta(days=1)) == 0
+        assert await session_service.purge_expired_sessions(max_age=timedelta(0)) == 1
+        assert await session_service.purge_expired_sessions() == 0
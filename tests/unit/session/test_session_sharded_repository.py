@@ -0,0 +1,93 @@
+import pytest
+
+from core.enum.session import MessageRole
+from core.model.session import SessionListCursor
+from repository.memory.session import InMemorySessionRepository
+from repository.sharded.session import ShardedSessionRepository, get_shard_name
+
+
+def make_sharded_repo(*shard_names: str) -> ShardedSessionRepository:
+    return ShardedSessionRepository({name: InMemorySessionRepository() for name in shard_names})
+
+
+class TestShardedSessionRepository:
+    def test_shard_name_is_stable_and_only_moves_to_added_shards(self):
+        session_ids = [f'session-{index}' for index in range(200)]
+        before = {session_id: get_shard_name(session_id, ['a', 'b']) for session_id in session_ids}
+        after = {session_id: get_shard_name(session_id, ['a', 'b', 'c']) for session_id in session_ids}
+
+        assert set(before.values()) == {'a', 'b'}
+        assert before == {session_id: get_shard_name(session_id, ['b', 'a']) for session_id in session_ids}
+        assert all(after[session_id] in (before[session_id], 'c') for session_id in session_ids)
+        assert 'c' in after.values()
+
+    @pytest.mark.asyncio
+    async def test_session_and_messages_live_on_one_shard(self):
+        repo = make_sharded_repo('a', 'b', 'c')
+        session = await repo.create_session(title='Koalas')
+        await repo.add_message(session.session_id, MessageRole.USER, 'What do koalas eat?')
+
+        shard_counts = [await shard.count_sessions() for shard in repo.shards.values()]
+        stored_session = await repo.get_session(session.session_id)
+
+        assert sorted(shard_counts) == [0, 0, 1]
+        assert repo.get_shard(session.session_id) is repo.shards[get_shard_name(session.session_id, 'abc')]
+        assert stored_session is not None and len(stored_session.messages) == 1
+
+    @pytest.mark.asyncio
+    async def test_session_summaries_merge_keyset_pages_across_shards(self):
+        repo = make_sharded_repo('a', 'b', 'c')
+        for index in range(25):
+            await repo.create_session(title=f'Session {index}')
+
+        listed_ids: list[str] = []
+        cursor: SessionListCursor | None = None
+        while summaries := await repo.get_session_summaries(7, cursor):
+            listed_ids.extend(summary.session_id for summary in summaries)
+            cursor = SessionListCursor(updated_at=summaries[-1].updated_at, session_id=summaries[-1].session_id)
+
+        all_summaries = [summary for shard in repo.shards.values() for summary in await shard.get_session_summaries(25)]
+        expected_ids = [
+            summary.session_id
+            for summary in sorted(all_summaries, key=lambda s: (s.updated_at, s.session_id), reverse=True)
+        ]
+        assert listed_ids == expected_ids
+        assert await repo.count_sessions() == 25
+
+    @pytest.mark.asyncio
+    async def test_delete_expired_sessions_keeps_latest_sessions_across_all_shards(self):
+        repo = make_sharded_repo('a', 'b', 'c')
+        for index in range(12):
+            await repo.create_session(title=f'Session {index}')
+        latest_ids = [summary.session_id for summary in await repo.get_session_summaries(5)]
+
+        deleted_count = await repo.delete_expired_sessions(keep_latest=5)
+
+        assert deleted_count == 7
+        assert [summary.session_id for summary in await repo.get_session_summaries(20)] == latest_ids
+
+    @pytest.mark.asyncio
+    async def test_rebalance_moves_sessions_to_added_shard_and_off_drained_shard(self):
+        old_repo = make_sharded_repo('a', 'b')
+        session_ids = []
+        for index in range(30):
+            session = await old_repo.create_session(title=f'Session {index}')
+            await old_repo.add_message(session.session_id, MessageRole.USER, f'Question {index}')
+            session_ids.append(session.session_id)
+
+        repo = ShardedSessionRepository({**old_repo.shards, 'c': InMemorySessionRepository()})
+        moved_count = await repo.rebalance()
+
+        assert moved_count == sum(get_shard_name(session_id, 'abc') == 'c' for session_id in session_ids)
+        assert await repo.shards['c'].count_sessions() == moved_count > 0
+        assert await repo.rebalance() == 0
+
+        await repo.rebalance(draining={'a'})
+        assert await repo.shards['a'].count_sessions() == 0
+
+        drained_repo = ShardedSessionRepository({'b': repo.shards['b'], 'c': repo.shards['c']})
+        for session_id in session_ids:
+            session = await drained_repo.get_session(session_id)
+            assert session is not None and [message.content for message in session.messages] == [
+                f'Question {session_ids.index(session_id)}'
+            ]
@@ -0,0 +1,110 @@
+"""
+Behavior every user and role repository has to share.
+
+The in-memory and SQLite repositories always run; the PostgreSQL repositories run against the database at
+`TEST_DATABASE_URL`, whose tables are dropped and recreated.
+"""
+
+import os
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+from core.constant.user import DEFAULT_ROLE_KEY
+from core.model.user import User
+from core.protocol.repository.role import RoleRepository
+from core.protocol.repository.user import UserRepository
+from core.type import IDType
+from repository.memory.role import InMemoryRoleRepository
+from repository.memory.user import InMemoryUserRepository
+from repository.psql.connection import Database
+from repository.psql.dao.role import PsqlRoleRepository
+from repository.psql.dao.user import PsqlUserRepository
+from repository.sqlite.connection import SqliteDatabase
+from repository.sqlite.role import SqliteRoleRepository
+from repository.sqlite.user import SqliteUserRepository
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+
+class UserRepositoryContract:
+    @pytest.mark.asyncio
+    async def test_user_lifecycle(self, repositories: tuple[UserRepository, RoleRepository]):
+        user_repo, role_repo = repositories
+        default_role = await role_repo.get_by_key(DEFAULT_ROLE_KEY)
+        assert default_role is not None
+
+        created_user = await user_repo.create(
+            User(username='koala', email='koala@example.com', password_hash='hashed', roles=[default_role])
+        )
+        assert created_user.id
+        assert [role.key for role in created_user.roles] == [DEFAULT_ROLE_KEY]
+
+        assert await user_repo.get_by_id(created_user.id) == created_user
+        assert await user_repo.get_by_username_or_email('koala', None) == created_user
+        assert await user_repo.get_by_username_or_email(None, 'koala@example.com') == created_user
+        assert [user.username for user in await user_repo.get_all()] == ['koala']
+
+        updated_user = await user_repo.update(
+            User(
+                id=created_user.id,
+                username='wombat',
+                email='wombat@example.com',
+                password_hash='hashed',
+                is_verified=True,
+                roles=[],
+            )
+        )
+        assert (updated_user.username, updated_user.is_verified, updated_user.roles) == ('wombat', True, [])
+
+        await user_repo.delete(created_user.id)
+        assert await user_repo.get_by_id(created_user.id) is None
+        assert await user_repo.get_by_username_or_email('wombat', 'wombat@example.com') is None
+
+    @pytest.mark.asyncio
+    async def test_roles(self, repositories: tuple[UserRepository, RoleRepository]):
+        _, role_repo = repositories
+        default_role = await role_repo.get_by_key(DEFAULT_ROLE_KEY)
+
+        assert default_role is not None
+        assert await role_repo.get_by_key('missing') is None
+        assert await role_repo.get_by_ids([default_role.id, IDType(999)]) == [default_role]
+        assert await role_repo.get_by_ids([]) == []
+
+
+class TestInMemoryUserRepositoryContract(UserRepositoryContract):
+    @pytest.fixture
+    def repositories(self) -> tuple[UserRepository, RoleRepository]:
+        user_repo, role_repo = InMemoryUserRepository(), InMemoryRoleRepository()
+        user_repo.reset()
+        role_repo.reset()
+        return user_repo, role_repo
+
+
+class TestSqliteUserRepositoryContract(UserRepositoryContract):
+    @pytest_asyncio.fixture(loop_scope='function')
+    async def repositories(self, tmp_path: Path) -> AsyncGenerator[tuple[UserRepository, RoleRepository]]:
+        database = SqliteDatabase(str(tmp_path / 'dr_koala.db'))
+        await database.run_migrations()
+        try:
+            yield SqliteUserRepository(database), SqliteRoleRepository(database)
+        finally:
+            await database.close()
+
+
+class TestPsqlUserRepositoryContract(UserRepositoryContract):
+    @pytest_asyncio.fixture(loop_scope='function')
+    async def repositories(self) -> AsyncGenerator[tuple[UserRepository, RoleRepository]]:
+        if TEST_DATABASE_URL is None:
+            pytest.skip('TEST_DATABASE_URL is not set')
+
+        database = Database(TEST_DATABASE_URL, liveness_check_interval=None)
+        await database.drop_all_tables()
+        await database.run_migrations()
+        try:
+            async with database.async_session_maker() as session:
+                yield PsqlUserRepository(session), PsqlRoleRepository(session)
+        finally:
+            await database.engine.dispose()